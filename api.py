@@ -13,8 +13,10 @@ if str(PROJECT_DIR) not in sys.path:
 if os.getcwd() != str(PROJECT_DIR):
     os.chdir(PROJECT_DIR)
 
+import threading
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
@@ -27,7 +29,13 @@ import jwt
 import bcrypt
 
 # Инициализация модулей (как в main)
-from data_loader import DataLoader
+from reference_data import (
+    DataLoaderView,
+    get_reference_data,
+    pin_reference_data,
+    reload_reference_data,
+    start_catalog_watcher,
+)
 from resume_parser import ResumeParser
 from gap_analyzer import GapAnalyzer
 from scenario_handler import ScenarioHandler
@@ -37,7 +45,8 @@ from db import get_db_connection, init_db
 from config import Config
 from rate_limiter import check_rate_limit_or_raise
 
-data = DataLoader()
+# view: после перезагрузки каталога синглтоны ниже видят новую версию, запрос — закреплённую
+data = DataLoaderView()
 parser = ResumeParser()
 analyzer = GapAnalyzer()
 scenarios = ScenarioHandler(data)
@@ -57,6 +66,16 @@ _logging.basicConfig(level=_logging.INFO)
 _logger = _logging.getLogger("career-pathfinder")
 
 
+def _warm_lemmatization() -> None:
+    try:
+        from skill_normalizer import warm_lemmatization_cache
+        started = time.perf_counter()
+        count = warm_lemmatization_cache()
+        _logger.info(f"Lemmatization cache warmed: {count} phrases in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        _logger.warning(f"Lemmatization warm-up failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(application: FastAPI):
     init_db()
@@ -77,7 +96,20 @@ async def lifespan(application: FastAPI):
     fe = "YES" if fe_dir.is_dir() else "NO"
     _logger.info(f"=== Career Pathfinder started === PORT={port}, frontend={fe}")
 
+    # регистрирует прогрев таблицы навыков-помощников и предупреждает, если её нет для текущего каталога
+    from next_grade_service import param_support_stats
+    if param_support_stats()["state"] != "ok":
+        _logger.warning("Param skill support table is missing or stale: next-grade plans use role-order skills")
+    watcher = start_catalog_watcher(Config.CATALOG_WATCH_INTERVAL_SEC)
+    if Config.LEMMA_WARMUP_ON_STARTUP:
+        threading.Thread(target=_warm_lemmatization, name="lemma-warmup", daemon=True).start()
     yield
+    if watcher is not None:
+        watcher.stop_event.set()
+    from query_cache import get_query_cache
+    query_cache = get_query_cache()
+    if query_cache is not None:
+        query_cache.save()
 
 
 app = FastAPI(title="AI Career Pathfinder API", version="1.0", lifespan=lifespan)
@@ -87,9 +119,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Catalog-Version"],
 )
 
 
+@app.middleware("http")
+async def pin_catalog_version(request, call_next):
+    """Запрос целиком работает на одной версии каталога, даже если её подменили посреди обработки."""
+    with pin_reference_data() as ref:
+        response = await call_next(request)
+    response.headers["X-Catalog-Version"] = ref.version
+    return response
+
+
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
@@ -719,28 +761,40 @@ class PlanRequest(BaseModel):
     target_profession: Optional[str] = None
 
 
-def _skills_table_to_user_skills(skills: List[dict]) -> dict:
-    """Конвертирует навыки фронтенда (float 0..2) во внутренние уровни (1..3) с нормализацией имён.
-    Маппинг по спецификации: 0-0.5→Basic(1), 1-1.5→Proficiency(2), 2→Advanced(3).
-    Навык на уровне 0 «Нет навыка» = пользователь явно указал отсутствие → Basic(1)."""
+def _frontend_level_to_internal(level) -> Optional[int]:
+    """Уровень фронтенда (float 0..2) → внутренний 1..3; None для нечислового значения."""
+    try:
+        level = float(level)
+    except (TypeError, ValueError):
+        return None
+    if level != level:
+        return None
+    if level <= 0.5:
+        return 1   # Basic
+    if level <= 1.5:
+        return 2   # Proficiency
+    return 3       # Advanced
+
+
+def _skills_table_to_raw_levels(skills: List[dict]) -> dict:
+    """Навыки фронтенда → {имя как введено: внутренний уровень} без нормализации имён."""
     raw = {}
     for item in skills:
         name = (item.get("name") or "").strip()
         if not name or name == "Навык" or name.startswith("⚠️"):
             continue
-        try:
-            level = float(item.get("level", 1))
-        except (TypeError, ValueError):
-            continue
-        if level != level:
+        internal_level = _frontend_level_to_internal(item.get("level", 1))
+        if internal_level is None:
             continue
-        if level <= 0.5:
-            internal_level = 1   # Basic
-        elif level <= 1.5:
-            internal_level = 2   # Proficiency
-        else:
-            internal_level = 3   # Advanced
         raw[name] = internal_level
+    return raw
+
+
+def _skills_table_to_user_skills(skills: List[dict]) -> dict:
+    """Конвертирует навыки фронтенда (float 0..2) во внутренние уровни (1..3) с нормализацией имён.
+    Маппинг по спецификации: 0-0.5→Basic(1), 1-1.5→Proficiency(2), 2→Advanced(3).
+    Навык на уровне 0 «Нет навыка» = пользователь явно указал отсутствие → Basic(1)."""
+    raw = _skills_table_to_raw_levels(skills)
 
     try:
         from skill_normalizer import resolve_to_canonical, get_canonical_skills_set
@@ -774,15 +828,20 @@ def _dedupe_opportunities(opportunities):
 
 
 def _build_role_matches(opps, user_skills):
-    """Строит RoleMatch для explore; RAG why_match запрашивается параллельно (раньше — N последовательных HTTP)."""
-    from concurrent.futures import ThreadPoolExecutor
+    """Строит RoleMatch для explore; RAG why_match по всем ролям — один batch-запрос к Qdrant."""
     from explore_recommendations import RoleMatch
     try:
-        from rag_service import get_rag_why_role_bullets
+        from rag_service import get_rag_why_role_bullets_many
     except Exception:
-        get_rag_why_role_bullets = lambda u, r, **kw: []
+        get_rag_why_role_bullets_many = lambda u, roles, **kw: [[] for _ in roles]
 
-    def _one(opp: Dict[str, Any]) -> RoleMatch:
+    if not opps:
+        return []
+    whys = get_rag_why_role_bullets_many(
+        user_skills, [opp.get("role", "") for opp in opps], top_k=5, atlas_keys=set(data.atlas_map.keys())
+    )
+    matches = []
+    for opp, why in zip(opps, whys):
         role_title = opp.get("role", "")
         internal = opp.get("internal_role")
         reqs = data.get_role_requirements(internal, "Middle") if internal else {}
@@ -793,11 +852,8 @@ def _build_role_matches(opps, user_skills):
             if user_skills.get(s, 0) >= reqs.get(s, 0)
         ][:5]
         missing = [{"name": s} for s in skill_keys if user_skills.get(s, 0) < reqs.get(s, 0)]
-        why = get_rag_why_role_bullets(
-            user_skills, role_title, top_k=5, atlas_keys=set(data.atlas_map.keys())
-        )
         score = (opp.get("match", 0) or 0) / 100.0
-        return RoleMatch(
+        matches.append(RoleMatch(
             role_title=role_title,
             match_score=score,
             why_match=why,
@@ -805,14 +861,8 @@ def _build_role_matches(opps, user_skills):
             key_skills=skill_keys[:8],
             missing_skills=missing,
             internal_role=internal,
-        )
-
-    if not opps:
-        return []
-    # Sequential-ish RAG: many parallel retrieves still serialize on embed lock and overload Qdrant.
-    max_workers = min(2, max(1, len(opps)))
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        return list(pool.map(_one, opps))
+        ))
+    return matches
 
 
 def _build_growth_analysis(structured, current_grade, target_grade):
@@ -971,7 +1021,7 @@ def build_plan_api(req: PlanRequest):
             md = formatter.format_explore(view_model, user_skills)
             analysis = _build_explore_analysis(view_model)
 
-        out = {"markdown": md}
+        out = {"markdown": md, "catalog_version": get_reference_data().version}
         if role_titles:
             out["role_titles"] = role_titles
         if analysis:
@@ -981,6 +1031,194 @@ def build_plan_api(req: PlanRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class CompareTarget(BaseModel):
+    profession: str
+    grade: str = "Middle"  # "Middle" или ключ из GRADE_MAP
+
+
+class CompareRolesRequest(BaseModel):
+    grade: str  # текущий грейд пользователя (ключ из GRADE_MAP)
+    skills: List[dict]  # [{"name": str, "level": float}]
+    targets: List[CompareTarget]
+
+
+COMPARE_ROLES_MAX_TARGETS = 30
+
+
+@app.post("/api/compare-roles")
+def compare_roles_api(req: CompareRolesRequest):
+    """Сравнение профиля с несколькими ролями/грейдами за один проход (analyze_structured_batch)."""
+    if not req.skills:
+        raise HTTPException(status_code=400, detail="Добавьте хотя бы один навык")
+    if not req.targets:
+        raise HTTPException(status_code=400, detail="Выберите хотя бы одну роль для сравнения")
+    if len(req.targets) > COMPARE_ROLES_MAX_TARGETS:
+        raise HTTPException(
+            status_code=400, detail=f"Не больше {COMPARE_ROLES_MAX_TARGETS} ролей за запрос"
+        )
+    user_skills = _skills_table_to_user_skills(req.skills)
+    if not user_skills:
+        raise HTTPException(status_code=400, detail="В списке нет корректных навыков")
+
+    from data_loader import GRADE_TO_PARAM_ORDINAL
+    current_param_ordinal = GRADE_TO_PARAM_ORDINAL.get(GRADE_MAP.get(req.grade, "Middle"), 2)
+    for param_name in data.atlas_map:
+        user_skills.setdefault(param_name, current_param_ordinal)
+
+    targets = [
+        (data.get_internal_role_name(t.profession), GRADE_MAP.get(t.grade, t.grade))
+        for t in req.targets
+    ]
+    try:
+        results = analyzer.analyze_structured_batch(user_skills, targets, data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    for target, result in zip(req.targets, results):
+        result["profession"] = target.profession
+    return {"results": results, "catalog_version": get_reference_data().version}
+
+
+class TeamGapRequest(BaseModel):
+    target_profession: str
+    target_grade: str = "Middle"  # "Senior" или ключ из GRADE_MAP
+    profiles: List[dict]  # [{"id": ..., "grade": "Middle", "skills": {"Python": 2} | [{"name", "level"}]}]
+    include_plan: bool = False
+    include_details: bool = False
+
+
+@app.post("/api/hr/team-gap")
+def team_gap_api(req: TeamGapRequest, current_user: Dict[str, Any] = Depends(_get_current_user)):
+    """Командный gap-анализ: много профилей × одна роль. Ответ — NDJSON (строка на профиль + summary).
+    Только для авторизованных пользователей, с лимитом запросов; LLM-план — для небольших батчей."""
+    from fastapi.responses import StreamingResponse
+    from team_gap_service import score_team
+
+    check_rate_limit_or_raise(
+        f"team-gap:{current_user['id']}",
+        limit=Config.TEAM_GAP_RATE_LIMIT,
+        window_sec=Config.TEAM_GAP_RATE_LIMIT_WINDOW_SEC,
+    )
+    if not req.profiles:
+        raise HTTPException(status_code=400, detail="Передайте хотя бы один профиль")
+    if len(req.profiles) > Config.TEAM_GAP_MAX_PROFILES:
+        raise HTTPException(
+            status_code=400, detail=f"Не больше {Config.TEAM_GAP_MAX_PROFILES} профилей за запрос"
+        )
+    if req.include_plan and len(req.profiles) > Config.TEAM_GAP_MAX_PLAN_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"План развития строится не больше чем для {Config.TEAM_GAP_MAX_PLAN_PROFILES} профилей за запрос",
+        )
+    target_grade = GRADE_MAP.get(req.target_grade, req.target_grade)
+    if target_grade not in GRADE_MAP.values():
+        raise HTTPException(status_code=400, detail="Некорректный целевой грейд")
+    if not data.get_skills_for_role(req.target_profession):
+        raise HTTPException(status_code=404, detail="Роль не найдена")
+
+    # Поток читается уже после выхода из middleware — фиксируем версию каталога явно
+    loader = get_reference_data().data_loader
+    rows = score_team(
+        req.profiles, req.target_profession, target_grade, loader,
+        include_plan=req.include_plan, include_details=req.include_details,
+        chunk_size=Config.TEAM_GAP_CHUNK_SIZE,
+    )
+    return StreamingResponse(
+        (json.dumps(row, ensure_ascii=False) + "\n" for row in rows),
+        media_type="application/x-ndjson",
+    )
+
+
+class WhatIfStartRequest(BaseModel):
+    profession: str
+    grade: str  # текущий грейд (ключ из GRADE_MAP)
+    skills: List[dict]  # [{"name": str, "level": float}]
+    target_profession: Optional[str] = None  # по умолчанию — текущая профессия
+    target_grade: Optional[str] = None  # по умолчанию — следующий грейд (или Middle при смене профессии)
+
+
+class WhatIfChangeRequest(BaseModel):
+    skill: str
+    level: Optional[float] = None  # шкала фронтенда 0..2; null — убрать навык из профиля
+
+
+def _get_whatif_session(session_id: str):
+    from whatif_session import get_session_store
+
+    session = get_session_store().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Сессия не найдена или истекла")
+    return session
+
+
+@app.post("/api/whatif/sessions")
+def whatif_start_api(req: WhatIfStartRequest):
+    """Открывает what-if сессию: полный анализ один раз, дальше — дельты по одному навыку."""
+    from data_loader import GRADE_TO_PARAM_ORDINAL
+    from whatif_session import WhatIfSession, get_session_store
+
+    user_skills = _skills_table_to_raw_levels(req.skills)
+    if not user_skills:
+        raise HTTPException(status_code=400, detail="В списке нет корректных навыков")
+    grade_key = GRADE_MAP.get(req.grade, "Middle")
+    for param_name in data.atlas_map:
+        user_skills.setdefault(param_name, GRADE_TO_PARAM_ORDINAL.get(grade_key, 2))
+
+    profession = req.target_profession or req.profession
+    if req.target_grade:
+        target_grade = GRADE_MAP.get(req.target_grade, req.target_grade)
+    elif req.target_profession:
+        target_grade = "Middle"
+    else:
+        sequence = ["Junior", "Middle", "Senior", "Lead", "Expert"]
+        idx = sequence.index(grade_key) if grade_key in sequence else 1
+        target_grade = sequence[min(idx + 1, len(sequence) - 1)]
+    if target_grade not in GRADE_MAP.values():
+        raise HTTPException(status_code=400, detail="Некорректный целевой грейд")
+
+    ref = get_reference_data()
+    try:
+        session = WhatIfSession(
+            user_skills, ref.data_loader.get_internal_role_name(profession), target_grade, ref.data_loader
+        )
+        out = session.snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    get_session_store().put(session)
+    out["catalog_version"] = ref.version
+    return out
+
+
+@app.get("/api/whatif/sessions/{session_id}")
+def whatif_get_api(session_id: str):
+    session = _get_whatif_session(session_id)
+    with session.lock:
+        return session.snapshot()
+
+
+@app.patch("/api/whatif/sessions/{session_id}")
+def whatif_change_api(session_id: str, req: WhatIfChangeRequest):
+    """Меняет уровень одного навыка и возвращает обновлённые match%, разрывы и explore-рейтинг."""
+    session = _get_whatif_session(session_id)
+    level = None if req.level is None else _frontend_level_to_internal(req.level)
+    with session.lock:
+        try:
+            change = session.set_skill(req.skill, level)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        out = session.snapshot()
+    out["change"] = change
+    return out
+
+
+@app.delete("/api/whatif/sessions/{session_id}")
+def whatif_delete_api(session_id: str):
+    from whatif_session import get_session_store
+
+    if not get_session_store().delete(session_id):
+        raise HTTPException(status_code=404, detail="Сессия не найдена или истекла")
+    return {"ok": True}
+
+
 class FocusedPlanRequest(BaseModel):
     profession: str
     grade: str
@@ -1053,7 +1291,45 @@ def focused_plan_api(req: FocusedPlanRequest):
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "catalog_version": get_reference_data().version}
+
+
+@app.post("/api/admin/catalog/reload")
+def reload_catalog_api(x_admin_token: Optional[str] = Header(default=None), force: bool = False):
+    """Перечитывает каталог навыков и атомарно подменяет версию (без рестарта процесса)."""
+    if not Config.CATALOG_ADMIN_TOKEN or x_admin_token != Config.CATALOG_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    previous = get_reference_data().version
+    try:
+        version, swapped = reload_reference_data(force=force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"previous_version": previous, "catalog_version": version, "reloaded": swapped}
+
+
+@app.get("/api/admin/caches")
+def cache_stats_api(x_admin_token: Optional[str] = Header(default=None)):
+    """Размеры и hit/miss внутренних кэшей (лемматизация, эмбеддинги каталога и запросов, score пар
+    cross-encoder), очередь энкодера и состояние таблицы навыков-помощников next-grade."""
+    if not Config.CATALOG_ADMIN_TOKEN or x_admin_token != Config.CATALOG_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Недостаточно прав")
+    from embedding_store import get_embedding_store
+    from encoder_service import get_batching_encoder
+    from next_grade_service import param_support_stats
+    from query_cache import get_pair_score_cache, get_query_cache
+    from rag_service import embedder_backends
+    from skill_normalizer import lemmatization_cache_stats
+    store = get_embedding_store()
+    query_cache = get_query_cache()
+    pair_cache = get_pair_score_cache()
+    return {
+        "lemmatization": lemmatization_cache_stats(),
+        "embedding_store": store.stats() if store is not None else None,
+        "query_embeddings": query_cache.stats() if query_cache is not None else None,
+        "cross_encoder_pairs": pair_cache.stats() if pair_cache is not None else None,
+        "encoder": {**get_batching_encoder().stats(), "backends": embedder_backends()},
+        "param_skill_support": param_support_stats(),
+    }
 
 
 
@@ -18,4 +18,4 @@ if __name__ == "__main__":
     if n is not None:
         print(f"Готово. Загружено точек: {n}")
     else:
-        print("Ошибка или Qdrant недоступен. Проверьте QDRANT_URL и QDRANT_API_KEY в .env")
+        print("Ошибка или хранилище недоступно. Проверьте QDRANT_URL / QDRANT_API_KEY или VECTOR_BACKEND в .env")
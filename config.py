@@ -61,8 +61,33 @@ class Config:
     SKILLS_FILE = DATA_DIR / "clean_skills.json"
     ATLAS_FILE = DATA_DIR / "atlas_params_clean.json"
     ROLES_FILE = DATA_DIR / "roles.json"
+    # Скомпилированный снапшот справочника (scripts/compile_reference_data.py); при расхождении хэша — JSON
+    REFERENCE_SNAPSHOT_FILE = Path(os.getenv("REFERENCE_SNAPSHOT_FILE", str(DATA_DIR / "reference_snapshot.bin")))
+    # Таблица навык -> сниппет / объяснение разрыва, строится вместе с RAG-индексом (build_index)
+    SKILL_SNIPPETS_FILE = Path(os.getenv("SKILL_SNIPPETS_FILE", str(DATA_DIR / "skill_snippets.json")))
+    # Параметр атласа × роль × грейд -> навыки-помощники для плана следующего грейда (scripts/reindex_qdrant.py)
+    PARAM_SKILL_SUPPORT_FILE = Path(
+        os.getenv("PARAM_SKILL_SUPPORT_FILE", str(DATA_DIR / "param_skill_support.json"))
+    )
+    # Горячая перезагрузка каталога: период опроса файлов (0 — выключено) и токен admin-эндпоинта
+    CATALOG_WATCH_INTERVAL_SEC = float(os.getenv("CATALOG_WATCH_INTERVAL_SEC", "0"))
+    CATALOG_ADMIN_TOKEN = os.getenv("CATALOG_ADMIN_TOKEN", "")
     QDRANT_URL = os.getenv("QDRANT_URL")
     QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+    # Пул keep-alive соединений к Qdrant: размер и deadline на запрос (поиск / индексация)
+    QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "8"))
+    QDRANT_TIMEOUT_SEC = float(os.getenv("QDRANT_TIMEOUT_SEC", "10"))
+    QDRANT_INDEX_TIMEOUT_SEC = float(os.getenv("QDRANT_INDEX_TIMEOUT_SEC", "60"))
+    # Переиндексация (vector_sync): точек в чанке upsert, параллельных чанков, повторов чанка
+    REINDEX_CHUNK_SIZE = int(os.getenv("REINDEX_CHUNK_SIZE", "256"))
+    REINDEX_WORKERS = int(os.getenv("REINDEX_WORKERS", "4"))
+    REINDEX_RETRIES = int(os.getenv("REINDEX_RETRIES", "3"))
+    # Векторный бэкенд: qdrant | local | auto (Qdrant, если задан QDRANT_URL, иначе встроенное хранилище)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "auto")
+    LOCAL_VECTOR_DIR = Path(os.getenv("LOCAL_VECTOR_DIR", str(_PROJECT_DIR / "data" / "vector_store")))
+    # Приближённый поиск (IVF) в локальном хранилище: 0 — точный перебор
+    LOCAL_VECTOR_NPROBE = int(os.getenv("LOCAL_VECTOR_NPROBE", "0"))
+    LOCAL_VECTOR_IVF_MIN_POINTS = int(os.getenv("LOCAL_VECTOR_IVF_MIN_POINTS", "4096"))
 
     # RAG
     RAG_COLLECTION_NAME = os.getenv("RAG_COLLECTION_NAME", "career_pathfinder_rag")
@@ -77,19 +102,53 @@ class Config:
     SKILLS_HYBRID_MIN_SCORE = float(os.getenv("SKILLS_HYBRID_MIN_SCORE", "0.3"))
     SKILLS_HYBRID_RRF_K = float(os.getenv("SKILLS_HYBRID_RRF_K", "60.0"))
     SKILLS_HYBRID_RERANK_TOP_N = int(os.getenv("SKILLS_HYBRID_RERANK_TOP_N", "20"))
+    # Lexical-ветка hybrid retrieval: fuzzy (token_sort + Jaccard) или bm25
+    SKILLS_LEXICAL_SCORER = os.getenv("SKILLS_LEXICAL_SCORER", "fuzzy").strip().lower()
     SKILLS_CROSS_ENCODER_MODEL = os.getenv("SKILLS_CROSS_ENCODER_MODEL", "")
+    # Cross-encoder: пар в одном predict и LRU-кэш score пар (фраза, навык); 0 — без кэша
+    CROSS_ENCODER_BATCH_SIZE = int(os.getenv("CROSS_ENCODER_BATCH_SIZE", "64"))
+    CROSS_ENCODER_CACHE_SIZE = int(os.getenv("CROSS_ENCODER_CACHE_SIZE", "100000"))
+    # Бэкенд эмбеддингов: torch | int8 (динамическое квантование) | onnx (scripts/export_onnx_embedders.py).
+    # Ускоренный бэкенд включается, только если минимальный косинус с эталоном >= EMBED_PARITY_MIN_COSINE
+    EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+    EMBED_ONNX_DIR = Path(os.getenv("EMBED_ONNX_DIR", str(_PROJECT_DIR / "data" / "onnx")))
+    EMBED_ONNX_INT8 = _env_bool("EMBED_ONNX_INT8", True)
+    EMBED_PARITY_MIN_COSINE = float(os.getenv("EMBED_PARITY_MIN_COSINE", "0.98"))
+    EMBED_PARITY_SAMPLE = int(os.getenv("EMBED_PARITY_SAMPLE", "64"))
+    # Micro-batching энкодера: тексты параллельных запросов склеиваются в один encode на модель
+    ENCODER_BATCHING = _env_bool("ENCODER_BATCHING", True)
+    ENCODER_MAX_BATCH = int(os.getenv("ENCODER_MAX_BATCH", "64"))
+    ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "3"))
+    # Внешний сервер эмбеддингов (embedding_server.py): unix:/path.sock или host:port; пусто — модели в процессе
+    EMBED_SERVER_ADDRESS = os.getenv("EMBED_SERVER_ADDRESS", "")
+    EMBED_SERVER_REPLICAS = int(os.getenv("EMBED_SERVER_REPLICAS", "2"))
+    EMBED_SERVER_TIMEOUT_SEC = float(os.getenv("EMBED_SERVER_TIMEOUT_SEC", "30"))
+    EMBED_SERVER_FALLBACK_LOCAL = _env_bool("EMBED_SERVER_FALLBACK_LOCAL", False)
+    # Постоянное хранилище эмбеддингов каталога (ключ: модель, префикс, хэш текста)
+    EMBEDDING_STORE_ENABLED = _env_bool("EMBEDDING_STORE_ENABLED", True)
+    EMBEDDING_STORE_DIR = Path(os.getenv("EMBEDDING_STORE_DIR", str(_PROJECT_DIR / "data" / "embedding_store")))
+    # LRU-кэш эмбеддингов запросов: лимит памяти на модель (0 — выключен), каталог для сохранения ("" — без диска)
+    QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "64"))
+    QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", "")
     RAG_TOP_K = int(os.getenv("RAG_TOP_K", "20"))
     RAG_SCORE_THRESHOLD = float(os.getenv("RAG_SCORE_THRESHOLD", "0.35"))
 
     # NLP: маппинг «свой навык» → канонический
+    # Кэши лемматизации (LRU): слова и целые фразы; прогрев словарём каталога при старте API
+    LEMMA_WORD_CACHE_SIZE = int(os.getenv("LEMMA_WORD_CACHE_SIZE", "50000"))
+    LEMMA_PHRASE_CACHE_SIZE = int(os.getenv("LEMMA_PHRASE_CACHE_SIZE", "20000"))
+    LEMMA_WARMUP_ON_STARTUP = _env_bool("LEMMA_WARMUP_ON_STARTUP", False)
     SKILL_MAP_SIMILARITY_THRESHOLD = float(os.getenv("SKILL_MAP_SIMILARITY_THRESHOLD", "0.72"))
     # Семантический мэтчинг навыков при gap-анализе
     SKILL_MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.72"))
+    # greedy — пары по убыванию сходства; optimal — максимум суммы сходства (венгерский алгоритм, scipy)
+    SKILL_MATCH_MODE = os.getenv("SKILL_MATCH_MODE", "greedy").strip().lower()
     SKILL_SUGGESTIONS_TOP_K = int(os.getenv("SKILL_SUGGESTIONS_TOP_K", "5"))
     SUGGESTIONS_MIN_SCORE = float(os.getenv("SUGGESTIONS_MIN_SCORE", "0.35"))
 
     # Explore: семантика в explore_opportunities (E5-large на каждую роль×грейд очень медленно)
-    EXPLORE_FAST_EMBEDDINGS = _env_bool("EXPLORE_FAST_EMBEDDINGS", True)
+    # С ускоренным бэкендом (int8/onnx) по умолчанию explore считает на E5
+    EXPLORE_FAST_EMBEDDINGS = _env_bool("EXPLORE_FAST_EMBEDDINGS", EMBED_BACKEND.strip().lower() == "torch")
     # Уже есть semantic_score из explore_opportunities; повторный rank_opportunities — лишний прогон энкодера
     EXPLORE_SKIP_SECOND_RANK = _env_bool("EXPLORE_SKIP_SECOND_RANK", True)
 
@@ -105,5 +164,15 @@ class Config:
     # Explore: фокусный план по выбранным gap-навыкам (мин/макс)
     EXPLORE_PLAN_MIN_SELECTED_SKILLS = int(os.getenv("EXPLORE_PLAN_MIN_SELECTED_SKILLS", "4"))
     EXPLORE_PLAN_MAX_SELECTED_SKILLS = int(os.getenv("EXPLORE_PLAN_MAX_SELECTED_SKILLS", "10"))
+    # HR: командный gap-анализ (POST /api/hr/team-gap) — лимит профилей и размер чанка
+    TEAM_GAP_MAX_PROFILES = int(os.getenv("TEAM_GAP_MAX_PROFILES", "2000"))
+    TEAM_GAP_CHUNK_SIZE = int(os.getenv("TEAM_GAP_CHUNK_SIZE", "64"))
+    # include_plan — LLM-вызов на профиль: отдельный небольшой лимит; запросов на пользователя за окно
+    TEAM_GAP_MAX_PLAN_PROFILES = int(os.getenv("TEAM_GAP_MAX_PLAN_PROFILES", "20"))
+    TEAM_GAP_RATE_LIMIT = int(os.getenv("TEAM_GAP_RATE_LIMIT", "10"))
+    TEAM_GAP_RATE_LIMIT_WINDOW_SEC = int(os.getenv("TEAM_GAP_RATE_LIMIT_WINDOW_SEC", "60"))
+    # What-if сессии (инкрементальный пересчёт при изменении одного навыка)
+    WHATIF_SESSION_TTL_SEC = int(os.getenv("WHATIF_SESSION_TTL_SEC", "1800"))
+    WHATIF_MAX_SESSIONS = int(os.getenv("WHATIF_MAX_SESSIONS", "500"))
 
     LEVEL_MAP = {1: "Basic", 2: "Proficiency", 3: "Advanced"}
@@ -54,32 +54,166 @@ def _to_display_role_name(internal_name):
     return s
 
 
+def _skill_professions(skill):
+    professions = (
+        skill.get('Профессия (лист)') or
+        skill.get('Профессия') or
+        skill.get('Привязка к профессии') or
+        []
+    )
+    if isinstance(professions, str):
+        professions = [professions]
+    return professions
+
+
+def _build_role_index(skills, display_to_internals):
+    """Инвертированный индекс роль → навыки (и роль → категория → навыки).
+
+    Позиции записей clean_skills.json по каждой профессии, затем готовые кортежи имён
+    для каждого ключа, который принимают get_role_requirements / get_skills_for_role
+    (внутреннее и отображаемое имя). Порядок навыков совпадает с порядком в каталоге,
+    как при полном проходе."""
+    positions: dict[str, list[int]] = {}
+    for idx, skill in enumerate(skills):
+        for prof in _skill_professions(skill):
+            bucket = positions.setdefault(prof, [])
+            if not bucket or bucket[-1] != idx:
+                bucket.append(idx)
+
+    role_skills: dict[str, tuple] = {}
+    role_skills_grouped: dict[str, list] = {}
+    for key in set(positions) | set(display_to_internals):
+        internals = display_to_internals.get(key, [key])
+        merged = sorted({p for internal in internals for p in positions.get(internal, ())})
+        names = []
+        seen = set()
+        grouped: dict[str, set[str]] = {}
+        for p in merged:
+            skill = skills[p]
+            skill_name = skill.get('Навык') or skill.get('name')
+            if skill_name not in seen:
+                seen.add(skill_name)
+                names.append(skill_name)
+            clean_name = (skill_name or "").strip()
+            if clean_name:
+                category = (skill.get('Категория') or "").strip() or "Без категории"
+                grouped.setdefault(category, set()).add(clean_name)
+        role_skills[key] = tuple(names)
+        role_skills_grouped[key] = [
+            {"name": category, "skills": sorted(grouped[category])}
+            for category in sorted(grouped.keys())
+        ]
+    return positions, role_skills, role_skills_grouped
+
+
+def _build_skill_rows(skills):
+    """Уникальные (без учёта регистра) канонические навыки: [{"name", "profession"}] для lexical-поиска."""
+    out = []
+    seen = set()
+    for s in skills:
+        name = (s.get("Навык") or s.get("name") or "").strip()
+        if not name:
+            continue
+        key = name.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        profession = s.get("Профессия (лист)") or s.get("Профессия") or s.get("Привязка к профессии") or ""
+        if isinstance(profession, list):
+            profession = profession[0] if profession else ""
+        out.append({"name": name, "profession": str(profession or "")})
+    return out
+
+
+def build_reference_tables(skills, atlas_params):
+    """Все производные таблицы справочника из сырых clean_skills.json / atlas_params_clean.json.
+
+    Результат — обычный dict: его же сериализует reference_snapshot (compile-шаг),
+    поэтому DataLoader одинаково работает и от снапшота, и от JSON."""
+    skills_map = {s.get('Навык') or s.get('name'): s for s in skills}
+    atlas_map = {a.get('Параметр') or a.get('Parameter'): a for a in atlas_params}
+
+    internal_roles = set()
+    for skill in skills:
+        prof = skill.get('Профессия (лист)') or skill.get('Профессия') or skill.get('Привязка к профессии')
+        if isinstance(prof, str):
+            internal_roles.add(prof)
+    internal_to_display = {internal: _to_display_role_name(internal) for internal in internal_roles}
+    display_to_internals: dict[str, list[str]] = {}
+    for internal, disp in internal_to_display.items():
+        display_to_internals.setdefault(disp, []).append(internal)
+    display_to_internal = {disp: internals[0] for disp, internals in display_to_internals.items()}
+
+    positions, role_skills, role_skills_grouped = _build_role_index(skills, display_to_internals)
+    atlas_param_names = [
+        a.get('Параметр') or a.get('Parameter')
+        for a in atlas_params
+        if a.get('Параметр') or a.get('Parameter')
+    ]
+    from requirement_matrix import build_requirement_matrix
+    requirement_matrix = build_requirement_matrix(
+        role_skills, atlas_param_names, GRADE_TO_SKILL_LEVEL, GRADE_TO_PARAM_ORDINAL
+    )
+    return {
+        "skills": skills,
+        "atlas_params": atlas_params,
+        "skills_map": skills_map,
+        "atlas_map": atlas_map,
+        "internal_to_display": internal_to_display,
+        "display_to_internals": display_to_internals,
+        "display_to_internal": display_to_internal,
+        "atlas_param_names": atlas_param_names,
+        "role_skill_positions": positions,
+        "role_skills": role_skills,
+        "role_skills_grouped": role_skills_grouped,
+        "canonical_skill_names": sorted(
+            {str(n).strip() for n in (s.get("Навык") or s.get("name") for s in skills) if n}
+        ),
+        "skill_rows": _build_skill_rows(skills),
+        "requirement_matrix": requirement_matrix,
+    }
+
+
+def _load_json(path):
+    path = Path(path)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent / path
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_reference_tables():
+    """Таблицы справочника: из скомпилированного снапшота, если он актуален, иначе из JSON."""
+    try:
+        from reference_snapshot import load_snapshot
+        tables = load_snapshot()
+    except Exception:
+        tables = None
+    if tables is not None:
+        return tables
+    return build_reference_tables(_load_json(Config.SKILLS_FILE), _load_json(Config.ATLAS_FILE))
+
+
 class DataLoader:
-    def __init__(self):
-        self.skills = self._load_json(Config.SKILLS_FILE)
-        self.atlas_params = self._load_json(Config.ATLAS_FILE)
-
-        self.skills_map = {s.get('Навык') or s.get('name'): s for s in self.skills}
-        self.atlas_map = {a.get('Параметр') or a.get('Parameter'): a for a in self.atlas_params}
-
-        internal_roles = set()
-        for skill in self.skills:
-            prof = skill.get('Профессия (лист)') or skill.get('Профессия') or skill.get('Привязка к профессии')
-            if isinstance(prof, str):
-                internal_roles.add(prof)
-        self._internal_to_display = {internal: _to_display_role_name(internal) for internal in internal_roles}
-        self._display_to_internals: dict[str, list[str]] = {}
-        for internal, disp in self._internal_to_display.items():
-            self._display_to_internals.setdefault(disp, []).append(internal)
-        self._display_to_internal = {disp: internals[0] for disp, internals in self._display_to_internals.items()}
-
-    @staticmethod
-    def _load_json(path):
-        path = Path(path)
-        if not path.is_absolute():
-            path = Path(__file__).resolve().parent / path
-        with open(path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    def __init__(self, tables=None):
+        if tables is None:
+            tables = load_reference_tables()
+        self.skills = tables["skills"]
+        self.atlas_params = tables["atlas_params"]
+
+        self.skills_map = tables["skills_map"]
+        self.atlas_map = tables["atlas_map"]
+
+        self._internal_to_display = tables["internal_to_display"]
+        self._display_to_internals: dict[str, list[str]] = tables["display_to_internals"]
+        self._display_to_internal = tables["display_to_internal"]
+
+        self._atlas_param_names = tables["atlas_param_names"]
+        self._role_skill_positions = tables["role_skill_positions"]
+        self._role_skills: dict[str, tuple] = tables["role_skills"]
+        self._role_skills_grouped: dict[str, list] = tables["role_skills_grouped"]
+        # int-id навыков/ролей и матрица роль × грейд × элемент (requirement_matrix.RequirementMatrix)
+        self.requirement_matrix = tables["requirement_matrix"]
 
     def get_role_requirements(self, role_name, grade):
         """Требования роли для заданного грейда.
@@ -91,27 +225,11 @@ class DataLoader:
         skill_level = GRADE_TO_SKILL_LEVEL.get(grade, 2)
         param_ordinal = GRADE_TO_PARAM_ORDINAL.get(grade, 2)
 
-        role_set = {role_name}
-        if role_name in self._display_to_internals:
-            role_set = set(self._display_to_internals[role_name])
+        for skill_name in self._role_skills.get(role_name, ()):
+            requirements[skill_name] = skill_level
 
-        for skill in self.skills:
-            skill_name = skill.get('Навык') or skill.get('name')
-            professions = (
-                skill.get('Профессия (лист)') or
-                skill.get('Профессия') or
-                skill.get('Привязка к профессии') or
-                []
-            )
-            if isinstance(professions, str):
-                professions = [professions]
-            if role_set & set(professions):
-                requirements[skill_name] = skill_level
-
-        for param in self.atlas_params:
-            param_name = param.get('Параметр') or param.get('Parameter')
-            if param_name:
-                requirements[param_name] = param_ordinal
+        for param_name in self._atlas_param_names:
+            requirements[param_name] = param_ordinal
 
         return requirements
 
@@ -128,25 +246,16 @@ class DataLoader:
             return []
         return self._display_to_internals.get(display_name.strip(), [display_name])
 
+    def _role_index_key(self, role_name):
+        """Ключ индекса для отображаемого имени (после strip) или внутреннего имени как есть."""
+        key = role_name.strip()
+        return key if key in self._display_to_internals else role_name
+
     def get_skills_for_role(self, role_name):
         internals = self.get_internal_role_names(role_name) if role_name else []
         if not internals:
             return []
-        internal_set = set(internals)
-        skill_names = set()
-        for skill in self.skills:
-            skill_name = skill.get('Навык') or skill.get('name')
-            professions = (
-                skill.get('Профессия (лист)') or
-                skill.get('Профессия') or
-                skill.get('Привязка к профессии') or
-                []
-            )
-            if isinstance(professions, str):
-                professions = [professions]
-            if internal_set & set(professions):
-                skill_names.add(skill_name)
-        return sorted(skill_names)
+        return sorted(set(self._role_skills.get(self._role_index_key(role_name), ())))
 
     def get_skills_for_role_grouped(self, role_name):
         """
@@ -161,38 +270,10 @@ class DataLoader:
         if not internals:
             return []
 
-        internal_set = set(internals)
-        grouped: dict[str, set[str]] = {}
-        uncategorized = "Без категории"
-
-        for skill in self.skills:
-            skill_name = (skill.get('Навык') or skill.get('name') or "").strip()
-            if not skill_name:
-                continue
-
-            professions = (
-                skill.get('Профессия (лист)') or
-                skill.get('Профессия') or
-                skill.get('Привязка к профессии') or
-                []
-            )
-            if isinstance(professions, str):
-                professions = [professions]
-            if not (internal_set & set(professions)):
-                continue
-
-            category = (skill.get('Категория') or "").strip() or uncategorized
-            grouped.setdefault(category, set()).add(skill_name)
-
-        out = []
-        for category in sorted(grouped.keys()):
-            out.append(
-                {
-                    "name": category,
-                    "skills": sorted(grouped[category]),
-                }
-            )
-        return out
+        return [
+            {"name": g["name"], "skills": list(g["skills"])}
+            for g in self._role_skills_grouped.get(self._role_index_key(role_name), [])
+        ]
 
     def get_skills_by_category_for_role(self, role_name):
         """Совместимый алиас для API-слоя."""
@@ -0,0 +1,153 @@
+"""Ускоренные CPU-бэкенды эмбеддингов для _get_embedder: ONNX Runtime и динамический int8.
+
+EMBED_BACKEND:
+    torch  — SentenceTransformer как есть (по умолчанию);
+    int8   — тот же SentenceTransformer, Linear-слои квантованы torch.quantization.quantize_dynamic;
+    onnx   — модель, экспортированная scripts/export_onnx_embedders.py (fp32 или int8 .onnx),
+             токенизатор transformers + mean pooling в NumPy.
+
+Ускоренный бэкенд включается только после проверки паритета: на контрольной выборке
+текстов каталога минимальный косинус с эталонными векторами должен быть не ниже
+EMBED_PARITY_MIN_COSINE. Эталон для onnx сохраняется при экспорте (parity.npz), для
+int8 считается исходной моделью в процессе. Не прошёл проверку или нет зависимостей —
+остаётся SentenceTransformer.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+PARITY_FILE = "parity.npz"
+META_FILE = "meta.json"
+
+
+def model_slug(model_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "__", model_name).strip("_") or "model"
+
+
+def onnx_model_dir(model_name: str) -> Path:
+    return Path(Config.EMBED_ONNX_DIR) / model_slug(model_name)
+
+
+def _mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def _l2_normalize(m: np.ndarray) -> np.ndarray:
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+
+
+class OnnxSentenceEncoder:
+    """Минимальная замена SentenceTransformer.encode поверх onnxruntime (mean pooling)."""
+
+    def __init__(self, model_dir: Path, quantized: bool = True, batch_size: int = 32):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        meta_path = model_dir / META_FILE
+        meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path.is_file() else {}
+        self.max_seq_length = int(meta.get("max_seq_length", 512))
+        self.batch_size = batch_size
+        path = model_dir / (ONNX_INT8_FILE if quantized and (model_dir / ONNX_INT8_FILE).is_file() else ONNX_FILE)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(model_dir))
+
+    def encode(self, texts: Sequence[str], normalize_embeddings: bool = True, show_progress_bar: bool = False, **_):
+        texts = list(texts)
+        out: List[np.ndarray] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            tokens = self.tokenizer(
+                batch, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+            )
+            feed = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+            token_embeddings = self.session.run(None, feed)[0]
+            out.append(_mean_pool(token_embeddings, tokens["attention_mask"]))
+        if not out:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = np.vstack(out).astype(np.float32)
+        return _l2_normalize(vectors) if normalize_embeddings else vectors
+
+
+def quantize_int8(model: Any) -> Any:
+    """Копия SentenceTransformer с динамически квантованными (int8) Linear-слоями."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=False)
+
+
+def parity_texts(limit: Optional[int] = None) -> List[str]:
+    """Контрольная выборка для паритета: названия навыков каталога (детерминированный порядок)."""
+    limit = limit or Config.EMBED_PARITY_SAMPLE
+    try:
+        from reference_data import get_reference_data
+        names = sorted(get_reference_data().canonical_names)
+    except Exception:
+        names = []
+    return names[:limit] or ["Python", "SQL", "Управление проектами", "Коммуникация"]
+
+
+def parity_min_cosine(candidate: Any, texts: Sequence[str], reference: np.ndarray) -> float:
+    vecs = _l2_normalize(np.asarray(candidate.encode(list(texts), normalize_embeddings=True), dtype=np.float32))
+    ref = _l2_normalize(np.asarray(reference, dtype=np.float32))
+    return float(np.min(np.sum(vecs * ref, axis=1)))
+
+
+def _reference_for_onnx(model_dir: Path) -> Optional[Tuple[List[str], np.ndarray]]:
+    path = model_dir / PARITY_FILE
+    if not path.is_file():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return [str(t) for t in data["texts"]], data["vectors"]
+
+
+def load_embedder(model_name: str, load_reference: Callable[[str], Any]) -> Tuple[Any, str]:
+    """Эмбеддер для model_name по EMBED_BACKEND с проверкой паритета. Возвращает (эмбеддер, бэкенд).
+
+    load_reference(model_name) загружает эталонный SentenceTransformer (нужен для int8
+    и как fallback)."""
+    backend = (Config.EMBED_BACKEND or "torch").strip().lower()
+    min_cos = Config.EMBED_PARITY_MIN_COSINE
+
+    if backend == "onnx":
+        model_dir = onnx_model_dir(model_name)
+        try:
+            reference = _reference_for_onnx(model_dir)
+            if reference is None:
+                raise RuntimeError(f"нет {PARITY_FILE} в {model_dir} (запустите scripts/export_onnx_embedders.py)")
+            candidate = OnnxSentenceEncoder(model_dir, quantized=Config.EMBED_ONNX_INT8)
+            score = parity_min_cosine(candidate, reference[0], reference[1])
+            if score >= min_cos:
+                print(f"✅ {model_name}: ONNX-бэкенд (паритет {score:.4f})")
+                return candidate, "onnx"
+            print(f"⚠️ {model_name}: ONNX не прошёл паритет ({score:.4f} < {min_cos}), используется torch")
+        except Exception as e:
+            print(f"⚠️ {model_name}: ONNX-бэкенд недоступен ({e}), используется torch")
+        return load_reference(model_name), "torch"
+
+    reference_model = load_reference(model_name)
+    if backend == "int8":
+        try:
+            candidate = quantize_int8(reference_model)
+            texts = parity_texts()
+            ref_vecs = reference_model.encode(texts, normalize_embeddings=True)
+            score = parity_min_cosine(candidate, texts, ref_vecs)
+            if score >= min_cos:
+                print(f"✅ {model_name}: int8-бэкенд (паритет {score:.4f})")
+                return candidate, "int8"
+            print(f"⚠️ {model_name}: int8 не прошёл паритет ({score:.4f} < {min_cos}), используется torch")
+        except Exception as e:
+            print(f"⚠️ {model_name}: int8-квантование недоступно ({e}), используется torch")
+    return reference_model, "torch"
@@ -0,0 +1,182 @@
+"""Отдельный процесс-сервер эмбеддингов: модели живут вне API-воркеров.
+
+Запуск:
+    python3 embedding_server.py --replicas 2 --address unix:/tmp/career-embed.sock
+    python3 embedding_server.py --address 127.0.0.1:7070
+
+API-воркеры с EMBED_SERVER_ADDRESS отправляют сюда батчи из _encode_texts (после
+micro-batching в encoder_service) и не загружают модели сами. Сервер — pre-fork:
+родитель открывает сокет и запускает N реплик (EMBED_SERVER_REPLICAS), каждая со своей
+копией моделей (бэкенд по EMBED_BACKEND); реплики сами принимают соединения.
+Одно соединение — один запрос, поэтому занятая реплика не держит клиентов.
+
+Протокол: 4 байта длины (big-endian) + JSON-заголовок; ответ — такой же заголовок
+{"ok": true, "shape": [n, d]} и n*d float32 (little-endian) либо {"ok": false, "error": ...}.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+from config import Config  # noqa: E402
+
+_LEN = struct.Struct(">I")
+_MAX_HEADER = 64 * 1024 * 1024
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """Адрес "unix:/path.sock" -> (AF_UNIX, path), "host:port" -> (AF_INET, (host, port))."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    chunks = []
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise ConnectionError("соединение закрыто")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_header(sock: socket.socket, header: Dict[str, Any]) -> None:
+    raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_LEN.pack(len(raw)) + raw)
+
+
+def _recv_header(sock: socket.socket) -> Dict[str, Any]:
+    (size,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+    if size > _MAX_HEADER:
+        raise ValueError(f"слишком большой заголовок: {size}")
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+# --- клиент ---
+
+
+def remote_encode(
+    address: str, model: str, texts: List[str], normalize: bool = True, timeout: Optional[float] = None
+) -> np.ndarray:
+    """Эмбеддинги texts от сервера. Ошибка сервера -> RuntimeError, недоступность -> OSError."""
+    family, target = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout if timeout is not None else Config.EMBED_SERVER_TIMEOUT_SEC)
+        sock.connect(target)
+        _send_header(sock, {"op": "encode", "model": model, "normalize": normalize, "texts": list(texts)})
+        header = _recv_header(sock)
+        if not header.get("ok"):
+            raise RuntimeError(f"Сервер эмбеддингов: {header.get('error')}")
+        n, d = header["shape"]
+        raw = _recv_exact(sock, n * d * 4)
+    return np.frombuffer(raw, dtype="<f4").reshape(n, d)
+
+
+# --- сервер ---
+
+
+def _handle(conn: socket.socket) -> None:
+    from rag_service import _get_embedder, embedder_backends
+    try:
+        request = _recv_header(conn)
+        if request.get("op") == "ping":
+            _send_header(conn, {"ok": True, "pid": os.getpid(), "models": embedder_backends()})
+            return
+        texts = list(request["texts"])
+        normalize = bool(request.get("normalize", True))
+        embedder = _get_embedder(model_name=request["model"])
+        vectors = np.asarray(embedder.encode(texts, normalize_embeddings=normalize), dtype="<f4")
+        vectors = np.ascontiguousarray(vectors.reshape(len(texts), -1))
+        _send_header(conn, {"ok": True, "shape": list(vectors.shape)})
+        conn.sendall(vectors.tobytes())
+    except Exception as e:
+        try:
+            _send_header(conn, {"ok": False, "error": str(e)})
+        except OSError:
+            pass
+
+
+def _replica_loop(listener: socket.socket, preload: List[str]) -> None:
+    """Реплика: свои копии моделей, запросы по одному (encode в одном потоке — без блокировок)."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    from rag_service import _get_embedder
+    for model in preload:
+        try:
+            _get_embedder(model_name=model)
+        except Exception as e:
+            print(f"⚠️ [{os.getpid()}] {e}", file=sys.stderr)
+    while True:
+        conn, _ = listener.accept()
+        with conn:
+            conn.settimeout(Config.EMBED_SERVER_TIMEOUT_SEC)
+            _handle(conn)
+
+
+def serve(address: str, replicas: int, preload: Optional[List[str]] = None) -> None:
+    """Открывает сокет и держит replicas процессов-реплик (упавшая реплика перезапускается)."""
+    import multiprocessing as mp
+
+    family, target = parse_address(address)
+    if family == socket.AF_UNIX and os.path.exists(target):
+        os.unlink(target)
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    if family == socket.AF_INET:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(target)
+    listener.listen(128)
+
+    ctx = mp.get_context("fork")
+
+    def _start():
+        p = ctx.Process(target=_replica_loop, args=(listener, preload or []), daemon=True)
+        p.start()
+        return p
+
+    procs = [_start() for _ in range(max(1, replicas))]
+    print(f"✅ Сервер эмбеддингов {address}: реплик {len(procs)}")
+    try:
+        while True:
+            for i, p in enumerate(procs):
+                p.join(timeout=1.0)
+                if not p.is_alive():
+                    print(f"⚠️ Реплика {p.pid} завершилась (код {p.exitcode}), перезапуск", file=sys.stderr)
+                    procs[i] = _start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        listener.close()
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.unlink(target)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Сервер эмбеддингов (вне процесса API)")
+    parser.add_argument("--address", default=Config.EMBED_SERVER_ADDRESS or "unix:/tmp/career-embed.sock")
+    parser.add_argument("--replicas", type=int, default=Config.EMBED_SERVER_REPLICAS)
+    parser.add_argument("--no-preload", action="store_true", help="Загружать модели при первом запросе")
+    args = parser.parse_args(argv)
+    preload = [] if args.no_preload else [Config.EMBED_MODEL_NAME, Config.EMBED_MODEL_NAME_V2]
+    serve(args.address, args.replicas, preload)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
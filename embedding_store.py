@@ -0,0 +1,192 @@
+"""Постоянное хранилище эмбеддингов каталога: пережимает рестарт процесса.
+
+Ключ — (модель, префикс промпта, хэш текста). Модель — пространство векторов из
+rag_service._embedding_namespace: имя модели плюс бэкенд, если он не torch
+(«<модель>@int8», «<модель>@onnx»). На каждую модель — каталог EMBEDDING_STORE_DIR/<модель>/:
+
+    index.jsonl        строки {"k": ключ, "s": шард, "r": строка} (только дописывание)
+    shard-<id>.npy     float32-матрица векторов одной записи put_many
+
+Шарды неизменяемы и открываются через mmap; индекс читается инкрементально
+(с последнего прочитанного смещения), поэтому вектора, посчитанные одним воркером,
+сразу видны остальным. Ошибки записи (read-only FS и т.п.) не ломают вызывающий код —
+вектора просто не сохраняются.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+_INDEX = "index.jsonl"
+
+
+def text_key(prefix: str, text: str) -> str:
+    return hashlib.sha256(f"{prefix}\x00{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def _slug(model_name: str, normalize: bool) -> str:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "__", model_name).strip("_") or "model"
+    return slug if normalize else f"{slug}--raw"
+
+
+class _ModelSpace:
+    """Вектора одной модели: индекс ключ -> (шард, строка) и открытые шарды."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index: Dict[str, Tuple[str, int]] = {}
+        self.shards: Dict[str, np.ndarray] = {}
+        self._offset = 0
+
+    def refresh(self) -> None:
+        index_path = self.path / _INDEX
+        try:
+            size = index_path.stat().st_size
+        except OSError:
+            return
+        if size <= self._offset:
+            return
+        with open(index_path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # последняя строка может быть недописана другим процессом — дочитаем в следующий раз
+        complete = chunk[: chunk.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                row = json.loads(line)
+                self.index[row["k"]] = (row["s"], int(row["r"]))
+            except (ValueError, KeyError):
+                continue
+        self._offset += len(complete)
+
+    def vector(self, key: str) -> Optional[np.ndarray]:
+        loc = self.index.get(key)
+        if loc is None:
+            return None
+        shard, row = loc
+        matrix = self.shards.get(shard)
+        if matrix is None:
+            try:
+                matrix = np.load(self.path / shard, mmap_mode="r")
+            except (OSError, ValueError):
+                return None
+            self.shards[shard] = matrix
+        return matrix[row]
+
+
+class EmbeddingStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self._spaces: Dict[str, _ModelSpace] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _space(self, model_name: str, normalize: bool) -> _ModelSpace:
+        slug = _slug(model_name, normalize)
+        space = self._spaces.get(slug)
+        if space is None:
+            space = _ModelSpace(self.root / slug)
+            self._spaces[slug] = space
+        space.refresh()
+        return space
+
+    def get_many(
+        self, model_name: str, prefix: str, texts: Sequence[str], normalize: bool = True
+    ) -> List[Optional[np.ndarray]]:
+        """Вектора из хранилища в порядке texts; None — нет в хранилище."""
+        with self._lock:
+            space = self._space(model_name, normalize)
+            out = [space.vector(text_key(prefix, t)) for t in texts]
+            found = sum(v is not None for v in out)
+            self.hits += found
+            self.misses += len(out) - found
+            return out
+
+    def put_many(
+        self, model_name: str, prefix: str, texts: Sequence[str], vectors: Any, normalize: bool = True
+    ) -> int:
+        """Дописывает новые вектора (уже сохранённые ключи пропускаются). Возвращает число записанных."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            space = self._space(model_name, normalize)
+            rows: Dict[str, int] = {}
+            for i, t in enumerate(texts):
+                key = text_key(prefix, t)
+                if key not in space.index and key not in rows:
+                    rows[key] = i
+            if not rows:
+                return 0
+            shard = f"shard-{uuid.uuid4().hex[:12]}.npy"
+            try:
+                space.path.mkdir(parents=True, exist_ok=True)
+                tmp = space.path / (shard + ".tmp")
+                with open(tmp, "wb") as f:
+                    np.save(f, vectors[list(rows.values())])
+                os.replace(tmp, space.path / shard)
+                lines = "".join(
+                    json.dumps({"k": key, "s": shard, "r": r}) + "\n" for r, key in enumerate(rows)
+                )
+                with open(space.path / _INDEX, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            except OSError:
+                return 0
+            return len(rows)
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        model_name: str,
+        prefix: str,
+        encode_fn: Callable[[List[str]], Any],
+        normalize: bool = True,
+        resolve_model: Optional[Callable[[], str]] = None,
+    ) -> np.ndarray:
+        """Вектора для texts: из хранилища, недостающие — через encode_fn(prefix + text) с дозаписью.
+        resolve_model() — пространство, в которое писать после encode_fn (бэкенд модели
+        становится известен только после её загрузки)."""
+        texts = list(texts)
+        found = self.get_many(model_name, prefix, texts, normalize)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, found) if v is None))
+        if missing:
+            fresh = np.asarray(encode_fn([prefix + t for t in missing]), dtype=np.float32)
+            written_as = resolve_model() if resolve_model is not None else model_name
+            self.put_many(written_as, prefix, missing, fresh, normalize)
+            by_text = dict(zip(missing, fresh))
+            found = [v if v is not None else by_text[t] for t, v in zip(texts, found)]
+        if not found:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([np.asarray(v, dtype=np.float32) for v in found])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": {slug: len(space.index) for slug, space in self._spaces.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """Процессное хранилище по Config.EMBEDDING_STORE_DIR; None, если выключено."""
+    global _store
+    if not Config.EMBEDDING_STORE_ENABLED:
+        return None
+    root = Path(Config.EMBEDDING_STORE_DIR)
+    with _store_lock:
+        if _store is None or _store.root != root:
+            _store = EmbeddingStore(root)
+        return _store
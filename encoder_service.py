@@ -0,0 +1,152 @@
+"""Динамический micro-batching для энкодера эмбеддингов.
+
+Каждый вызов кладёт свои тексты в очередь модели и ждёт future. Рабочий поток модели
+забирает всё, что накопилось за ENCODER_MAX_WAIT_MS (но не больше ENCODER_MAX_BATCH
+текстов), делает один encode и раздаёт строки результата вызывающим: одиночные запросы
+параллельных клиентов склеиваются в батч. С сервером эмбеддингов рабочих потоков несколько
+(по одному на реплику EMBED_SERVER_REPLICAS) и они ходят на сервер параллельно; encode модели
+в процессе (в том числе fallback с этих потоков) сериализуется rag_service._encode_lock.
+
+encode_fn очереди задаётся первым вызовом для ключа и живёт до конца процесса, поэтому
+должна зависеть только от ключа (модель, normalize), а не от параметров вызова.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+
+
+class _ModelQueue:
+    def __init__(
+        self, name: str, encode_fn: Callable[[List[str]], Any], max_batch: int, max_wait_sec: float, workers: int = 1
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait_sec = max(0.0, max_wait_sec)
+        self._pending: Deque[Tuple[List[str], Future]] = deque()
+        self._pending_texts = 0
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+        # несколько рабочих потоков — только для внешнего сервера эмбеддингов (по потоку на реплику)
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"encoder-{name}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((texts, future))
+            self._pending_texts += len(texts)
+            self._cond.notify()
+        return future
+
+    def _take_batch(self) -> List[Tuple[List[str], Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait_sec
+            while self._pending_texts < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch: List[Tuple[List[str], Future]] = []
+            size = 0
+            # запрос больше max_batch идёт отдельным батчем целиком
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                texts, future = self._pending.popleft()
+                batch.append((texts, future))
+                size += len(texts)
+            self._pending_texts -= size
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._take_batch()
+            flat = [t for texts, _ in batch for t in texts]
+            try:
+                vectors = np.asarray(self.encode_fn(flat))
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._cond:
+                self.batches += 1
+                self.texts += len(flat)
+                self.largest_batch = max(self.largest_batch, len(flat))
+            start = 0
+            for texts, future in batch:
+                future.set_result(vectors[start:start + len(texts)])
+                start += len(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queue_requests": len(self._pending),
+                "queue_texts": self._pending_texts,
+                "batches": self.batches,
+                "texts": self.texts,
+                "avg_batch": round(self.texts / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+            }
+
+
+class BatchingEncoder:
+    """Очереди по ключу модели (имя, normalize); encode() блокирует до готовности своих векторов."""
+
+    def __init__(self, max_batch: int, max_wait_ms: float, workers: int = 1):
+        self.max_batch = max_batch
+        self.max_wait_sec = max_wait_ms / 1000.0
+        self.workers = workers
+        self._queues: Dict[Hashable, _ModelQueue] = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, key: Hashable, encode_fn: Callable[[List[str]], Any]) -> _ModelQueue:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = _ModelQueue(str(key), encode_fn, self.max_batch, self.max_wait_sec, self.workers)
+                self._queues[key] = queue
+            return queue
+
+    def encode(self, key: Hashable, texts: List[str], encode_fn: Callable[[List[str]], Any]) -> np.ndarray:
+        """Вектора для texts. encode_fn(batch) вызывается в рабочем потоке модели key; очередь хранит
+        encode_fn первого вызова для key, поэтому функция не должна зависеть от вызывающего."""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._queue(key, encode_fn).submit(texts).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queues = dict(self._queues)
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_sec * 1000.0,
+            "workers": self.workers,
+            "models": {str(k): q.stats() for k, q in queues.items()},
+        }
+
+
+_encoder: Optional[BatchingEncoder] = None
+_encoder_lock = threading.Lock()
+
+
+def get_batching_encoder() -> BatchingEncoder:
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            workers = max(1, Config.EMBED_SERVER_REPLICAS) if Config.EMBED_SERVER_ADDRESS else 1
+            _encoder = BatchingEncoder(Config.ENCODER_MAX_BATCH, Config.ENCODER_MAX_WAIT_MS, workers)
+        return _encoder
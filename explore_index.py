@@ -0,0 +1,180 @@
+"""Предрасчитанный индекс для explore: все роли × грейды одной матрицей.
+
+Вместо цикла роль × грейд (get_role_requirements, эмбеддинги требований, мэтчинг и
+усреднение векторов роли на каждую пару) индекс хранит:
+
+    vocab / vectors    уникальные навыки из требований и их passage-эмбеддинги (V × d)
+    cols / levels      требования всех сегментов подряд: столбец навыка и требуемый уровень
+    offsets            границы сегментов (роль, грейд) в cols: сегмент s — cols[offsets[s]:offsets[s+1]]
+    centroids          нормированный средний вектор требований каждого сегмента (S × d)
+
+Скоринг пользователя — одно умножение user × vocab, выборка столбцов, мэтчинг пар сразу
+по всем сегментам (skill_matching.match_blocks) и редукции по сегментам (np.add.reduceat). Индекс строится один раз на версию каталога (rag_service).
+"""
+
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from skill_matching import match_blocks
+
+EXPLORE_GRADES = ("Junior", "Middle", "Senior")
+
+
+def _l2_normalize(m: np.ndarray) -> np.ndarray:
+    return m / (np.linalg.norm(m, axis=-1, keepdims=True) + 1e-9)
+
+
+class ExploreIndex:
+    def __init__(
+        self,
+        segments: Sequence[Tuple[str, str, str]],
+        vocab: Sequence[str],
+        cols: np.ndarray,
+        levels: np.ndarray,
+        offsets: np.ndarray,
+        vectors: Optional[np.ndarray],
+    ):
+        # segments: (отображаемое имя роли, внутреннее имя, грейд) в порядке offsets
+        self.segments = list(segments)
+        self.vocab = list(vocab)
+        self.vocab_ids: Dict[str, int] = {name: i for i, name in enumerate(self.vocab)}
+        self.cols = cols
+        self.levels = levels
+        self.offsets = offsets
+        self.sizes = np.diff(offsets)
+        self.labels = [f"{display} ({grade})" for display, _, grade in self.segments]
+        # ранг подписи — последний ключ сортировки (как sorted по x["role"])
+        order = sorted(range(len(self.labels)), key=self.labels.__getitem__)
+        self.label_rank = np.empty(len(order), dtype=np.int64)
+        self.label_rank[order] = np.arange(len(order))
+        self.vectors = None
+        self.centroids = None
+        if vectors is not None and len(self.vocab):
+            self.vectors = np.asarray(vectors, dtype=np.float32)
+            rows = self.vectors[cols]
+            self.centroids = _l2_normalize(np.add.reduceat(rows, offsets[:-1], axis=0) / self.sizes[:, None])
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def _segment_sum(self, values: np.ndarray) -> np.ndarray:
+        """Сумма по сегментам вдоль последней оси (сегменты непустые — reduceat корректен)."""
+        return np.add.reduceat(values, self.offsets[:-1], axis=-1)
+
+    def score(
+        self,
+        user_levels: Mapping[str, Any],
+        user_skill_names: Sequence[str],
+        user_vectors: Any,
+        threshold: float,
+        mode: Optional[str] = None,
+        user_sims: Any = None,
+    ) -> Dict[str, np.ndarray]:
+        """Метрики по всем сегментам: exact, semantic (число пар), match (%), semantic_score.
+
+        Пары навыков подбираются во всех сегментах одним вызовом skill_matching.match_blocks
+        (mode: greedy | optimal). user_sims — готовая матрица user_vectors @ vectors.T (U × V)
+        у вызывающего, который держит строки между вызовами (what-if сессии)."""
+        n_seg = len(self.segments)
+        if n_seg == 0:
+            empty = np.zeros(0, dtype=np.int32)
+            return {"exact": empty, "semantic": empty, "match": empty, "semantic_score": np.zeros(0, dtype=np.float32)}
+        present = np.zeros(len(self.vocab), dtype=bool)
+        user_lvl = np.zeros(len(self.vocab), dtype=np.float32)
+        for name, level in user_levels.items():
+            j = self.vocab_ids.get(name)
+            if j is None:
+                continue
+            present[j] = True
+            user_lvl[j] = _as_float(level)
+        row_present = present[self.cols]
+        exact = self._segment_sum((row_present & (user_lvl[self.cols] >= self.levels)).astype(np.int32))
+
+        semantic = np.zeros(n_seg, dtype=np.int32)
+        profile = np.zeros(n_seg, dtype=np.float32)
+        user_names = list(user_skill_names)
+        if self.vectors is not None and user_names and user_vectors is not None:
+            u_vecs = np.asarray(user_vectors, dtype=np.float32)
+            if u_vecs.shape == (len(user_names), self.vectors.shape[1]):
+                profile = self.centroids @ _l2_normalize(u_vecs.mean(axis=0))
+                sims = u_vecs @ self.vectors.T if user_sims is None else np.asarray(user_sims)  # U × V
+                assignment = match_blocks(sims[:, self.cols], self.offsets, threshold, mode)  # U × N -> N
+                u_lvl = np.asarray([_as_float(user_levels.get(u, 0)) for u in user_names], dtype=np.float32)
+                matched = assignment >= 0
+                counted = matched & ~row_present & (u_lvl[np.where(matched, assignment, 0)] >= self.levels)
+                semantic = self._segment_sum(counted.astype(np.int32))
+
+        combined = np.minimum(exact + semantic, self.sizes)
+        # та же арифметика, что int((combined / total) * 100) в цикле по ролям
+        match = (combined / self.sizes * 100).astype(np.int32)
+        return {"exact": exact, "semantic": semantic, "match": match, "semantic_score": profile}
+
+    def top(self, scores: Mapping[str, np.ndarray], k: int) -> List[int]:
+        """Id сегментов: semantic_score (до 3 знаков) ↓, match ↓, подпись роли ↑; первые k."""
+        n = len(self.segments)
+        if n == 0 or k <= 0:
+            return []
+        sem = np.rint(np.asarray(scores["semantic_score"], dtype=np.float64) * 1000).astype(np.int64) + 1000
+        match = np.asarray(scores["match"], dtype=np.int64)
+        # составной ключ без совпадений: ранги подписей уникальны
+        key = (sem * 101 + match) * n + (n - 1 - self.label_rank)
+        if k < n:
+            idx = np.argpartition(-key, k - 1)[:k]
+        else:
+            idx = np.arange(n)
+        return idx[np.argsort(-key[idx])].tolist()
+
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_explore_index(
+    data_loader: Any,
+    encode_passages: Optional[Callable[[List[str]], Any]] = None,
+    grades: Sequence[str] = EXPLORE_GRADES,
+) -> ExploreIndex:
+    """Индекс по всем ролям каталога. encode_passages(names) — эмбеддинги уникальных навыков;
+    None или ошибка — индекс без семантики (только точные совпадения)."""
+    atlas = getattr(data_loader, "atlas_map", None) or {}
+    segments: List[Tuple[str, str, str]] = []
+    vocab_ids: Dict[str, int] = {}
+    cols: List[int] = []
+    levels: List[float] = []
+    offsets = [0]
+    for role_display in data_loader.get_all_roles():
+        internal = data_loader.get_internal_role_name(role_display)
+        if not internal:
+            continue
+        for grade in grades:
+            reqs = data_loader.get_role_requirements(internal, grade)
+            skill_reqs = [(k, v) for k, v in reqs.items() if k not in atlas]
+            if not skill_reqs:
+                continue
+            for name, level in skill_reqs:
+                cols.append(vocab_ids.setdefault(name, len(vocab_ids)))
+                levels.append(_as_float(level))
+            offsets.append(len(cols))
+            segments.append((role_display, internal, grade))
+
+    vocab = list(vocab_ids)
+    vectors = None
+    if encode_passages is not None and vocab:
+        try:
+            vectors = np.asarray(encode_passages(vocab), dtype=np.float32)
+            if vectors.ndim != 2 or vectors.shape[0] != len(vocab):
+                vectors = None
+        except Exception:
+            vectors = None
+    return ExploreIndex(
+        segments,
+        vocab,
+        np.asarray(cols, dtype=np.int64),
+        np.asarray(levels, dtype=np.float32),
+        np.asarray(offsets, dtype=np.int64),
+        vectors,
+    )
@@ -32,6 +32,79 @@ def _build_semantic_map(user_names: list, required_names: list) -> dict:
         return {}
 
 
+def _build_semantic_maps(pairs: list) -> list:
+    """Семантические маппинги user→required для пачки пар (навыки профиля, требования цели).
+
+    Объединение навыков профилей и объединение требований кодируются по одному разу на батч,
+    дальше semantic_match_skills работает на срезах готовых векторов (тот же жадный мэтчинг)."""
+    empty = [{} for _ in pairs]
+    user_union = list(dict.fromkeys(n for user_names, _ in pairs for n in user_names))
+    req_union = list(dict.fromkeys(n for _, names in pairs for n in names))
+    if not user_union or not req_union:
+        return empty
+    try:
+        import numpy as np
+        from rag_service import (
+            _encode_for_matching,
+            encode_user_skills_query_vectors,
+            semantic_match_skills,
+        )
+        user_vecs = encode_user_skills_query_vectors(user_union)
+        if user_vecs is None:
+            return empty
+        user_vecs = np.asarray(user_vecs)
+        req_vecs = np.asarray(_encode_for_matching(req_union, is_query=False))
+        user_col = {n: i for i, n in enumerate(user_union)}
+        req_col = {n: i for i, n in enumerate(req_union)}
+        return [
+            semantic_match_skills(
+                user_names, names,
+                user_vectors=user_vecs[[user_col[n] for n in user_names]],
+                req_vectors=req_vecs[[req_col[n] for n in names]],
+            ) if user_names and names else {}
+            for user_names, names in pairs
+        ]
+    except Exception:
+        return empty
+
+
+def _normalize_skill_sets(profiles: list, cache: dict = None) -> list:
+    """_normalize_skill_set для пачки профилей: каждое уникальное имя резолвится один раз.
+
+    cache — общий словарь «имя → каноническое» между вызовами (например, чанками одного батча)."""
+    try:
+        from skill_normalizer import resolve_to_canonical, get_canonical_skills_set
+        canonical_set = get_canonical_skills_set()
+    except Exception:
+        return [dict(p or {}) for p in profiles]
+    resolved = cache if cache is not None else {}
+    out = []
+    for user_skills in profiles:
+        normalized = {}
+        for name, level in (user_skills or {}).items():
+            if name not in resolved:
+                try:
+                    resolved[name] = resolve_to_canonical(name, canonical_set) or name
+                except Exception:
+                    resolved[name] = name
+            key = resolved[name]
+            if key not in normalized or level > normalized[key]:
+                normalized[key] = level
+        out.append(normalized)
+    return out
+
+
+def _atlas_gap_why(name: str, atlas_map: dict) -> str:
+    why = ""
+    if name in atlas_map:
+        why = atlas_map[name].get("Описание") or atlas_map[name].get("Description") or ""
+    return why or "Важно для целевого грейда."
+
+
+def _gap_priority(delta) -> int:
+    return 1 if delta >= 2 else (2 if delta >= 1 else 3)
+
+
 def level_display(value: int, is_atlas: bool) -> str:
     if is_atlas:
         return PARAM_ORDINAL_NAMES.get(value, str(value))
@@ -119,14 +192,10 @@ class GapAnalyzer:
             if curr >= req_level:
                 atlas_strong.append({"name": name, "level": curr})
             else:
-                why = ""
-                if name in atlas_map:
-                    desc = (atlas_map[name].get("Описание") or atlas_map[name].get("Description") or "")
-                    why = desc or "Важно для целевого грейда."
                 atlas_gaps.append({
                     "name": name, "current": curr, "required": req_level,
-                    "delta": delta, "priority": 1 if delta >= 2 else (2 if delta >= 1 else 3),
-                    "is_atlas": True, "why": why or "Важно для целевого грейда.",
+                    "delta": delta, "priority": _gap_priority(delta),
+                    "is_atlas": True, "why": _atlas_gap_why(name, atlas_map),
                 })
 
         # Skills (exact + semantic)
@@ -138,7 +207,7 @@ class GapAnalyzer:
             else:
                 skill_gaps.append({
                     "name": name, "current": curr, "required": req_level,
-                    "delta": delta, "priority": 1 if delta >= 2 else (2 if delta >= 1 else 3),
+                    "delta": delta, "priority": _gap_priority(delta),
                     "is_atlas": False,
                 })
 
@@ -153,8 +222,8 @@ class GapAnalyzer:
         # Вес навыка: Stable=2, Trending=3, неизвестно=1.
         skill_weights = {}
         try:
-            from data_loader import DataLoader
-            dl = DataLoader()
+            from reference_data import get_data_loader
+            dl = get_data_loader()
             for s_name in skill_reqs:
                 skill_weights[s_name] = dl.get_skill_weight(s_name)
         except Exception:
@@ -172,15 +241,149 @@ class GapAnalyzer:
         else:
             weighted_match_percent = legacy_match_percent
 
-        return {
-            "match_percent": weighted_match_percent,
-            "match_percent_legacy": legacy_match_percent,
-            "weighted_match_percent": weighted_match_percent,
-            "atlas_gaps": atlas_gaps,
-            "atlas_strong": atlas_strong,
-            "skill_gaps": skill_gaps,
-            "skill_strong": skill_strong,
-            "missing": [(g["name"], g["required"]) for g in atlas_gaps + skill_gaps if g["current"] == 0],
-            "gaps": [(g["name"], g["current"], g["required"]) for g in atlas_gaps + skill_gaps if g["current"] > 0],
-            "strong": [(s["name"], s["level"]) for s in atlas_strong + skill_strong],
-        }
+        return _structured_result(
+            weighted_match_percent, legacy_match_percent,
+            atlas_gaps, atlas_strong, skill_gaps, skill_strong,
+        )
+
+    @staticmethod
+    def analyze_structured_batch(user_skills, targets, data_loader=None):
+        """analyze_structured для одного профиля и N целей (роль, грейд) за один проход.
+
+        Нормализация и эмбеддинги профиля/требований — один раз на батч; уровни, закрытые
+        навыки и взвешенный match% считаются матрично по всем целям (requirement_matrix).
+        Возвращает список результатов в порядке targets; каждый совпадает с analyze_structured
+        для get_role_requirements(роль, грейд) и дополнен полями role / grade."""
+        targets = [tuple(t) for t in targets]
+        if not targets:
+            return []
+        norm = _normalize_skill_set(user_skills)
+        return _analyze_rows([(norm, role, grade) for role, grade in targets], data_loader)
+
+    @staticmethod
+    def analyze_profiles_batch(profiles, role, grade, data_loader=None, name_cache=None):
+        """analyze_structured для N профилей против одной цели (роль, грейд) — командный срез.
+
+        Имена навыков нормализуются один раз на батч, навыки всех профилей и требования роли
+        кодируются одним прогоном энкодера. Результаты — в порядке profiles."""
+        if not profiles:
+            return []
+        norms = _normalize_skill_sets(list(profiles), cache=name_cache)
+        return _analyze_rows([(norm, role, grade) for norm in norms], data_loader)
+
+
+def _analyze_rows(rows, data_loader=None, sem_maps=None):
+    """Ядро batch-анализа: строки (нормализованный профиль, роль, грейд) → результаты analyze_structured.
+
+    Требуемые и фактические уровни собираются в матрицы строки × элементы requirement_matrix,
+    закрытые навыки и взвешенный match% считаются векторно; Python-цикл только раскладывает
+    результат по спискам gaps/strong в порядке требований. sem_maps — готовые семантические
+    маппинги по строкам (иначе считаются через _build_semantic_maps)."""
+    import numpy as np
+
+    if data_loader is None:
+        from reference_data import get_data_loader
+        data_loader = get_data_loader()
+    matrix = data_loader.requirement_matrix
+    atlas_map = data_loader.atlas_map
+
+    reqs_cache = {}
+    reqs_list = []
+    for _, role, grade in rows:
+        if (role, grade) not in reqs_cache:
+            reqs_cache[(role, grade)] = data_loader.get_role_requirements(role, grade)
+        reqs_list.append(reqs_cache[(role, grade)])
+    skill_names = {key: [k for k in reqs if k not in atlas_map] for key, reqs in reqs_cache.items()}
+    if sem_maps is None:
+        sem_maps = _build_semantic_maps([
+            ([n for n in norm if n not in atlas_map], skill_names[(role, grade)])
+            for norm, role, grade in rows
+        ])
+
+    n_items = len(matrix.item_names)
+    item_ids = matrix.item_ids
+    # Требуемые уровни (строки × элементы): строки матрицы, для ролей вне индекса — из dict
+    role_ids = matrix.role_ids_for(role for _, role, _ in rows)
+    grade_ids = np.asarray([matrix.grade_id(grade) for _, _, grade in rows], dtype=np.int32)
+    req = np.zeros((len(rows), n_items), dtype=np.float32)
+    known = role_ids >= 0
+    req[known] = matrix.required[role_ids[known], grade_ids[known]]
+    for i in np.flatnonzero(~known):
+        for name, level in reqs_list[i].items():
+            req[i, item_ids[name]] = level
+
+    # Уровни пользователя: точные совпадения + семантически сопоставленные (по строке)
+    user_vecs = {}
+    levels = np.empty((len(rows), n_items), dtype=np.float32)
+    resolved = []
+    for i, ((norm, _, _), sem_map) in enumerate(zip(rows, sem_maps)):
+        if id(norm) not in user_vecs:
+            user_vecs[id(norm)] = matrix.user_vector(norm)
+        levels[i] = user_vecs[id(norm)]
+        by_req = {}
+        for u_name, r_name in sem_map.items():
+            if r_name not in norm and r_name not in by_req:
+                by_req[r_name] = norm.get(u_name, 0)
+                levels[i, item_ids[r_name]] = by_req[r_name]
+        resolved.append(by_req)
+
+    required_mask = req > 0
+    strong_mask = required_mask & (levels >= req)
+    is_skill = np.asarray([name not in atlas_map for name in matrix.item_names], dtype=bool)
+    weights = np.ones(n_items, dtype=np.float64)
+    for name in {n for names in skill_names.values() for n in names}:
+        weights[item_ids[name]] = data_loader.get_skill_weight(name)
+    required_weight = ((required_mask & is_skill) * weights).sum(axis=1)
+    matched_weight = ((strong_mask & is_skill) * weights).sum(axis=1)
+    total_counts = required_mask.sum(axis=1)
+    strong_counts = strong_mask.sum(axis=1)
+
+    results = []
+    for i, (norm, role, grade) in enumerate(rows):
+        reqs = reqs_list[i]
+        total = int(total_counts[i])
+        legacy = int((int(strong_counts[i]) / total) * 100) if total else 0
+        if required_weight[i] > 0:
+            weighted = int((float(matched_weight[i]) / float(required_weight[i])) * 100)
+        else:
+            weighted = legacy
+        atlas_gaps, atlas_strong, skill_gaps, skill_strong = [], [], [], []
+        for name, req_level in reqs.items():
+            is_atlas = name in atlas_map
+            curr = norm[name] if name in norm else resolved[i].get(name, 0)
+            if strong_mask[i, item_ids[name]]:
+                (atlas_strong if is_atlas else skill_strong).append({"name": name, "level": curr})
+                continue
+            delta = req_level - curr
+            gap = {
+                "name": name, "current": curr, "required": req_level,
+                "delta": delta, "priority": _gap_priority(delta), "is_atlas": is_atlas,
+            }
+            if is_atlas:
+                gap["why"] = _atlas_gap_why(name, atlas_map)
+                atlas_gaps.append(gap)
+            else:
+                skill_gaps.append(gap)
+        atlas_gaps.sort(key=lambda x: (-x["delta"], x["name"]))
+        skill_gaps.sort(key=lambda x: (-x["delta"], x["name"]))
+        result = _structured_result(weighted, legacy, atlas_gaps, atlas_strong, skill_gaps, skill_strong)
+        result["role"] = role
+        result["grade"] = grade
+        results.append(result)
+    return results
+
+
+def _structured_result(weighted_match_percent, legacy_match_percent,
+                       atlas_gaps, atlas_strong, skill_gaps, skill_strong):
+    return {
+        "match_percent": weighted_match_percent,
+        "match_percent_legacy": legacy_match_percent,
+        "weighted_match_percent": weighted_match_percent,
+        "atlas_gaps": atlas_gaps,
+        "atlas_strong": atlas_strong,
+        "skill_gaps": skill_gaps,
+        "skill_strong": skill_strong,
+        "missing": [(g["name"], g["required"]) for g in atlas_gaps + skill_gaps if g["current"] == 0],
+        "gaps": [(g["name"], g["current"], g["required"]) for g in atlas_gaps + skill_gaps if g["current"] > 0],
+        "strong": [(s["name"], s["level"]) for s in atlas_strong + skill_strong],
+    }
@@ -0,0 +1,143 @@
+"""Предрасчитанный lexical-индекс навыков каталога для hybrid retrieval.
+
+Имена навыков нормализуются и токенизируются один раз на версию каталога. Хранится:
+
+    names         нормализованные имена — готовые choices для rapidfuzz.process.cdist
+    postings      токен -> массив id навыков (инвертированный индекс для Jaccard и BM25)
+    token_counts  число уникальных токенов имени (знаменатель Jaccard)
+
+Скореры (SKILLS_LEXICAL_SCORER):
+    fuzzy — 0.6 · token_sort_ratio + 0.4 · Jaccard по токенам (прежняя формула lexical-ветки);
+    bm25  — BM25 по токенам, нормированный на максимум для запроса (0..1).
+
+Запрос считает token_sort_ratio по всем именам одним вызовом cdist, пересечения токенов —
+только по postings своих токенов; top-k выбирается стабильной сортировкой NumPy, поэтому
+порядок совпадает с прежним проходом по списку.
+"""
+
+import math
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+FUZZY = "fuzzy"
+BM25 = "bm25"
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+class LexicalIndex:
+    def __init__(
+        self,
+        rows: Sequence[Dict[str, str]],
+        normalize: Callable[[str], str],
+        tokenize: Callable[[str], List[str]],
+    ):
+        self.rows = list(rows)
+        self._normalize = normalize
+        self._tokenize = tokenize
+        self.names = [normalize(row.get("name", "") or "") for row in self.rows]
+        self.has_name = np.asarray([bool(n) for n in self.names], dtype=bool)
+        token_sets = [set(tokenize(row.get("name", ""))) for row in self.rows]
+        self.token_counts = np.asarray([len(t) for t in token_sets], dtype=np.float64)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, tokens in enumerate(token_sets):
+            for token in tokens:
+                postings[token].append(i)
+        self.postings: Dict[str, np.ndarray] = {t: np.asarray(ids, dtype=np.int64) for t, ids in postings.items()}
+        n = max(len(self.rows), 1)
+        self.idf = {t: math.log(1.0 + (n - len(ids) + 0.5) / (len(ids) + 0.5)) for t, ids in self.postings.items()}
+        self.avg_len = float(self.token_counts.mean()) if len(self.rows) else 1.0
+        self._bm25_norm = 1.0 - _BM25_B + _BM25_B * self.token_counts / max(self.avg_len, 1e-9)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _prepare(self, user_input: str):
+        query = self._normalize(user_input or "")
+        if not query:
+            return None
+        # как в прежнем lexical-скоринге: token_sort по повторно нормализованной строке, токены — от query
+        return self._normalize(query), set(self._tokenize(query))
+
+    def _overlap(self, q_tok: Set[str]) -> np.ndarray:
+        inter = np.zeros(len(self.rows), dtype=np.float64)
+        for token in q_tok:
+            ids = self.postings.get(token)
+            if ids is not None:
+                inter[ids] += 1.0
+        return inter
+
+    def _fuzzy_scores(self, q_tok: Set[str], token_sort: np.ndarray) -> np.ndarray:
+        jaccard = np.zeros(len(self.rows), dtype=np.float64)
+        if q_tok:
+            inter = self._overlap(q_tok)
+            union = len(q_tok) + self.token_counts - inter
+            hit = inter > 0
+            jaccard[hit] = inter[hit] / union[hit]
+        return 0.6 * (token_sort / 100.0) + 0.4 * jaccard
+
+    def _bm25_scores(self, q_tok: Set[str]) -> np.ndarray:
+        scores = np.zeros(len(self.rows), dtype=np.float64)
+        best = 0.0
+        min_norm = float(self._bm25_norm.min()) if len(self.rows) else 1.0
+        for token in q_tok:
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            idf = self.idf[token]
+            # в имени навыка токен встречается один раз (множество токенов): tf = 1
+            scores[ids] += idf * (_BM25_K1 + 1.0) / (1.0 + _BM25_K1 * self._bm25_norm[ids])
+            best += idf * (_BM25_K1 + 1.0) / (1.0 + _BM25_K1 * min_norm)
+        return scores / best if best > 0 else scores
+
+    def _top(self, scores: np.ndarray, top_k: int, min_score: float) -> List[Dict[str, Any]]:
+        ok = np.flatnonzero(self.has_name & (scores >= min_score))
+        order = ok[np.argsort(-scores[ok], kind="stable")][: max(top_k, 1)]
+        out: List[Dict[str, Any]] = []
+        for i in order:
+            row = self.rows[i]
+            out.append(
+                {
+                    "score": float(scores[i]),
+                    "payload": {
+                        "type": "skill",
+                        "name": row.get("name", ""),
+                        "profession": row.get("profession", ""),
+                    },
+                }
+            )
+        return out
+
+    def search_many(
+        self,
+        user_inputs: Sequence[str],
+        top_k: int,
+        min_score: float = 0.05,
+        scorer: Optional[str] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Кандидаты для каждого запроса: [{"score", "payload": {"type", "name", "profession"}}]."""
+        out: List[List[Dict[str, Any]]] = [[] for _ in user_inputs]
+        prepared = [self._prepare(u) for u in user_inputs]
+        positions = [i for i, p in enumerate(prepared) if p is not None]
+        if not positions or not self.rows:
+            return out
+        if (scorer or FUZZY) == BM25:
+            for i in positions:
+                out[i] = self._top(self._bm25_scores(prepared[i][1]), top_k, min_score)
+            return out
+        from rapidfuzz import fuzz, process
+
+        token_sort = process.cdist(
+            [prepared[i][0] for i in positions], self.names,
+            scorer=fuzz.token_sort_ratio, dtype=np.float64, workers=-1 if len(positions) > 1 else 1,
+        )
+        for q_row, i in enumerate(positions):
+            out[i] = self._top(self._fuzzy_scores(prepared[i][1], token_sort[q_row]), top_k, min_score)
+        return out
+
+    def search(
+        self, user_input: str, top_k: int, min_score: float = 0.05, scorer: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return self.search_many([user_input], top_k, min_score, scorer)[0]
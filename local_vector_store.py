@@ -0,0 +1,430 @@
+"""Встроенное векторное хранилище: замена Qdrant без сети (dev, CI, закрытый контур).
+
+Коллекция — каталог LOCAL_VECTOR_DIR/<имя>; каждая запись создаёт новое поколение
+<имя>/gen-<метка>/ и затем одной атомарной заменой файла переключает указатель <имя>/CURRENT:
+
+    meta.json      размерность, метрика, id точек (порядок строк матрицы)
+    vectors.npy    float32-матрица (n × d), при косинусной метрике строки нормированы
+    payloads.json  payload точек в том же порядке
+    ivf.npz        (опционально) центроиды, назначения точек и размер, на котором обучен k-means
+
+Читатель (в том числе другой процесс) загружает файлы одного поколения и не смешивает
+meta одной записи с матрицей другой. Предыдущее поколение остаётся на диске до следующей
+записи; если его всё же удалили во время чтения, загрузка повторяется по новому указателю.
+Коллекции прежней плоской раскладки (файлы прямо в <имя>/) читаются как есть и переходят
+на поколения при первой записи.
+
+LOCAL_VECTOR_DIR/aliases.json — алиасы «имя -> коллекция», как в Qdrant: поиск и запись по
+алиасу идут в его коллекцию, переключение алиаса — одна атомарная замена файла.
+
+Матрица открывается через np.load(mmap_mode="r"), поиск — одно матричное умножение
+и argpartition. Интерфейс повторяет REST-обёртки rag_service (коллекции, upsert, search,
+search_batch), поэтому build_index / build_skills_v2_index пишут сюда тем же кодом.
+Фильтры по payload — подмножество формата Qdrant: must / should / must_not с
+{"key": ..., "match": {"value": ...}} или {"match": {"any": [...]}}.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_META = "meta.json"
+_VECTORS = "vectors.npy"
+_PAYLOADS = "payloads.json"
+_IVF = "ivf.npz"
+_ALIASES = "aliases.json"
+_CURRENT = "CURRENT"
+_GEN_PREFIX = "gen-"
+_FLAT_FILES = (_META, _VECTORS, _PAYLOADS, _IVF)
+_LOAD_ATTEMPTS = 3
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _version_key(path: Path) -> Optional[tuple]:
+    """Версия коллекции в каталоге path: stat указателя CURRENT (или meta.json плоской раскладки).
+    None — коллекции нет."""
+    try:
+        st = (path / _CURRENT).stat()
+        return ("gen", st.st_mtime_ns, st.st_ino, st.st_size)
+    except OSError:
+        pass
+    try:
+        return ("flat", (path / _META).stat().st_mtime_ns)
+    except OSError:
+        return None
+
+
+def _generation_dir(path: Path) -> Path:
+    """Каталог текущего поколения коллекции (для плоской раскладки — сам каталог коллекции)."""
+    try:
+        name = (path / _CURRENT).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return path
+    return path / name
+
+
+def _normalize_rows(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def _match_condition(payload: Dict[str, Any], cond: Dict[str, Any]) -> bool:
+    value = payload.get(cond.get("key"))
+    match = cond.get("match") or {}
+    if "value" in match:
+        return value == match["value"]
+    if "any" in match:
+        return value in match["any"]
+    return False
+
+
+def payload_matches(payload: Dict[str, Any], query_filter: Optional[Dict[str, Any]]) -> bool:
+    """Проверка payload по фильтру в формате Qdrant (must / should / must_not)."""
+    if not query_filter:
+        return True
+    must = query_filter.get("must") or []
+    should = query_filter.get("should") or []
+    must_not = query_filter.get("must_not") or []
+    if not all(_match_condition(payload, c) for c in must):
+        return False
+    if should and not any(_match_condition(payload, c) for c in should):
+        return False
+    return not any(_match_condition(payload, c) for c in must_not)
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Сферический k-means (косинус) для IVF; детерминирован по seed."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+class _Collection:
+    def __init__(self, root: Path, key: tuple):
+        self.root = root
+        self.key = key
+        self.path = path = _generation_dir(root)
+        meta = json.loads((path / _META).read_text(encoding="utf-8"))
+        self.size = int(meta["size"])
+        self.distance = meta.get("distance", "Cosine")
+        self.ids: List[Any] = meta.get("ids", [])
+        vec_path = path / _VECTORS
+        if vec_path.is_file():
+            self.vectors = np.load(vec_path, mmap_mode="r")
+        else:
+            self.vectors = np.zeros((0, self.size), dtype=np.float32)
+        payload_path = path / _PAYLOADS
+        self.payloads: List[Dict[str, Any]] = (
+            json.loads(payload_path.read_text(encoding="utf-8")) if payload_path.is_file() else []
+        )
+        self.centroids = None
+        self.trained = 0
+        self.lists: List[np.ndarray] = []
+        ivf_path = path / _IVF
+        if ivf_path.is_file():
+            with np.load(ivf_path) as ivf:
+                self.centroids = ivf["centroids"]
+                assign = ivf["assign"]
+                self.trained = int(ivf["trained"]) if "trained" in ivf.files else len(assign)
+            self.lists = [np.flatnonzero(assign == c) for c in range(len(self.centroids))]
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> Optional[np.ndarray]:
+        """Строки из nprobe ближайших IVF-списков; None — полный перебор."""
+        if self.centroids is None or nprobe <= 0 or nprobe >= len(self.centroids):
+            return None
+        nearest = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.concatenate([self.lists[c] for c in nearest])
+
+
+class LocalVectorStore:
+    """In-process векторное хранилище с тем же набором операций, что REST-обёртки Qdrant."""
+
+    # upsert переписывает коллекцию целиком: vector_sync отдаёт все точки одним вызовом, а не чанками
+    bulk_upsert = True
+
+    def __init__(self, root, nprobe: int = 0, ivf_min_points: int = 4096):
+        self.root = Path(root)
+        self.nprobe = nprobe
+        self.ivf_min_points = ivf_min_points
+        self._cache: Dict[str, _Collection] = {}
+        # _lock — только кэш и алиасы; поиск не ждёт запись поколения и обучение IVF
+        self._lock = threading.Lock()
+        # запись — read-modify-write всей коллекции; параллельные чанки upsert выстраиваются в очередь
+        self._write_lock = threading.Lock()
+        self._aliases: Optional[tuple] = None
+
+    # --- коллекции ---
+
+    def _resolve(self, name: str) -> str:
+        return self.get_aliases().get(name, name)
+
+    def _dir(self, name: str) -> Path:
+        return self.root / self._resolve(name)
+
+    def has_collection(self, name: str) -> bool:
+        return _version_key(self._dir(name)) is not None
+
+    def get_collections(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and _version_key(p) is not None)
+
+    def delete_collection(self, name: str) -> bool:
+        """Удаляет коллекцию (по имени, не по алиасу) и алиасы, которые на неё указывают."""
+        with self._lock:
+            self._cache.pop(name, None)
+            shutil.rmtree(self.root / name, ignore_errors=True)
+        aliases = self.get_aliases()
+        if name in aliases.values():
+            self._write_aliases({a: c for a, c in aliases.items() if c != name})
+        return True
+
+    def create_collection(self, name: str, vector_size: int, distance: str = "Cosine") -> bool:
+        path = self.root / name
+        meta = {"size": int(vector_size), "distance": distance, "ids": []}
+        with self._write_lock:
+            previous = _generation_dir(path) if _version_key(path) is not None else None
+            self._write_generation(path, meta, previous=previous)
+        return True
+
+    def get_aliases(self) -> Dict[str, str]:
+        path = self.root / _ALIASES
+        try:
+            mtime = path.stat().st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            if self._aliases is None or self._aliases[0] != mtime:
+                try:
+                    data = json.loads(path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    data = {}
+                self._aliases = (mtime, data if isinstance(data, dict) else {})
+            return dict(self._aliases[1])
+
+    def _write_aliases(self, aliases: Dict[str, str]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._aliases = None
+            _write_atomic(self.root / _ALIASES, lambda f: f.write(json.dumps(aliases).encode("utf-8")))
+
+    def update_alias(self, alias: str, collection: str) -> bool:
+        """Направляет алиас на коллекцию (создаёт или переключает)."""
+        if _version_key(self.root / collection) is None:
+            return False
+        with self._write_lock:
+            aliases = self.get_aliases()
+            aliases[alias] = collection
+            self._write_aliases(aliases)
+        return True
+
+    def _load(self, name: str) -> Optional[_Collection]:
+        name = self._resolve(name)
+        path = self.root / name
+        for _ in range(_LOAD_ATTEMPTS):
+            key = _version_key(path)
+            if key is None:
+                return None
+            with self._lock:
+                cached = self._cache.get(name)
+                if cached is not None and cached.key == key:
+                    return cached
+            try:
+                coll = _Collection(path, key)
+            except (OSError, ValueError, KeyError):
+                # поколение удалено или дописывается другим процессом — перечитываем указатель
+                continue
+            with self._lock:
+                self._cache[name] = coll
+            return coll
+        return None
+
+    def point_payloads(self, collection: str) -> Optional[Dict[Any, Dict[str, Any]]]:
+        """id точки -> payload; None — коллекции нет."""
+        coll = self._load(collection)
+        if coll is None:
+            return None
+        return dict(zip(coll.ids, coll.payloads))
+
+    # --- запись ---
+
+    def upsert(self, collection: str, points: List[Dict[str, Any]]) -> bool:
+        """points: [{"id", "vector", "payload"}]; точки с существующим id заменяются."""
+        with self._write_lock:
+            return self._upsert(collection, points)
+
+    def _upsert(self, collection: str, points: List[Dict[str, Any]]) -> bool:
+        coll = self._load(collection)
+        if coll is None:
+            return False
+        ids = list(coll.ids)
+        vectors = np.array(coll.vectors, dtype=np.float32)
+        payloads = list(coll.payloads)
+        position = {pid: i for i, pid in enumerate(ids)}
+        new_rows: Dict[Any, Any] = {}
+        for point in points:
+            vec = np.asarray(point["vector"], dtype=np.float32)
+            if vec.shape != (coll.size,):
+                raise ValueError(f"Размерность вектора {vec.shape} не совпадает с коллекцией ({coll.size})")
+            payload = point.get("payload") or {}
+            i = position.get(point["id"])
+            if i is None:
+                new_rows[point["id"]] = (vec, payload)
+            else:
+                vectors[i] = vec
+                payloads[i] = payload
+        if new_rows:
+            ids.extend(new_rows)
+            vectors = np.vstack([vectors, np.stack([v for v, _ in new_rows.values()])])
+            payloads.extend(p for _, p in new_rows.values())
+        if coll.distance == "Cosine" and len(vectors):
+            vectors = _normalize_rows(vectors).astype(np.float32)
+        self._write(coll, ids, vectors, payloads)
+        return True
+
+    def delete_points(self, collection: str, point_ids: List[Any]) -> bool:
+        with self._write_lock:
+            coll = self._load(collection)
+            if coll is None:
+                return False
+            drop = set(point_ids)
+            keep = [i for i, pid in enumerate(coll.ids) if pid not in drop]
+            if len(keep) == len(coll.ids):
+                return True
+            vectors = np.array(coll.vectors, dtype=np.float32)[keep].reshape(len(keep), coll.size)
+            self._write(coll, [coll.ids[i] for i in keep], vectors, [coll.payloads[i] for i in keep])
+        return True
+
+    def _ivf(self, coll: _Collection, vectors: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+        """IVF для новой матрицы. k-means переобучается, только когда коллекция выросла или
+        сжалась вдвое с момента обучения; иначе новые точки раскладываются по прежним центроидам."""
+        if len(vectors) < self.ivf_min_points:
+            return None
+        n = len(vectors)
+        if coll.centroids is not None and coll.trained // 2 <= n <= coll.trained * 2:
+            centroids, trained = coll.centroids, coll.trained
+        else:
+            centroids, trained = _kmeans(vectors, max(1, int(np.sqrt(n)))), n
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        return {"centroids": centroids, "assign": assign, "trained": np.int64(trained)}
+
+    def _write(self, coll: _Collection, ids, vectors: np.ndarray, payloads) -> None:
+        meta = {"size": coll.size, "distance": coll.distance, "ids": ids}
+        self._write_generation(
+            coll.root, meta, vectors, payloads, self._ivf(coll, vectors), previous=coll.path
+        )
+
+    def _write_generation(
+        self,
+        root: Path,
+        meta: Dict[str, Any],
+        vectors: Optional[np.ndarray] = None,
+        payloads: Optional[List[Dict[str, Any]]] = None,
+        ivf: Optional[Dict[str, np.ndarray]] = None,
+        previous: Optional[Path] = None,
+    ) -> None:
+        """Пишет поколение в новый каталог и переключает на него CURRENT. Вызывается под _write_lock;
+        _lock берётся только на сброс кэша, поэтому поиск идёт по старому поколению всё время записи."""
+        generation = f"{_GEN_PREFIX}{time.time_ns():x}-{os.getpid()}"
+        gen_dir = root / generation
+        gen_dir.mkdir(parents=True)
+        if vectors is not None:
+            with open(gen_dir / _VECTORS, "wb") as f:
+                np.save(f, vectors)
+            (gen_dir / _PAYLOADS).write_bytes(json.dumps(payloads, ensure_ascii=False).encode("utf-8"))
+        if ivf is not None:
+            with open(gen_dir / _IVF, "wb") as f:
+                np.savez(f, **ivf)
+        (gen_dir / _META).write_bytes(json.dumps(meta).encode("utf-8"))
+        _write_atomic(root / _CURRENT, lambda f: f.write(generation.encode("utf-8")))
+        with self._lock:
+            self._cache.pop(root.name, None)
+        self._prune(root, keep={generation, previous.name if previous is not None else ""}, flat=previous == root)
+
+    @staticmethod
+    def _prune(root: Path, keep: set, flat: bool) -> None:
+        """Удаляет поколения, кроме текущего и предыдущего (его ещё может дочитывать другой процесс)."""
+        for p in root.iterdir():
+            if p.is_dir() and p.name.startswith(_GEN_PREFIX) and p.name not in keep:
+                shutil.rmtree(p, ignore_errors=True)
+        if not flat:
+            for name in _FLAT_FILES:
+                (root / name).unlink(missing_ok=True)
+
+    # --- поиск ---
+
+    def search(
+        self,
+        collection: str,
+        vector: List[float],
+        limit: int,
+        score_threshold: float,
+        query_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict]:
+        """Возвращает [{"score": float, "payload": {...}}, ...] по убыванию score."""
+        return self.search_batch(collection, [vector], limit, score_threshold, query_filter)[0]
+
+    def search_batch(
+        self,
+        collection: str,
+        vectors: List[List[float]],
+        limit: int,
+        score_threshold: float,
+        query_filter: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict]]:
+        coll = self._load(collection)
+        if coll is None or not len(coll.vectors) or not vectors or limit <= 0:
+            return [[] for _ in vectors]
+        queries = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        if coll.distance == "Cosine":
+            queries = _normalize_rows(queries)
+        allowed = None
+        if query_filter:
+            allowed = np.fromiter(
+                (payload_matches(p, query_filter) for p in coll.payloads), dtype=bool, count=len(coll.payloads)
+            )
+        matrix = np.asarray(coll.vectors)
+        full = None
+        out = []
+        for qi, q in enumerate(queries):
+            rows = coll.candidates(q, self.nprobe)
+            if rows is None:
+                if full is None:
+                    full = queries @ matrix.T
+                rows = np.arange(len(matrix))
+                row_scores = full[qi]
+            else:
+                row_scores = matrix[rows] @ q
+            keep = row_scores >= score_threshold
+            if allowed is not None:
+                keep &= allowed[rows]
+            rows, row_scores = rows[keep], row_scores[keep]
+            if len(rows) > limit:
+                top = np.argpartition(-row_scores, limit - 1)[:limit]
+                rows, row_scores = rows[top], row_scores[top]
+            order = np.argsort(-row_scores, kind="stable")
+            out.append([
+                {"score": float(row_scores[i]), "payload": coll.payloads[rows[i]]}
+                for i in order
+            ])
+        return out
@@ -0,0 +1,70 @@
+"""Потокобезопасный LRU с ограничением числа записей и счётчиками попаданий, промахов и вытеснений.
+
+Общий для кэшей лемматизации (skill_normalizer) и score пар cross-encoder (query_cache.PairScoreCache).
+Ключ — любой hashable (строка, кортеж); None как значение не хранится — это признак промаха.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = max(0, int(maxsize))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._get(key)
+
+    def get_many(self, keys: Sequence[Hashable]) -> List[Optional[Any]]:
+        """Значения для keys под одной блокировкой; None — промах."""
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[Hashable, Any]]) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            for key, value in items:
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
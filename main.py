@@ -11,7 +11,7 @@ if os.getcwd() != str(PROJECT_DIR):
 
 import gradio as gr
 import pandas as pd
-from data_loader import DataLoader
+from reference_data import DataLoaderView
 from config import Config
 from resume_parser import ResumeParser
 from gap_analyzer import GapAnalyzer
@@ -19,7 +19,7 @@ from scenario_handler import ScenarioHandler
 from output_formatter import OutputFormatter
 
 # Инициализация модулей
-data = DataLoader()
+data = DataLoaderView()
 parser = ResumeParser()
 analyzer = GapAnalyzer()
 scenarios = ScenarioHandler(data)
@@ -188,25 +188,27 @@ def dedupe_opportunities_by_profession(opportunities):
 
 def build_role_matches(opps, user_skills, data_loader):
     """Строит список RoleMatch из opps для build_explore_recommendations."""
-    from concurrent.futures import ThreadPoolExecutor
     from explore_recommendations import RoleMatch
     try:
-        from rag_service import get_rag_why_role_bullets
+        from rag_service import get_rag_why_role_bullets_many
     except Exception:
-        get_rag_why_role_bullets = lambda u, r, **kw: []
+        get_rag_why_role_bullets_many = lambda u, roles, **kw: [[] for _ in roles]
 
-    def _one(opp):
+    if not opps:
+        return []
+    whys = get_rag_why_role_bullets_many(
+        user_skills, [opp.get("role", "") for opp in opps], top_k=5, atlas_keys=set(data_loader.atlas_map.keys())
+    )
+    matches = []
+    for opp, why in zip(opps, whys):
         role_title = opp.get("role", "")
         internal = opp.get("internal_role")
         reqs = data_loader.get_role_requirements(internal, "Middle") if internal else {}
         skill_keys = [k for k in reqs.keys() if k not in data_loader.atlas_map]
         matched = [{"name": s} for s in user_skills if s in reqs][:5]
         missing = [{"name": s} for s in skill_keys if s not in user_skills][:3]
-        why = get_rag_why_role_bullets(
-            user_skills, role_title, top_k=5, atlas_keys=set(data_loader.atlas_map.keys())
-        )
         score = (opp.get("match", 0) or 0) / 100.0
-        return RoleMatch(
+        matches.append(RoleMatch(
             role_title=role_title,
             match_score=score,
             why_match=why,
@@ -214,13 +216,8 @@ def build_role_matches(opps, user_skills, data_loader):
             key_skills=skill_keys[:8],
             missing_skills=missing,
             internal_role=internal,
-        )
-
-    if not opps:
-        return []
-    max_workers = min(2, max(1, len(opps)))
-    with ThreadPoolExecutor(max_workers=max_workers) as pool:
-        return list(pool.map(_one, opps))
+        ))
+    return matches
 
 
 def build_plan(skills_table, profession, current_grade, scenario, target_profession):
@@ -3,8 +3,13 @@
 Сценарий «Переход на следующий грейд»
 """
 
+import json
+import os
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from reference_data import register_warmup_hook
 
 # Маппинг грейда в ключи атласа (Младший, Специалист, ...)
 GRADE_TO_ATLAS_LEVEL = {
@@ -91,6 +96,152 @@ def retrieve_params_for_role_from_map(atlas_map: Dict) -> List[str]:
     return list(atlas_map.keys())
 
 
+# Сколько навыков хранится на (параметр, роль, грейд): хватает для любого top_per_param <= 8
+PARAM_SUPPORT_DEPTH = 8
+
+# ((catalog_version, mtime_ns, size), table, state): таблица навыков-помощников, построенная
+# build_param_support_table; reindex-скрипт пишет файл из другого процесса — сверяем mtime/size.
+# state: ok | missing (файла нет) | stale (файл от другой версии каталога или битый)
+_support_table_cache: Optional[Tuple[Tuple[str, int, int], Optional[Dict[str, Any]], str]] = None
+# планы, где навыки-помощники добиты навыками роли по порядку из-за отсутствия таблицы
+_support_fallbacks = 0
+
+
+def _param_support_query(param_name: str) -> str:
+    return f"Параметр {param_name} навыки развитие компетенции"
+
+
+def rank_support_skills(hits: List[Dict], role_skills: List[str], limit: int) -> List[str]:
+    """Навыки роли из RAG-выдачи по параметру (в порядке score), добитые навыками роли по порядку."""
+    role_set = set(role_skills)
+    ranked: List[str] = []
+    for h in hits or []:
+        p = h.get("payload") or {}
+        if p.get("type") != "skill":
+            continue
+        name = (p.get("name") or "").strip()
+        if name and name in role_set and name not in ranked:
+            ranked.append(name)
+            if len(ranked) >= limit:
+                return ranked
+    for s in role_skills:
+        if len(ranked) >= limit:
+            break
+        if s not in ranked:
+            ranked.append(s)
+    return ranked
+
+
+def build_param_support_table(
+    data_loader, grades: Tuple[str, ...] = tuple(GRADE_TO_ATLAS_LEVEL), ref=None
+) -> Optional[int]:
+    """
+    Таблица «параметр → роль → грейд → навыки-помощники» для всех ролей каталога.
+    RAG-запрос зависит только от параметра, поэтому выполняется один batch-поиск на все
+    параметры; фильтр по навыкам роли и добивка — здесь же. Роль доступна и по внутреннему,
+    и по отображаемому имени. Пишет Config.PARAM_SKILL_SUPPORT_FILE с версией каталога
+    (ref — прогреваемая версия, по умолчанию текущая); возвращает число записей
+    (None — нет RAG-коллекции или файл не записан).
+    """
+    global _support_table_cache
+    from config import Config
+    from rag_service import _vector_store_for, retrieve_many
+    from reference_data import get_reference_data
+
+    if _vector_store_for(Config.RAG_COLLECTION_NAME) is None:
+        return None
+    params = retrieve_params_for_role(data_loader)
+    hits = retrieve_many([_param_support_query(p) for p in params], top_k=8, score_threshold=0.25)
+    table: Dict[str, Any] = {"version": (ref or get_reference_data()).version, "params": {p: {} for p in params}}
+    count = 0
+    for role_display in data_loader.get_all_roles():
+        for role in dict.fromkeys([role_display, *data_loader.get_internal_role_names(role_display)]):
+            for grade in grades:
+                role_skills = list(retrieve_role_skills(data_loader, role, grade).keys())
+                for param, param_hits in zip(params, hits):
+                    ranked = rank_support_skills(param_hits, role_skills, PARAM_SUPPORT_DEPTH)
+                    table["params"][param].setdefault(role, {})[grade] = ranked
+                    count += 1
+    path = Path(Config.PARAM_SKILL_SUPPORT_FILE)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # воркеры прогревают новую версию одновременно: у каждого свой временный файл
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(table, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Не удалось сохранить {path}: {e}")
+        return None
+    _support_table_cache = None
+    return count
+
+
+def _param_support_table() -> Optional[Dict[str, Any]]:
+    """Таблица навыков-помощников для текущей версии каталога; None — нет файла или он от другой версии
+    (предупреждение в лог один раз на состояние файла, счётчик — param_support_stats)."""
+    global _support_table_cache
+    from config import Config
+    from reference_data import get_reference_data
+
+    version = get_reference_data().version
+    path = Path(Config.PARAM_SKILL_SUPPORT_FILE)
+    try:
+        st = path.stat()
+        key = (version, st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = (version, -1, -1)
+    cached = _support_table_cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    table = None
+    state = "missing" if key[1] == -1 else "stale"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get("version") == version:
+            table = data.get("params") or {}
+            state = "ok"
+    except (OSError, ValueError):
+        table = None
+    if table is None:
+        print(
+            f"⚠️ Таблица навыков-помощников {path.name}: {'нет файла' if state == 'missing' else 'другая версия каталога'} "
+            f"(каталог {version}); next-grade берёт навыки роли по порядку — запустите scripts/reindex_qdrant.py"
+        )
+    _support_table_cache = (key, table, state)
+    return table
+
+
+def param_support_stats() -> Dict[str, Any]:
+    """Состояние таблицы навыков-помощников для /api/admin/caches: ok | missing | stale и число
+    планов, собранных без неё."""
+    _param_support_table()
+    cached = _support_table_cache
+    return {"state": cached[2] if cached is not None else "missing", "fallbacks": _support_fallbacks}
+
+
+def _warm_param_support_table(ref) -> None:
+    """Хук прогрева новой версии каталога: перестраивает таблицу навыков-помощников, если файл
+    от другой версии. Как и прогрев explore в rag_service, не тянет модель в память сам по себе:
+    без сервера эмбеддингов таблица строится, только если RAG-модель уже загружена."""
+    from config import Config
+    import rag_service
+
+    if not Config.EMBED_SERVER_ADDRESS and Config.EMBED_MODEL_NAME not in rag_service._sentence_transformers:
+        return
+    try:
+        with open(Config.PARAM_SKILL_SUPPORT_FILE, "r", encoding="utf-8") as f:
+            if (json.load(f) or {}).get("version") == ref.version:
+                return
+    except (OSError, ValueError, AttributeError):
+        pass
+    build_param_support_table(ref.data_loader, ref=ref)
+
+
+register_warmup_hook(_warm_param_support_table)
+
+
 def build_skill_support(
     priority_param_names: List[str],
     role_name: str,
@@ -99,37 +250,26 @@ def build_skill_support(
     top_per_param: int = 5,
 ) -> Dict[str, List[str]]:
     """
-    Навыки-помощники по приоритетным параметрам. Группируем навыки роли по параметрам
-    через RAG-запрос «навыки для параметра X» или отдаём топ навыков роли на каждый параметр.
-    У нас нет явного skill->param mapping, поэтому: для каждого param делаем RAG retrieve
-    «параметр X навыки развитие» и берём топ skill names из payload; если пусто — берём
-    общий список навыков роли и распределяем по порядку.
+    Навыки-помощники по приоритетным параметрам. Явного skill->param mapping в каталоге нет,
+    поэтому связь берётся из RAG-выдачи «параметр X навыки развитие», отфильтрованной по
+    навыкам роли и добитой навыками роли по порядку. Выдача считается заранее
+    (build_param_support_table, scripts/reindex_qdrant.py) — на запросе векторного поиска нет.
+    Без таблицы или для пары вне неё — навыки роли по порядку.
     """
-    role_skills = list(retrieve_role_skills(data_loader, role_name, target_grade).keys())
-    result = {p: [] for p in priority_param_names}
-    try:
-        from rag_service import retrieve
-        for param in priority_param_names:
-            hits = retrieve(f"Параметр {param} навыки развитие компетенции", top_k=8, score_threshold=0.25)
-            seen = set()
-            for h in (hits or []):
-                p = (h.get("payload") or {})
-                if p.get("type") == "skill":
-                    name = (p.get("name") or "").strip()
-                    if name and name not in seen and name in role_skills:
-                        seen.add(name)
-                        result[param].append(name)
-                        if len(result[param]) >= top_per_param:
-                            break
-    except Exception:
-        pass
-    # Добиваем из общих навыков роли, если по параметру мало
+    global _support_fallbacks
+    table = _param_support_table()
+    if table is None and priority_param_names:
+        _support_fallbacks += 1
+    table = table or {}
+    role_skills: Optional[List[str]] = None
+    result: Dict[str, List[str]] = {}
     for param in priority_param_names:
-        for s in role_skills:
-            if s not in result[param] and len(result[param]) < top_per_param:
-                result[param].append(s)
-            if len(result[param]) >= top_per_param:
-                break
+        ranked = ((table.get(param) or {}).get(role_name) or {}).get(target_grade)
+        if ranked is None:
+            if role_skills is None:
+                role_skills = list(retrieve_role_skills(data_loader, role_name, target_grade).keys())
+            ranked = rank_support_skills([], role_skills, top_per_param)
+        result[param] = list(ranked[:top_per_param])
     return result
 
 
@@ -0,0 +1,235 @@
+"""LRU-кэш эмбеддингов запросов перед энкодером.
+
+Короткие строки запросов повторяются между пользователями: популярные навыки, одинаковые
+E5-запросы с инструкцией, фиксированные запросы по параметрам атласа. Кэш хранит вектор по
+ключу (модель, normalize, точный текст с префиксом) и не пускает повтор в энкодер. Модель —
+пространство векторов с бэкендом (rag_service._embedding_namespace): torch, int8 и onnx не смешиваются.
+
+Память ограничена на каждую модель (QUERY_CACHE_MAX_MB): при переполнении вытесняются
+давно не использованные строки. Со статистикой попаданий и вытеснений — GET /api/admin/caches.
+С QUERY_CACHE_DIR содержимое сохраняется при остановке процесса (<модель>.npz, от старых
+к новым) и подхватывается при старте.
+
+PairScoreCache — то же для cross-encoder: score пары (фраза из резюме, каноническое имя)
+по ключу (модель, фраза, имя), не больше CROSS_ENCODER_CACHE_SIZE пар, LRU-вытеснение.
+"""
+
+import atexit
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from lru_cache import LRUCache
+
+
+def _slug(model_name: str, normalize: bool) -> str:
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "__", model_name).strip("_") or "model"
+    return slug if normalize else f"{slug}--raw"
+
+
+class _ModelCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        vec = self.entries.get(text)
+        if vec is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(text)
+        self.hits += 1
+        return vec
+
+    def put(self, text: str, vec: np.ndarray) -> None:
+        size = vec.nbytes + len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(text, None)
+        if old is not None:
+            self.bytes -= old.nbytes + len(text.encode("utf-8"))
+        self.entries[text] = vec
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            evicted, evicted_vec = self.entries.popitem(last=False)
+            self.bytes -= evicted_vec.nbytes + len(evicted.encode("utf-8"))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_bytes_per_model: int, path: Optional[Path] = None):
+        self.max_bytes_per_model = max_bytes_per_model
+        self.path = Path(path) if path else None
+        self._models: Dict[Tuple[str, bool], _ModelCache] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model_name: str, normalize: bool) -> _ModelCache:
+        key = (model_name, normalize)
+        cache = self._models.get(key)
+        if cache is None:
+            cache = _ModelCache(self.max_bytes_per_model)
+            self._models[key] = cache
+            self._load(model_name, normalize, cache)
+        return cache
+
+    def encode(
+        self,
+        texts: Sequence[str],
+        model_name: str,
+        encode_fn: Callable[[List[str]], Any],
+        normalize: bool = True,
+        resolve_model: Optional[Callable[[], str]] = None,
+    ) -> np.ndarray:
+        """Вектора для texts (тексты уже с префиксом); промахи считаются encode_fn одним батчем.
+        resolve_model() — модель, под которой сохранить промахи (если она уточнилась после encode_fn)."""
+        texts = list(texts)
+        with self._lock:
+            cache = self._model(model_name, normalize)
+            found = [cache.get(t) for t in texts]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, found) if v is None))
+        if missing:
+            fresh = np.asarray(encode_fn(missing), dtype=np.float32)
+            by_text = {}
+            with self._lock:
+                if resolve_model is not None:
+                    cache = self._model(resolve_model(), normalize)
+                for text, vec in zip(missing, fresh):
+                    vec = np.array(vec, dtype=np.float32)
+                    vec.setflags(write=False)
+                    cache.put(text, vec)
+                    by_text[text] = vec
+            found = [v if v is not None else by_text[t] for t, v in zip(texts, found)]
+        if not found:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(found)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "persist_dir": str(self.path) if self.path else None,
+                "models": {_slug(m, n): c.stats() for (m, n), c in self._models.items()},
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def _file(self, model_name: str, normalize: bool) -> Optional[Path]:
+        return self.path / f"{_slug(model_name, normalize)}.npz" if self.path else None
+
+    def _load(self, model_name: str, normalize: bool, cache: _ModelCache) -> None:
+        path = self._file(model_name, normalize)
+        if path is None or not path.is_file():
+            return
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                texts, vectors = data["texts"], data["vectors"]
+                for text, vec in zip(texts, vectors):
+                    vec = np.array(vec, dtype=np.float32)
+                    vec.setflags(write=False)
+                    cache.put(str(text), vec)
+        except (OSError, ValueError, KeyError):
+            return
+
+    def save(self) -> int:
+        """Сохраняет кэши моделей на диск (если задан путь). Возвращает число записанных векторов."""
+        if self.path is None:
+            return 0
+        with self._lock:
+            snapshot = [(m, n, list(c.entries.items())) for (m, n), c in self._models.items()]
+        written = 0
+        for model_name, normalize, items in snapshot:
+            if not items:
+                continue
+            path = self._file(model_name, normalize)
+            try:
+                self.path.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(".tmp.npz")
+                np.savez(tmp, texts=np.asarray([t for t, _ in items]), vectors=np.vstack([v for _, v in items]))
+                tmp.replace(path)
+                written += len(items)
+            except (OSError, ValueError):
+                continue
+        return written
+
+
+class PairScoreCache:
+    """Score пар cross-encoder поверх lru_cache.LRUCache: ключ (модель, фраза, имя), пакетный score()."""
+
+    def __init__(self, max_pairs: int):
+        self.max_pairs = max_pairs
+        self._lru = LRUCache(max_pairs)
+
+    def score(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        model_name: str,
+        predict_fn: Callable[[List[Tuple[str, str]]], Any],
+    ) -> List[float]:
+        """Score для каждой пары; промахи (без повторов) считаются одним вызовом predict_fn."""
+        keys = [(model_name, q, c) for q, c in pairs]
+        found: List[Optional[float]] = self._lru.get_many(keys)
+        missing = list(dict.fromkeys(k for k, v in zip(keys, found) if v is None))
+        if missing:
+            fresh = [float(x) for x in predict_fn([(q, c) for _, q, c in missing])]
+            by_key = dict(zip(missing, fresh))
+            self._lru.put_many(by_key.items())
+            found = [v if v is not None else by_key[k] for k, v in zip(keys, found)]
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return self._lru.stats()
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+
+_cache: Optional[QueryEmbeddingCache] = None
+_cache_lock = threading.Lock()
+_pair_cache: Optional[PairScoreCache] = None
+
+
+def get_query_cache() -> Optional[QueryEmbeddingCache]:
+    """Процессный кэш запросов; None, если QUERY_CACHE_MAX_MB = 0."""
+    global _cache
+    if Config.QUERY_CACHE_MAX_MB <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            path = Path(Config.QUERY_CACHE_DIR) if Config.QUERY_CACHE_DIR else None
+            _cache = QueryEmbeddingCache(int(Config.QUERY_CACHE_MAX_MB * 1024 * 1024), path)
+            if path is not None:
+                atexit.register(_cache.save)
+        return _cache
+
+
+def get_pair_score_cache() -> Optional[PairScoreCache]:
+    """Процессный кэш score пар cross-encoder; None, если CROSS_ENCODER_CACHE_SIZE = 0."""
+    global _pair_cache
+    if Config.CROSS_ENCODER_CACHE_SIZE <= 0:
+        return None
+    with _cache_lock:
+        if _pair_cache is None:
+            _pair_cache = PairScoreCache(Config.CROSS_ENCODER_CACHE_SIZE)
+        return _pair_cache
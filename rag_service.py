@@ -1,28 +1,34 @@
 
 """RAG и NLP: индексация навыков/атласа, поиск, подсказки навыков, семантическое ранжирование."""
 
+import functools
 import json
+import os
 import threading
-import urllib.request
-import urllib.error
-from collections import OrderedDict
+import http.client
+import time
+import urllib.parse
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple, AbstractSet
 
 from config import Config
+from reference_data import (
+    get_reference_data,
+    invalidate_reference_data,
+    register_invalidation_hook,
+    register_warmup_hook,
+)
 
 # Ленивая загрузка тяжёлых зависимостей (отдельно по model_name)
 _sentence_transformers: Dict[str, Any] = {}
+_embedder_backends: Dict[str, str] = {}  # model_name -> torch | int8 | onnx (после проверки паритета)
 _cross_encoder = None
 
 # SentenceTransformer.encode is not reliably thread-safe; explore uses a thread pool.
+# По умолчанию encode идёт через encoder_service (один рабочий поток на модель, micro-batching);
+# блокировка — для ENCODER_BATCHING=false.
 _encode_lock = threading.Lock()
 
-# (internal_role, grade) -> (tuple of skill names in encode order, passage embeddings matrix)
-_role_requirement_emb_cache: "OrderedDict[Tuple[str, str], Tuple[Tuple[str, ...], Any]]" = OrderedDict()
-_role_req_emb_lock = threading.Lock()
-_ROLE_REQ_EMB_CACHE_MAX = 512
-
 # --- Qdrant через REST API ---
 
 
@@ -37,24 +43,121 @@ def _qdrant_rest_config():
     return base, headers
 
 
-def _qdrant_rest_req(method: str, path: str, body: Optional[dict] = None) -> Optional[dict]:
-    """Выполняет HTTP-запрос к Qdrant REST API. Возвращает JSON-ответ или None при ошибке."""
+class _QdrantConnectionPool:
+    """Пул keep-alive HTTP(S)-соединений к одному хосту Qdrant (http.client, без сторонних зависимостей).
+
+    Соединение берётся из пула на время запроса и возвращается после полного чтения ответа.
+    Таймаут задаётся на вызов (deadline на весь запрос); переиспользованное соединение,
+    закрытое сервером по idle-таймауту, один раз переоткрывается."""
+
+    def __init__(self, base_url: str, max_size: int):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.base_url = base_url
+        self.scheme = parsed.scheme or "http"
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip("/")
+        self.max_size = max(1, max_size)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=timeout)
+
+    def _acquire(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._new_connection(timeout), False
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def request(
+        self, method: str, path: str, body: Optional[bytes], headers: Dict[str, str], timeout: float
+    ) -> Tuple[int, str, bytes]:
+        deadline = time.monotonic() + timeout
+        for attempt in range(2):
+            conn, reused = self._acquire(timeout)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                conn.close()
+                raise TimeoutError(f"Qdrant: истёк таймаут {timeout} с")
+            conn.timeout = remaining
+            if conn.sock is not None:
+                conn.sock.settimeout(remaining)
+            try:
+                conn.request(method, f"{self.prefix}{path}", body=body, headers=headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return resp.status, resp.reason, raw
+        raise ConnectionError("Qdrant: соединение закрыто сервером")
+
+
+_qdrant_pool: Optional[_QdrantConnectionPool] = None
+_qdrant_pool_lock = threading.Lock()
+
+
+def _get_qdrant_pool(base: str) -> _QdrantConnectionPool:
+    """Пул на текущий QDRANT_URL (пересоздаётся, если URL поменялся)."""
+    global _qdrant_pool
+    with _qdrant_pool_lock:
+        pool = _qdrant_pool
+        if pool is None or pool.base_url != base:
+            if pool is not None:
+                pool.close()
+            pool = _QdrantConnectionPool(base, Config.QDRANT_POOL_SIZE)
+            _qdrant_pool = pool
+        return pool
+
+
+def _qdrant_rest_req(
+    method: str, path: str, body: Optional[dict] = None, timeout: Optional[float] = None
+) -> Optional[dict]:
+    """Выполняет HTTP-запрос к Qdrant REST API через пул соединений. Возвращает JSON-ответ или None при ошибке.
+
+    timeout — deadline на весь запрос (по умолчанию QDRANT_TIMEOUT_SEC)."""
     base, headers = _qdrant_rest_config()
     if not base:
         return None
-    full_url = f"{base}{path}"
     data = json.dumps(body).encode("utf-8") if body else None
-    req = urllib.request.Request(full_url, data=data, headers=headers, method=method)
+    timeout = timeout if timeout is not None else Config.QDRANT_TIMEOUT_SEC
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            raw = resp.read().decode("utf-8")
-            return json.loads(raw) if raw else {}
-    except urllib.error.HTTPError as e:
-        print(f"⚠️ Qdrant HTTP {e.code}: {e.reason}")
-        return None
+        status, reason, raw = _get_qdrant_pool(base).request(method, path, data, headers, timeout)
     except Exception as e:
         print(f"⚠️ Qdrant недоступен: {e}")
         return None
+    if status >= 400:
+        print(f"⚠️ Qdrant HTTP {status}: {reason}")
+        return None
+    try:
+        return json.loads(raw.decode("utf-8")) if raw else {}
+    except ValueError as e:
+        print(f"⚠️ Qdrant: некорректный ответ: {e}")
+        return None
 
 
 def _qdrant_rest_get_collections() -> List[str]:
@@ -67,25 +170,76 @@ def _qdrant_rest_get_collections() -> List[str]:
 
 def _qdrant_rest_delete_collection(name: str) -> bool:
     """Удаляет коллекцию."""
-    return _qdrant_rest_req("DELETE", f"/collections/{name}") is not None
+    return _qdrant_rest_req("DELETE", f"/collections/{name}", timeout=Config.QDRANT_INDEX_TIMEOUT_SEC) is not None
 
 
 def _qdrant_rest_create_collection(name: str, vector_size: int) -> bool:
     """Создаёт коллекцию с косинусной метрикой."""
     body = {"vectors": {"size": vector_size, "distance": "Cosine"}}
-    return _qdrant_rest_req("PUT", f"/collections/{name}", body) is not None
+    return _qdrant_rest_req("PUT", f"/collections/{name}", body, timeout=Config.QDRANT_INDEX_TIMEOUT_SEC) is not None
 
 
 def _qdrant_rest_upsert(collection: str, points: List[Dict]) -> bool:
-    """Загружает точки. points: [{"id": int, "vector": [...], "payload": {...}}, ...]."""
-    body = {"points": points}
-    return _qdrant_rest_req("PUT", f"/collections/{collection}/points?wait=true", body) is not None
+    """Загружает точки. points: [{"id": int, "vector": [...] или ndarray, "payload": {...}}, ...]."""
+    body = {
+        "points": [
+            {**p, "vector": p["vector"].tolist() if hasattr(p["vector"], "tolist") else p["vector"]}
+            for p in points
+        ]
+    }
+    return _qdrant_rest_req(
+        "PUT", f"/collections/{collection}/points?wait=true", body, timeout=Config.QDRANT_INDEX_TIMEOUT_SEC
+    ) is not None
+
+
+def _qdrant_rest_delete_points(collection: str, point_ids: List[Any]) -> bool:
+    body = {"points": list(point_ids)}
+    return _qdrant_rest_req(
+        "POST", f"/collections/{collection}/points/delete?wait=true", body, timeout=Config.QDRANT_INDEX_TIMEOUT_SEC
+    ) is not None
+
+
+def _qdrant_rest_point_payloads(collection: str, fields: Optional[List[str]] = None) -> Optional[Dict[Any, Dict]]:
+    """id точки -> payload (только fields, если заданы) постраничным scroll; None при ошибке."""
+    out: Dict[Any, Dict] = {}
+    offset = None
+    while True:
+        body: Dict[str, Any] = {"limit": 1000, "with_payload": fields if fields else True, "with_vector": False}
+        if offset is not None:
+            body["offset"] = offset
+        resp = _qdrant_rest_req(
+            "POST", f"/collections/{collection}/points/scroll", body, timeout=Config.QDRANT_INDEX_TIMEOUT_SEC
+        )
+        if not resp or "result" not in resp:
+            return None
+        result = resp.get("result") or {}
+        for point in result.get("points") or []:
+            out[point.get("id")] = point.get("payload") or {}
+        offset = result.get("next_page_offset")
+        if offset is None:
+            return out
 
 
-def _qdrant_rest_search(
-    collection: str, vector: List[float], limit: int, score_threshold: float
-) -> List[Dict]:
-    """Поиск. Возвращает [{"score": float, "payload": {...}}, ...]."""
+def _qdrant_rest_get_aliases() -> Dict[str, str]:
+    out = _qdrant_rest_req("GET", "/aliases")
+    aliases = ((out or {}).get("result") or {}).get("aliases") or []
+    return {a.get("alias_name", ""): a.get("collection_name", "") for a in aliases}
+
+
+def _qdrant_rest_update_alias(alias: str, collection: str) -> bool:
+    """Создаёт или переключает алиас одним запросом (действия применяются атомарно)."""
+    actions = []
+    if alias in _qdrant_rest_get_aliases():
+        actions.append({"delete_alias": {"alias_name": alias}})
+    actions.append({"create_alias": {"collection_name": collection, "alias_name": alias}})
+    return _qdrant_rest_req(
+        "POST", "/collections/aliases", {"actions": actions}, timeout=Config.QDRANT_INDEX_TIMEOUT_SEC
+    ) is not None
+
+
+def _search_body(
+    vector: List[float], limit: int, score_threshold: float, query_filter: Optional[dict] = None
+) -> Dict[str, Any]:
     body = {
         "vector": vector,
         "limit": limit,
@@ -93,15 +247,120 @@ def _qdrant_rest_search(
         "with_vector": False,
         "score_threshold": score_threshold,
     }
-    out = _qdrant_rest_req("POST", f"/collections/{collection}/points/search", body)
-    if not out or "result" not in out:
-        return []
+    if query_filter:
+        body["filter"] = query_filter
+    return body
+
+
+def _parse_hits(result: Any) -> List[Dict]:
     return [
         {"score": h.get("score", 0.0), "payload": h.get("payload") or {}}
-        for h in out.get("result", [])
+        for h in (result or [])
     ]
 
 
+def _qdrant_rest_search(
+    collection: str, vector: List[float], limit: int, score_threshold: float, query_filter: Optional[dict] = None
+) -> List[Dict]:
+    """Поиск. Возвращает [{"score": float, "payload": {...}}, ...]."""
+    body = _search_body(vector, limit, score_threshold, query_filter)
+    out = _qdrant_rest_req("POST", f"/collections/{collection}/points/search", body)
+    if not out or "result" not in out:
+        return []
+    return _parse_hits(out.get("result"))
+
+
+def _qdrant_rest_search_batch(
+    collection: str,
+    vectors: List[List[float]],
+    limit: int,
+    score_threshold: float,
+    query_filter: Optional[dict] = None,
+) -> List[List[Dict]]:
+    """N поисков за один запрос (points/search/batch). Результаты — в порядке vectors."""
+    if not vectors:
+        return []
+    body = {"searches": [_search_body(v, limit, score_threshold, query_filter) for v in vectors]}
+    out = _qdrant_rest_req("POST", f"/collections/{collection}/points/search/batch", body)
+    results = (out or {}).get("result")
+    if not isinstance(results, list) or len(results) != len(vectors):
+        return [[] for _ in vectors]
+    return [_parse_hits(r) for r in results]
+
+
+class _QdrantRestStore:
+    """Qdrant через REST: тот же интерфейс, что у local_vector_store.LocalVectorStore."""
+
+    def has_collection(self, name: str) -> bool:
+        return True
+
+    def get_collections(self) -> List[str]:
+        return _qdrant_rest_get_collections()
+
+    def delete_collection(self, name: str) -> bool:
+        return _qdrant_rest_delete_collection(name)
+
+    def create_collection(self, name: str, vector_size: int) -> bool:
+        return _qdrant_rest_create_collection(name, vector_size)
+
+    def upsert(self, collection: str, points: List[Dict]) -> bool:
+        return _qdrant_rest_upsert(collection, points)
+
+    def delete_points(self, collection: str, point_ids: List[Any]) -> bool:
+        return _qdrant_rest_delete_points(collection, point_ids)
+
+    def point_payloads(self, collection: str) -> Optional[Dict[Any, Dict]]:
+        return _qdrant_rest_point_payloads(collection, fields=["content_hash"])
+
+    def get_aliases(self) -> Dict[str, str]:
+        return _qdrant_rest_get_aliases()
+
+    def update_alias(self, alias: str, collection: str) -> bool:
+        return _qdrant_rest_update_alias(alias, collection)
+
+    def search(self, collection, vector, limit, score_threshold, query_filter=None) -> List[Dict]:
+        return _qdrant_rest_search(collection, vector, limit, score_threshold, query_filter)
+
+    def search_batch(self, collection, vectors, limit, score_threshold, query_filter=None) -> List[List[Dict]]:
+        return _qdrant_rest_search_batch(collection, vectors, limit, score_threshold, query_filter)
+
+
+_local_store = None
+_local_store_lock = threading.Lock()
+
+
+def _get_local_store():
+    global _local_store
+    root = Path(Config.LOCAL_VECTOR_DIR)
+    with _local_store_lock:
+        if _local_store is None or _local_store.root != root:
+            from local_vector_store import LocalVectorStore
+            _local_store = LocalVectorStore(
+                root, nprobe=Config.LOCAL_VECTOR_NPROBE, ivf_min_points=Config.LOCAL_VECTOR_IVF_MIN_POINTS
+            )
+        return _local_store
+
+
+def _vector_store():
+    """Бэкенд векторного поиска по VECTOR_BACKEND: qdrant, local или auto (Qdrant, если задан, иначе local)."""
+    backend = (Config.VECTOR_BACKEND or "auto").strip().lower()
+    if backend == "local":
+        return _get_local_store()
+    if _qdrant_rest_config()[0]:
+        return _QdrantRestStore()
+    if backend == "auto":
+        return _get_local_store()
+    return None
+
+
+def _vector_store_for(collection: str):
+    """Бэкенд для поиска по коллекции; None, если искать негде (локальная коллекция не построена)."""
+    store = _vector_store()
+    if store is None or not store.has_collection(collection):
+        return None
+    return store
+
+
 def normalize_user_input(text: str) -> str:
     """
     Нормализация пользовательского ввода перед эмбеддингом: lower, strip, схлопывание пробелов.
@@ -135,27 +394,6 @@ def _tokenize_for_lexical(text: str) -> List[str]:
     return [t for t in tokens if len(t) >= 2]
 
 
-def _lexical_jaccard(query: str, candidate: str) -> float:
-    """Hybrid lexical: rapidfuzz token_sort_ratio + Jaccard on tokens."""
-    from rapidfuzz import fuzz as _rfuzz
-
-    nq = normalize_user_input(query or "")
-    nc = normalize_user_input(candidate or "")
-    if not nq or not nc:
-        return 0.0
-
-    token_sort = _rfuzz.token_sort_ratio(nq, nc) / 100.0
-
-    q_tok = set(_tokenize_for_lexical(query))
-    c_tok = set(_tokenize_for_lexical(candidate))
-    if q_tok and c_tok:
-        jaccard = len(q_tok & c_tok) / len(q_tok | c_tok)
-    else:
-        jaccard = 0.0
-
-    return 0.6 * token_sort + 0.4 * jaccard
-
-
 def _rrf_rank_fusion(dense_rank: int, lexical_rank: int, rrf_k: float) -> float:
     """
     Reciprocal Rank Fusion:
@@ -179,58 +417,105 @@ def _get_cross_encoder():
         return None
 
 
-def _cross_encoder_rerank(query: str, candidates: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+def _cross_encoder_scores(pairs: List[Tuple[str, str]]) -> Optional[List[float]]:
+    """Score пар (фраза, имя навыка): известные — из LRU-кэша, остальные — одним predict."""
     ce = _get_cross_encoder()
-    if ce is None or not candidates:
-        return candidates[:top_n]
-    try:
-        pairs = [(query, c.get("name", "")) for c in candidates]
-        ce_scores = ce.predict(pairs)
+    if ce is None:
+        return None
+    from query_cache import get_pair_score_cache
+
+    def predict(batch: List[Tuple[str, str]]) -> Any:
+        return ce.predict(batch, batch_size=max(1, Config.CROSS_ENCODER_BATCH_SIZE))
+
+    cache = get_pair_score_cache()
+    if cache is None:
+        return [float(x) for x in predict(pairs)]
+    return cache.score(pairs, Config.SKILLS_CROSS_ENCODER_MODEL.strip(), predict)
+
+
+def _cross_encoder_rerank_many(
+    queries: List[str], candidate_lists: List[List[Dict[str, Any]]], top_n: int
+) -> List[List[Dict[str, Any]]]:
+    """Rerank первых top_n кандидатов каждого запроса; пары всех запросов скорятся вместе.
+    Хвост после top_n остаётся на месте; без модели или при ошибке списки не меняются."""
+    heads = [rows[: max(1, top_n)] for rows in candidate_lists]
+    pairs = [(q, c.get("name", "")) for q, head in zip(queries, heads) for c in head]
+    scores = None
+    if pairs:
+        try:
+            scores = _cross_encoder_scores(pairs)
+        except Exception:
+            scores = None
+    if scores is None:
+        return [list(rows) for rows in candidate_lists]
+    out = []
+    pos = 0
+    for rows, head in zip(candidate_lists, heads):
         enriched = []
-        for c, score in zip(candidates, ce_scores):
+        for c, score in zip(head, scores[pos: pos + len(head)]):
             row = dict(c)
             row["cross_encoder_score"] = float(score)
             row["score"] = 0.6 * float(row.get("score", 0.0)) + 0.4 * float(score)
             row["retrieval_mode"] = "hybrid_cross_encoder"
             enriched.append(row)
+        pos += len(head)
         enriched.sort(key=lambda x: -float(x.get("score", 0.0)))
-        return enriched[:top_n]
-    except Exception:
-        return candidates[:top_n]
+        out.append(enriched + list(rows[len(head):]))
+    return out
 
 
-def _prepare_skills_cache() -> List[Dict[str, str]]:
-    """
-    Лёгкий кэш канонических навыков для lexical re-rank/fallback.
-    Формат: [{"name": "...", "profession": "..."}]
-    """
-    skills, _ = _load_skills_and_atlas()
-    out: List[Dict[str, str]] = []
-    seen = set()
-    for s in skills:
-        name = (s.get("Навык") or s.get("name") or "").strip()
-        if not name:
-            continue
-        key = name.lower()
-        if key in seen:
-            continue
-        seen.add(key)
-        profession = s.get("Профессия (лист)") or s.get("Профессия") or s.get("Привязка к профессии") or ""
-        if isinstance(profession, list):
-            profession = profession[0] if profession else ""
-        out.append({"name": name, "profession": str(profession or "")})
-    return out
+# catalog_version -> LexicalIndex: нормализованные имена и postings каталога
+_lexical_indexes: Dict[str, Any] = {}
+_lexical_index_lock = threading.Lock()
+
+
+def _get_lexical_index(ref=None) -> Any:
+    from lexical_index import LexicalIndex
+
+    ref = ref or get_reference_data()
+    index = _lexical_indexes.get(ref.version)
+    if index is not None:
+        return index
+    with _lexical_index_lock:
+        index = _lexical_indexes.get(ref.version)
+        if index is None:
+            index = LexicalIndex(ref.tables["skill_rows"], normalize_user_input, _tokenize_for_lexical)
+            # держим только текущую и прогреваемую версии каталога
+            live = {ref.version, get_reference_data().version}
+            for stale in [v for v in _lexical_indexes if v not in live]:
+                del _lexical_indexes[stale]
+            _lexical_indexes[ref.version] = index
+        return index
 
 
-_skills_cache: Optional[List[Dict[str, str]]] = None
+def _reset_reference_caches() -> None:
+    """Хук реестра справочника: производные от каталога кэши строятся заново."""
+    global _skill_embeddings_cache, _snippet_table_cache
+    _skill_embeddings_cache = None
+    _snippet_table_cache = None
+    with _lexical_index_lock:
+        _lexical_indexes.clear()
+    with _explore_index_lock:
+        _explore_indexes.clear()
 
 
-def _get_skills_cache() -> List[Dict[str, str]]:
-    global _skills_cache
-    if _skills_cache is not None:
-        return _skills_cache
-    _skills_cache = _prepare_skills_cache()
-    return _skills_cache
+register_invalidation_hook(_reset_reference_caches)
+
+
+def _warm_reference_caches(ref) -> None:
+    """Хук прогрева новой версии каталога до её публикации.
+
+    Lexical-индекс строится всегда. Индекс explore (эмбеддинги требований ролей) строим только если модель explore уже загружена —
+    перезагрузка каталога не должна сама по себе тянуть модель в память."""
+    _get_lexical_index(ref)
+    if not bool(getattr(Config, "EXPLORE_FAST_EMBEDDINGS", True)):
+        return
+    if Config.EMBED_MODEL_NAME not in _sentence_transformers:
+        return
+    get_explore_index(explore_fast=True, ref=ref)
+
+
+register_warmup_hook(_warm_reference_caches)
 
 
 def _lexical_skill_candidates(
@@ -242,40 +527,21 @@ def _lexical_skill_candidates(
     Возвращает lexical-кандидаты с payload-like структурой:
     [{"score": float, "payload": {"name": "...", "profession": "...", "type": "skill"}}]
     """
-    query = normalize_user_input(user_input or "")
-    if not query:
-        return []
-    rows = _get_skills_cache()
-    scored: List[Tuple[float, Dict[str, str]]] = []
-    for row in rows:
-        name = row.get("name", "")
-        score = _lexical_jaccard(query, name)
-        if score < min_score:
-            continue
-        scored.append((score, row))
-    scored.sort(key=lambda x: -x[0])
-    out: List[Dict[str, Any]] = []
-    for score, row in scored[: max(top_k, 1)]:
-        out.append(
-            {
-                "score": float(score),
-                "payload": {
-                    "type": "skill",
-                    "name": row.get("name", ""),
-                    "profession": row.get("profession", ""),
-                },
-            }
-        )
-    return out
+    return _lexical_skill_candidates_many([user_input], top_k=top_k, min_score=min_score)[0]
 
 
-def _dense_skill_candidates(
-    user_input: str,
+def _lexical_skill_candidates_many(
+    user_inputs: List[str],
     top_k: int,
-    score_threshold: Optional[float] = None,
-) -> List[Dict[str, Any]]:
-    """Dense-кандидаты из skills_v2 в payload-like формате."""
-    hits = search_skills_v2(user_input, top_k=top_k, score_threshold=score_threshold)
+    min_score: float = 0.05,
+) -> List[List[Dict[str, Any]]]:
+    """_lexical_skill_candidates для пачки запросов по предрасчитанному индексу (lexical_index)."""
+    return _get_lexical_index().search_many(
+        user_inputs, top_k=top_k, min_score=min_score, scorer=Config.SKILLS_LEXICAL_SCORER
+    )
+
+
+def _dense_payload_rows(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
     for h in hits:
         payload = h.get("payload") or {}
@@ -295,16 +561,68 @@ def _dense_skill_candidates(
     return out
 
 
-def _get_embedder(model_name: Optional[str] = None):
-    model = model_name or Config.EMBED_MODEL_NAME
-    if model in _sentence_transformers:
-        return _sentence_transformers[model]
+def _dense_skill_candidates(
+    user_input: str,
+    top_k: int,
+    score_threshold: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Dense-кандидаты из skills_v2 в payload-like формате."""
+    return _dense_payload_rows(search_skills_v2(user_input, top_k=top_k, score_threshold=score_threshold))
+
+
+def _dense_skill_candidates_many(
+    user_inputs: List[str],
+    top_k: int,
+    score_threshold: Optional[float] = None,
+) -> List[List[Dict[str, Any]]]:
+    """_dense_skill_candidates для пачки запросов: один encode и один batch-поиск."""
+    hits = search_skills_v2_many(user_inputs, top_k=top_k, score_threshold=score_threshold)
+    return [_dense_payload_rows(h) for h in hits]
+
+
+def _load_sentence_transformer(model: str):
     try:
         from sentence_transformers import SentenceTransformer
-        _sentence_transformers[model] = SentenceTransformer(model)
+        return SentenceTransformer(model)
     except Exception as e:
         raise RuntimeError(f"Не удалось загрузить модель эмбеддингов {model}: {e}")
-    return _sentence_transformers[model]
+
+
+def _get_embedder(model_name: Optional[str] = None):
+    """Эмбеддер модели: SentenceTransformer или ускоренный бэкенд (EMBED_BACKEND, с проверкой паритета)."""
+    model = model_name or Config.EMBED_MODEL_NAME
+    if model in _sentence_transformers:
+        return _sentence_transformers[model]
+    from embedding_backends import load_embedder
+    embedder, backend = load_embedder(model, _load_sentence_transformer)
+    _sentence_transformers[model] = embedder
+    _embedder_backends[model] = backend
+    return embedder
+
+
+def _embedding_namespace(model: str) -> str:
+    """Пространство векторов для кэшей эмбеддингов и content_hash переиндексации: модель и бэкенд
+    (embedder_backends()), чтобы вектора torch, int8 и onnx не смешивались. Для torch — имя модели
+    как есть (прежние ключи). До загрузки модели и с сервером эмбеддингов — запрошенный EMBED_BACKEND."""
+    backend = _embedder_backends.get(model) or (Config.EMBED_BACKEND or "torch").strip().lower()
+    return model if backend == "torch" else f"{model}@{backend}"
+
+
+def _encode_model_batch(model: str, batch: List[str], normalize: bool = True, show_progress_bar: bool = False):
+    """Один encode батча: сервер эмбеддингов или модель в процессе. Зависит только от (model, normalize) —
+    очередь батчинга держит эту функцию для своего ключа весь срок жизни процесса."""
+    if Config.EMBED_SERVER_ADDRESS:
+        from embedding_server import remote_encode
+        try:
+            return remote_encode(Config.EMBED_SERVER_ADDRESS, model, batch, normalize)
+        except OSError:
+            if not Config.EMBED_SERVER_FALLBACK_LOCAL:
+                raise
+    embedder = _get_embedder(model_name=model)
+    # encode модели в процессе не потокобезопасен: очередь батчинга держит несколько
+    # воркеров на модель (EMBED_SERVER_REPLICAS), и fallback с них идёт сюда же
+    with _encode_lock:
+        return embedder.encode(batch, normalize_embeddings=normalize, show_progress_bar=show_progress_bar)
 
 
 def _encode_texts(
@@ -312,60 +630,79 @@ def _encode_texts(
     model_name: Optional[str] = None,
     normalize: bool = True,
     show_progress_bar: bool = False,
+    prefix: str = "",
+    persist: bool = False,
 ):
-    embedder = _get_embedder(model_name=model_name)
-    with _encode_lock:
-        return embedder.encode(texts, normalize_embeddings=normalize, show_progress_bar=show_progress_bar)
+    """Эмбеддинги prefix + text. persist=True — тексты каталога: читаются из постоянного
+    хранилища (embedding_store), недостающие считаются энкодером и дописываются.
+    Остальные тексты (запросы) идут через LRU-кэш query_cache. show_progress_bar — вызов
+    в обход очереди батчинга: батч склеивается из запросов разных вызывающих."""
+    model = model_name or Config.EMBED_MODEL_NAME
 
+    def _run(batch: List[str]):
+        if Config.ENCODER_BATCHING and not show_progress_bar:
+            from encoder_service import get_batching_encoder
+            return get_batching_encoder().encode(
+                (model, normalize), batch, functools.partial(_encode_model_batch, model, normalize=normalize)
+            )
+        return _encode_model_batch(model, batch, normalize=normalize, show_progress_bar=show_progress_bar)
+
+    if persist:
+        from embedding_store import get_embedding_store
+        store = get_embedding_store()
+        if store is not None:
+            return store.encode(
+                texts, _embedding_namespace(model), prefix, _run, normalize=normalize,
+                resolve_model=lambda: _embedding_namespace(model),
+            )
+    full_texts = [prefix + t for t in texts] if prefix else list(texts)
+    from query_cache import get_query_cache
+    cache = get_query_cache()
+    if cache is not None:
+        return cache.encode(
+            full_texts, _embedding_namespace(model), _run, normalize=normalize,
+            resolve_model=lambda: _embedding_namespace(model),
+        )
+    return _run(full_texts)
 
-def _cached_role_passage_embeddings(
-    role_key: Tuple[str, str],
-    required_skill_names: List[str],
-    explore_fast: bool = False,
-) -> Any:
-    """Passage-side embeddings for one role×grade; reused by semantic_match + profile_sim in explore."""
-    names_t = tuple(required_skill_names)
-    cache_key = (role_key[0], role_key[1], explore_fast)
-    with _role_req_emb_lock:
-        hit = _role_requirement_emb_cache.get(cache_key)
-        if hit is not None and hit[0] == names_t:
-            _role_requirement_emb_cache.move_to_end(cache_key)
-            return hit[1]
-    req_vecs = _encode_for_matching(
-        list(required_skill_names), is_query=False, explore_fast=explore_fast
-    )
-    with _role_req_emb_lock:
-        _role_requirement_emb_cache[cache_key] = (names_t, req_vecs)
-        _role_requirement_emb_cache.move_to_end(cache_key)
-        while len(_role_requirement_emb_cache) > _ROLE_REQ_EMB_CACHE_MAX:
-            _role_requirement_emb_cache.popitem(last=False)
-    return req_vecs
-
-
-def _e5_query_text(raw_skill: str) -> str:
-    return (
-        "Instruct: Retrieve the canonical skill name matching this resume phrase\n"
-        f"Query: {raw_skill}"
-    )
 
+# (catalog_version, explore_fast) -> ExploreIndex
+_explore_indexes: Dict[Tuple[str, bool], Any] = {}
+_explore_index_lock = threading.Lock()
+
+
+def get_explore_index(explore_fast: bool = False, ref=None) -> Any:
+    """Индекс explore (explore_index.ExploreIndex) для версии каталога: все роли × грейды,
+    эмбеддинги уникальных навыков требований считаются один раз."""
+    from explore_index import build_explore_index
+
+    ref = ref or get_reference_data()
+    key = (ref.version, bool(explore_fast))
+    with _explore_index_lock:
+        index = _explore_indexes.get(key)
+        if index is not None:
+            return index
+        index = build_explore_index(
+            ref.data_loader,
+            lambda names: _encode_for_matching(names, is_query=False, explore_fast=explore_fast),
+        )
+        # держим только текущую и прогреваемую версии каталога
+        live = {ref.version, get_reference_data().version}
+        for stale in [k for k in _explore_indexes if k[0] not in live]:
+            del _explore_indexes[stale]
+        _explore_indexes[key] = index
+        return index
+
+
+_E5_QUERY_PREFIX = "Instruct: Retrieve the canonical skill name matching this resume phrase\nQuery: "
+_E5_PASSAGE_PREFIX = "passage: "
 
-def _e5_passage_text(canonical_name: str) -> str:
-    return f"passage: {canonical_name}"
 
 
 def _load_skills_and_atlas() -> Tuple[List[Dict], List[Dict]]:
-    """Загружает clean_skills.json и atlas_params_clean.json."""
-    skills_path = Path(Config.SKILLS_FILE)
-    atlas_path = Path(Config.ATLAS_FILE)
-    if not skills_path.is_absolute():
-        skills_path = Path(__file__).resolve().parent / skills_path
-    if not atlas_path.is_absolute():
-        atlas_path = Path(__file__).resolve().parent / atlas_path
-    with open(skills_path, "r", encoding="utf-8") as f:
-        skills = json.load(f)
-    with open(atlas_path, "r", encoding="utf-8") as f:
-        atlas = json.load(f)
-    return skills, atlas
+    """clean_skills.json и atlas_params_clean.json из процессного реестра справочника."""
+    ref = get_reference_data()
+    return ref.skills, ref.atlas_params
 
 
 def _skill_to_text(s: Dict) -> str:
@@ -433,19 +770,13 @@ def _load_or_build_skill_clusters(skills: List[Dict]) -> Tuple[Dict[str, int], D
     Загружает skill_clusters.json или строит кластеры по эмбеддингам навыков и сохраняет файл.
     Возвращает (skill_name -> cluster_id, cluster_id -> label).
     """
+    ref = get_reference_data()
+    if ref.skill_clusters:
+        return dict(ref.skill_clusters), dict(ref.cluster_labels)
     skills_path = Path(Config.SKILLS_FILE)
     if not skills_path.is_absolute():
         skills_path = Path(__file__).resolve().parent / skills_path
     clusters_path = skills_path.parent / "skill_clusters.json"
-    if clusters_path.exists():
-        try:
-            with open(clusters_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            skills_map = data.get("skills") or {}
-            labels = {str(k): v for k, v in (data.get("labels") or {}).items()}
-            return skills_map, labels
-        except Exception:
-            pass
     # Построить кластеры
     try:
         from sklearn.cluster import KMeans
@@ -461,8 +792,7 @@ def _load_or_build_skill_clusters(skills: List[Dict]) -> Tuple[Dict[str, int], D
         texts.append(_skill_to_text(s))
     if len(names) < 3:
         return {}, {}
-    embedder = _get_embedder(model_name=Config.EMBED_MODEL_NAME)
-    vectors = embedder.encode(texts, normalize_embeddings=True)
+    vectors = _encode_texts(texts, model_name=Config.EMBED_MODEL_NAME, normalize=True, persist=True)
     n_clusters = min(25, max(2, len(names) // 5))
     kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
     labels_arr = kmeans.fit_predict(vectors)
@@ -475,63 +805,86 @@ def _load_or_build_skill_clusters(skills: List[Dict]) -> Tuple[Dict[str, int], D
     try:
         with open(clusters_path, "w", encoding="utf-8") as f:
             json.dump(to_save, f, ensure_ascii=False, indent=0)
+        invalidate_reference_data()
     except Exception:
         pass
     return skill_to_id, {str(k): v for k, v in id_to_label.items()}
 
 
+def _reindex_options() -> Dict[str, int]:
+    return {
+        "chunk_size": Config.REINDEX_CHUNK_SIZE,
+        "workers": Config.REINDEX_WORKERS,
+        "retries": Config.REINDEX_RETRIES,
+    }
+
+
+def _reindex_namespace(model: str) -> str:
+    """Модель с фактическим бэкендом для content_hash: без сервера эмбеддингов модель загружается,
+    чтобы смена EMBED_BACKEND (или откат int8/onnx на torch по паритету) перекодировала коллекцию."""
+    if not Config.EMBED_SERVER_ADDRESS:
+        try:
+            _get_embedder(model_name=model)
+        except Exception:
+            pass
+    return _embedding_namespace(model)
+
+
+def _document_key(payload: Dict) -> str:
+    """Идентичность документа для id точки: тип, имя и профессия (атлас — без профессии)."""
+    return "\x1f".join([payload.get("type", ""), payload.get("name", ""), payload.get("profession", "")])
+
+
 def build_index(force_recreate: bool = False) -> Optional[int]:
     """
-    Строит индекс RAG из skills + atlas, загружает в Qdrant через REST.
-    Возвращает число загруженных точек или None при ошибке.
+    Строит индекс RAG из skills + atlas, загружает в векторное хранилище (Qdrant или локальное).
+    Без force_recreate кодируются и загружаются только новые и изменённые документы,
+    точки удалённых — удаляются; полная сборка идёт в новую коллекцию с переключением
+    алиаса (vector_sync.sync_collection). Возвращает число точек или None при ошибке.
     """
-    if not _qdrant_rest_config()[0]:
+    from vector_sync import sync_collection
+
+    store = _vector_store()
+    if store is None:
         return None
-    embedder = _get_embedder(model_name=Config.EMBED_MODEL_NAME)
     skills, atlas = _load_skills_and_atlas()
     skill_cluster_map, cluster_labels = _load_or_build_skill_clusters(skills)
     docs = build_documents(skills, atlas, skill_cluster_map, cluster_labels)
-    texts = [t for t, _ in docs]
-    payloads = [p for _, p in docs]
-    vectors = embedder.encode(texts, normalize_embeddings=True)
-    vector_size = int(vectors.shape[1])
-    collection = Config.RAG_COLLECTION_NAME
+    model = Config.EMBED_MODEL_NAME
     try:
-        existing = _qdrant_rest_get_collections()
-        if collection in existing:
-            if force_recreate:
-                _qdrant_rest_delete_collection(collection)
-                existing = _qdrant_rest_get_collections()
-        if collection not in existing:
-            if not _qdrant_rest_create_collection(collection, vector_size):
-                return None
-        points = [
-            {
-                "id": idx,
-                "vector": vectors[idx].tolist(),
-                "payload": {"text": texts[idx], **payloads[idx]},
-            }
-            for idx in range(len(texts))
-        ]
-        if not _qdrant_rest_upsert(collection, points):
-            return None
-        return len(points)
+        result = sync_collection(
+            store,
+            Config.RAG_COLLECTION_NAME,
+            [(_document_key(payload), text, {"text": text, **payload}) for text, payload in docs],
+            lambda texts: _encode_texts(texts, model_name=model, normalize=True, persist=True),
+            _reindex_namespace(model),
+            force_recreate=force_recreate,
+            **_reindex_options(),
+        )
     except Exception as e:
         print(f"⚠️ Ошибка построения индекса RAG: {e}")
         return None
+    if result is None:
+        return None
+    snippet_count = build_skill_snippet_table(skills, atlas)
+    if snippet_count is None:
+        print("⚠️ Не удалось построить таблицу сниппетов навыков")
+    return result.points
 
 
 def build_skills_v2_index(force_recreate: bool = False) -> Optional[int]:
     """
     Строит индекс только канонических названий навыков для E5-инференса.
-    Коллекция: Config.SKILLS_V2_COLLECTION_NAME.
+    Коллекция (алиас): Config.SKILLS_V2_COLLECTION_NAME; обновление — как в build_index.
     """
-    if not _qdrant_rest_config()[0]:
+    from vector_sync import sync_collection
+
+    store = _vector_store()
+    if store is None:
         return None
     try:
         skills, _ = _load_skills_and_atlas()
-        names = []
-        payloads = []
+        docs = []
         for s in skills:
             name = (s.get("Навык") or s.get("name") or "").strip()
             if not name:
@@ -539,37 +892,25 @@ def build_skills_v2_index(force_recreate: bool = False) -> Optional[int]:
             profession = s.get("Профессия (лист)") or s.get("Профессия") or s.get("Привязка к профессии") or ""
             if isinstance(profession, list):
                 profession = profession[0] if profession else ""
-            names.append(name)
-            payloads.append({"type": "skill", "name": name, "profession": profession})
+            payload = {"type": "skill", "name": name, "profession": profession}
+            docs.append((_document_key(payload), name, payload))
 
-        if not names:
+        if not docs:
             return 0
 
-        texts = [_e5_passage_text(n) for n in names]
-        vectors = _encode_texts(texts, model_name=Config.EMBED_MODEL_NAME_V2, normalize=True)
-        vector_size = int(vectors.shape[1])
-        collection = Config.SKILLS_V2_COLLECTION_NAME
-
-        existing = _qdrant_rest_get_collections()
-        if collection in existing and force_recreate:
-            _qdrant_rest_delete_collection(collection)
-            existing = _qdrant_rest_get_collections()
-        if collection not in existing:
-            if not _qdrant_rest_create_collection(collection, vector_size):
-                return None
-
-        points = []
-        for idx, name in enumerate(names):
-            points.append(
-                {
-                    "id": idx,
-                    "vector": vectors[idx].tolist(),
-                    "payload": payloads[idx],
-                }
-            )
-        if not _qdrant_rest_upsert(collection, points):
-            return None
-        return len(points)
+        model = Config.EMBED_MODEL_NAME_V2
+        result = sync_collection(
+            store,
+            Config.SKILLS_V2_COLLECTION_NAME,
+            docs,
+            lambda texts: _encode_texts(
+                texts, model_name=model, normalize=True, prefix=_E5_PASSAGE_PREFIX, persist=True
+            ),
+            f"{_reindex_namespace(model)}|{_E5_PASSAGE_PREFIX}",
+            force_recreate=force_recreate,
+            **_reindex_options(),
+        )
+        return result.points if result is not None else None
     except Exception as e:
         print(f"⚠️ Ошибка построения индекса skills_v2: {e}")
         return None
@@ -577,18 +918,18 @@ def build_skills_v2_index(force_recreate: bool = False) -> Optional[int]:
 
 def retrieve(query: str, top_k: Optional[int] = None, score_threshold: Optional[float] = None) -> List[Dict]:
     """
-    Векторный поиск по индексу RAG (через REST).
+    Векторный поиск по индексу RAG (Qdrant REST или локальное хранилище, см. VECTOR_BACKEND).
     Возвращает список { "score": float, "payload": { "text", "type", "name", ... } }.
     """
     query = normalize_user_input(query or "")
     top_k = top_k if top_k is not None else Config.RAG_TOP_K
     score_threshold = score_threshold if score_threshold is not None else Config.RAG_SCORE_THRESHOLD
-    if not _qdrant_rest_config()[0]:
+    store = _vector_store_for(Config.RAG_COLLECTION_NAME)
+    if store is None:
         return []
-    embedder = _get_embedder(model_name=Config.EMBED_MODEL_NAME)
-    qvec = embedder.encode([query], normalize_embeddings=True)[0].tolist()
+    qvec = _encode_texts([query], model_name=Config.EMBED_MODEL_NAME, normalize=True)[0].tolist()
     try:
-        return _qdrant_rest_search(
+        return store.search(
             Config.RAG_COLLECTION_NAME, qvec, limit=top_k, score_threshold=score_threshold
         )
     except Exception as e:
@@ -596,6 +937,30 @@ def retrieve(query: str, top_k: Optional[int] = None, score_threshold: Optional[
         return []
 
 
+def retrieve_many(
+    queries: List[str], top_k: Optional[int] = None, score_threshold: Optional[float] = None
+) -> List[List[Dict]]:
+    """
+    Пакетный retrieve: один прогон энкодера и один batch-запрос к Qdrant на все запросы.
+    Результаты в порядке queries; пустой запрос или ошибка — пустой список на его месте.
+    """
+    queries = [normalize_user_input(q or "") for q in queries]
+    empty: List[List[Dict]] = [[] for _ in queries]
+    store = _vector_store_for(Config.RAG_COLLECTION_NAME)
+    if not queries or store is None:
+        return empty
+    top_k = top_k if top_k is not None else Config.RAG_TOP_K
+    score_threshold = score_threshold if score_threshold is not None else Config.RAG_SCORE_THRESHOLD
+    try:
+        vecs = _encode_texts(queries, model_name=Config.EMBED_MODEL_NAME, normalize=True)
+        return store.search_batch(
+            Config.RAG_COLLECTION_NAME, [v.tolist() for v in vecs], limit=top_k, score_threshold=score_threshold
+        )
+    except Exception as e:
+        print(f"⚠️ Ошибка пакетного поиска RAG: {e}")
+        return empty
+
+
 def search_skills_v2(
     user_input: str,
     top_k: Optional[int] = None,
@@ -608,9 +973,9 @@ def search_skills_v2(
     normalized = normalize_user_input(user_input or "")
     if not normalized:
         return []
-    if not _qdrant_rest_config()[0]:
+    store = _vector_store_for(Config.SKILLS_V2_COLLECTION_NAME)
+    if store is None:
         return []
-    query = _e5_query_text(normalized)
     top_k = top_k if top_k is not None else Config.SKILLS_V2_TOP_K
     threshold = (
         score_threshold
@@ -618,8 +983,10 @@ def search_skills_v2(
         else Config.SKILLS_V2_SCORE_THRESHOLD
     )
     try:
-        qvec = _encode_texts([query], model_name=Config.EMBED_MODEL_NAME_V2, normalize=True)[0].tolist()
-        return _qdrant_rest_search(
+        qvec = _encode_texts(
+            [normalized], model_name=Config.EMBED_MODEL_NAME_V2, normalize=True, prefix=_E5_QUERY_PREFIX
+        )[0].tolist()
+        return store.search(
             Config.SKILLS_V2_COLLECTION_NAME,
             qvec,
             limit=top_k,
@@ -630,6 +997,42 @@ def search_skills_v2(
         return []
 
 
+def search_skills_v2_many(
+    user_inputs: List[str],
+    top_k: Optional[int] = None,
+    score_threshold: Optional[float] = None,
+) -> List[List[Dict]]:
+    """Пакетный search_skills_v2: один прогон E5 и один batch-запрос к skills_v2."""
+    normalized = [normalize_user_input(u or "") for u in user_inputs]
+    out: List[List[Dict]] = [[] for _ in normalized]
+    positions = [i for i, n in enumerate(normalized) if n]
+    store = _vector_store_for(Config.SKILLS_V2_COLLECTION_NAME)
+    if not positions or store is None:
+        return out
+    top_k = top_k if top_k is not None else Config.SKILLS_V2_TOP_K
+    threshold = (
+        score_threshold
+        if score_threshold is not None
+        else Config.SKILLS_V2_SCORE_THRESHOLD
+    )
+    try:
+        vecs = _encode_texts(
+            [normalized[i] for i in positions],
+            model_name=Config.EMBED_MODEL_NAME_V2,
+            normalize=True,
+            prefix=_E5_QUERY_PREFIX,
+        )
+        hits = store.search_batch(
+            Config.SKILLS_V2_COLLECTION_NAME, [v.tolist() for v in vecs], limit=top_k, score_threshold=threshold
+        )
+    except Exception as e:
+        print(f"⚠️ Ошибка пакетного поиска skills_v2: {e}")
+        return out
+    for i, h in zip(positions, hits):
+        out[i] = h
+    return out
+
+
 def get_skills_v2_candidates(
     user_input: str,
     top_k: Optional[int] = None,
@@ -647,7 +1050,56 @@ def get_skills_v2_candidates(
     dense_fetch_k = max(requested_top_k * 4, requested_top_k + 5)
     dense_hits = _dense_skill_candidates(user_input, top_k=dense_fetch_k, score_threshold=score_threshold)
     lexical_hits = _lexical_skill_candidates(user_input, top_k=dense_fetch_k)
+    return _fuse_skill_candidates(user_input, dense_hits, lexical_hits, mode, requested_top_k, dense_fetch_k)
 
+
+def get_skills_v2_candidates_batch(
+    raw_skills: List[str],
+    top_k: Optional[int] = None,
+    score_threshold: Optional[float] = None,
+    retrieval_mode: Optional[str] = None,
+) -> List[List[Dict[str, Any]]]:
+    """get_skills_v2_candidates для всех навыков резюме сразу: один E5-encode, один batch-поиск
+    в skills_v2 и один lexical-проход по каталогу; fusion и rerank — как для одиночного запроса.
+    Одинаковые фразы считаются один раз."""
+    mode = (retrieval_mode or Config.SKILLS_RETRIEVAL_MODE or "hybrid_rerank").strip().lower()
+    requested_top_k = top_k or Config.SKILLS_V2_TOP_K
+    dense_fetch_k = max(requested_top_k * 4, requested_top_k + 5)
+    unique = list(dict.fromkeys(raw_skills))
+    if not unique:
+        return []
+    no_hits: List[List[Dict[str, Any]]] = [[] for _ in unique]
+    dense_many = (
+        _dense_skill_candidates_many(unique, top_k=dense_fetch_k, score_threshold=score_threshold)
+        if mode != "lexical_only" else no_hits
+    )
+    lexical_many = _lexical_skill_candidates_many(unique, top_k=dense_fetch_k) if mode != "dense_only" else no_hits
+    if mode in ("dense_only", "lexical_only"):
+        fused = {
+            raw: _fuse_skill_candidates(raw, dense_hits, lexical_hits, mode, requested_top_k, dense_fetch_k)
+            for raw, dense_hits, lexical_hits in zip(unique, dense_many, lexical_many)
+        }
+    else:
+        rows = [
+            _hybrid_rows(dense_hits, lexical_hits, dense_fetch_k)
+            for dense_hits, lexical_hits in zip(dense_many, lexical_many)
+        ]
+        if (Config.SKILLS_CROSS_ENCODER_MODEL or "").strip():
+            # один predict на пары всех фраз резюме
+            rows = _cross_encoder_rerank_many(unique, rows, Config.SKILLS_HYBRID_RERANK_TOP_N)
+        fused = {raw: _select_hybrid(r, requested_top_k) for raw, r in zip(unique, rows)}
+    return [[dict(row) for row in fused[raw]] for raw in raw_skills]
+
+
+def _fuse_skill_candidates(
+    user_input: str,
+    dense_hits: List[Dict[str, Any]],
+    lexical_hits: List[Dict[str, Any]],
+    mode: str,
+    requested_top_k: int,
+    dense_fetch_k: int,
+) -> List[Dict[str, Any]]:
+    """Режимы dense_only / lexical_only и hybrid: RRF + weighted blend, опционально cross-encoder."""
     if mode == "dense_only":
         return [
             {
@@ -672,7 +1124,16 @@ def get_skills_v2_candidates(
             for h in lexical_hits[:requested_top_k]
             if (h.get("payload") or {}).get("name")
         ]
+    rows = _hybrid_rows(dense_hits, lexical_hits, dense_fetch_k)
+    if (Config.SKILLS_CROSS_ENCODER_MODEL or "").strip() and rows:
+        rows = _cross_encoder_rerank_many([user_input], [rows], Config.SKILLS_HYBRID_RERANK_TOP_N)[0]
+    return _select_hybrid(rows, requested_top_k)
 
+
+def _hybrid_rows(
+    dense_hits: List[Dict[str, Any]], lexical_hits: List[Dict[str, Any]], dense_fetch_k: int
+) -> List[Dict[str, Any]]:
+    """Кандидаты hybrid: RRF + weighted blend, по убыванию score (до cross-encoder)."""
     by_name: Dict[str, Dict[str, Any]] = {}
     dense_rank = 1
     for h in dense_hits:
@@ -720,8 +1181,6 @@ def get_skills_v2_candidates(
     dense_weight = float(getattr(Config, "SKILLS_HYBRID_DENSE_WEIGHT", 0.7))
     lexical_weight = float(getattr(Config, "SKILLS_HYBRID_LEXICAL_WEIGHT", 0.3))
     rrf_k = float(getattr(Config, "SKILLS_HYBRID_RRF_K", 60.0))
-    cross_encoder_model = (getattr(Config, "SKILLS_CROSS_ENCODER_MODEL", "") or "").strip()
-    min_score = float(getattr(Config, "SKILLS_HYBRID_MIN_SCORE", 0.3))
 
     fused_rows: List[Dict[str, Any]] = []
     for row in by_name.values():
@@ -757,18 +1216,12 @@ def get_skills_v2_candidates(
             -float(x.get("lexical_score", 0.0)),
         )
     )
-    if cross_encoder_model and fused_rows:
-        try:
-            rerank_n = max(1, min(len(fused_rows), int(getattr(Config, "SKILLS_HYBRID_RERANK_TOP_N", 20))))
-            reranked = _cross_encoder_rerank(
-                query=user_input,
-                candidates=fused_rows[:rerank_n],
-                top_n=rerank_n,
-            )
-            tail = fused_rows[rerank_n:]
-            fused_rows = reranked + tail
-        except Exception:
-            pass
+    return fused_rows
+
+
+def _select_hybrid(fused_rows: List[Dict[str, Any]], requested_top_k: int) -> List[Dict[str, Any]]:
+    """Порог SKILLS_HYBRID_MIN_SCORE (если не прошёл никто — без порога) и top_k."""
+    min_score = float(getattr(Config, "SKILLS_HYBRID_MIN_SCORE", 0.3))
     filtered = [x for x in fused_rows if float(x.get("score", 0.0)) >= min_score]
     if not filtered:
         filtered = fused_rows
@@ -841,20 +1294,17 @@ def _clean_skill_snippet(text: str, name: str, max_len: int = 100) -> str:
     return t or name
 
 
-def get_rag_explanation_for_gap(name: str, is_skill: bool = True) -> str:
- 
-    if not (name and str(name).strip()):
-        return ""
-    if not _qdrant_rest_config()[0]:
-        return ""
-    queries = [
+def _gap_queries(name: str, is_skill: bool) -> List[str]:
+    return [
         f"{name} развитие компетенции" if is_skill else f"параметр {name} развитие ожидания",
         name.strip(),
     ]
+
+
+def _best_gap_description(name: str, hit_lists: List[List[Dict]]) -> str:
     best_desc = ""
     best_score = 0.0
-    for query in queries:
-        hits = retrieve(query, top_k=2, score_threshold=0.25)
+    for hits in hit_lists:
         for h in hits:
             score = h.get("score") or 0
             if score < best_score:
@@ -870,12 +1320,123 @@ def get_rag_explanation_for_gap(name: str, is_skill: bool = True) -> str:
     return best_desc
 
 
+# ((catalog_version, mtime_ns, size), table): таблица сниппетов и объяснений, построенная build_index.
+# Файл пишет и reindex-скрипт в другом процессе — кэш сверяется ещё и с mtime/size файла
+_snippet_table_cache: Optional[Tuple[Tuple[str, int, int], Optional[Dict[str, Any]]]] = None
+
+
+def build_skill_snippet_table(skills: List[Dict], atlas: List[Dict]) -> Optional[int]:
+    """Сниппеты и объяснения разрывов для всех навыков и параметров каталога — те же запросы,
+    что делают retrieve_skill_snippets / get_rag_explanations_for_gaps, один раз при индексации.
+    Пишет Config.SKILL_SNIPPETS_FILE с версией каталога. Возвращает число записей."""
+    global _snippet_table_cache
+    skill_names = list(dict.fromkeys((s.get("Навык") or s.get("name") or "").strip() for s in skills))
+    skill_names = [n for n in skill_names if n]
+    param_names = list(dict.fromkeys((a.get("Параметр") or a.get("Parameter") or "").strip() for a in atlas))
+    param_names = [n for n in param_names if n]
+    if _vector_store_for(Config.RAG_COLLECTION_NAME) is None:
+        return None
+    snippet_hits = retrieve_many(skill_names, top_k=1, score_threshold=0.4)
+    gap_targets = [(n, True) for n in skill_names] + [(n, False) for n in param_names]
+    gap_queries = [q for n, is_skill in gap_targets for q in _gap_queries(n, is_skill)]
+    gap_hits = retrieve_many(gap_queries, top_k=2, score_threshold=0.25)
+    table: Dict[str, Any] = {"version": get_reference_data().version, "skills": {}, "params": {}}
+    for i, (name, is_skill) in enumerate(gap_targets):
+        entry = {"explanation": _best_gap_description(name, gap_hits[2 * i: 2 * i + 2])}
+        if is_skill:
+            hits = snippet_hits[i]
+            entry["snippet"] = ((hits[0].get("payload") or {}).get("text") or "").strip() if hits else ""
+            table["skills"][name] = entry
+        else:
+            table["params"][name] = entry
+    path = Path(Config.SKILL_SNIPPETS_FILE)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(table, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠️ Не удалось сохранить {path}: {e}")
+        return None
+    _snippet_table_cache = None
+    return len(gap_targets)
+
+
+def _skill_snippet_table() -> Optional[Dict[str, Any]]:
+    """Таблица сниппетов для текущей версии каталога; None — нет файла или он от другой версии."""
+    global _snippet_table_cache
+    version = get_reference_data().version
+    path = Path(Config.SKILL_SNIPPETS_FILE)
+    try:
+        st = path.stat()
+        key = (version, st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = (version, -1, -1)
+    cached = _snippet_table_cache
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    table = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get("version") == version:
+            table = data
+    except (OSError, ValueError):
+        table = None
+    _snippet_table_cache = (key, table)
+    return table
+
+
+def get_skill_snippets(skill_names: List[str], max_len: int = 120) -> Dict[str, str]:
+    """Краткие описания навыков: канонические — из таблицы build_index, остальные — векторным поиском."""
+    table = (_skill_snippet_table() or {}).get("skills") or {}
+    texts: Dict[str, str] = {}
+    rest = []
+    for name in dict.fromkeys(skill_names):
+        entry = table.get(name)
+        if entry is not None:
+            texts[name] = entry.get("snippet") or ""
+        else:
+            rest.append(name)
+    if rest:
+        for name, hits in zip(rest, retrieve_many(rest, top_k=1, score_threshold=0.4)):
+            texts[name] = ((hits[0].get("payload") or {}).get("text") or "").strip() if hits else ""
+    return {
+        name: (text[:max_len] + "…") if len(text) > max_len else text
+        for name, text in texts.items()
+        if text
+    }
+
+
+def get_rag_explanation_for_gap(name: str, is_skill: bool = True) -> str:
+    """Краткое RAG-объяснение для одного разрыва (лучший фрагмент по двум запросам)."""
+    return get_rag_explanations_for_gaps([name], is_skill=is_skill).get(name, "")
+
+
+def get_rag_explanations_for_gaps(names: List[str], is_skill: bool = True) -> Dict[str, str]:
+    """Объяснения для нескольких разрывов: канонические — из таблицы build_index, для остальных
+    все запросы (по два на разрыв) — одним batch-поиском."""
+    names = [n for n in dict.fromkeys(names) if n and str(n).strip()]
+    if not names:
+        return {}
+    table = (_skill_snippet_table() or {}).get("skills" if is_skill else "params") or {}
+    out = {n: table[n].get("explanation", "") for n in names if n in table}
+    rest = [n for n in names if n not in table]
+    if not rest or _vector_store_for(Config.RAG_COLLECTION_NAME) is None:
+        return out
+    queries = [q for n in rest for q in _gap_queries(n, is_skill)]
+    hits = retrieve_many(queries, top_k=2, score_threshold=0.25)
+    out.update({n: _best_gap_description(n, hits[2 * i: 2 * i + 2]) for i, n in enumerate(rest)})
+    return out
+
+
 def get_rag_why_role(user_skills: Dict[str, int], role_display: str, top_k: int = 4) -> str:
     """
     Для сценария «Исследование»: запрос к RAG по навыкам пользователя и роли.
     Возвращает короткий текст «почему подходит» — только названия навыков и краткие описания без служебных полей.
     """
-    if not _qdrant_rest_config()[0]:
+    if _vector_store_for(Config.RAG_COLLECTION_NAME) is None:
         return ""
     skills_text = ", ".join(user_skills.keys()) if user_skills else "не указаны"
     # Роль без грейда для запроса
@@ -901,15 +1462,7 @@ def get_rag_why_role(user_skills: Dict[str, int], role_display: str, top_k: int
     return " Релевантные навыки из базы: " + " ".join(parts) if parts else ""
 
 
-def get_rag_why_role_bullets(
-    user_skills: Dict[str, int],
-    role_display: str,
-    top_k: int = 5,
-    atlas_keys: Optional[AbstractSet[str]] = None,
-) -> List[str]:
-    """Возвращает 3–5 коротких пунктов «почему подходит» для карточки Explore."""
-    if not _qdrant_rest_config()[0]:
-        return []
+def _why_role_query(user_skills: Dict[str, int], role_display: str, atlas_keys: Optional[AbstractSet[str]]) -> str:
     if user_skills:
         if atlas_keys is None:
             names = list(user_skills.keys())
@@ -919,10 +1472,10 @@ def get_rag_why_role_bullets(
     else:
         skills_text = "не указаны"
     role_name = role_display.split(" (")[0] if " (" in role_display else role_display
-    query = f"Навыки пользователя: {skills_text}. Профессия: {role_name}. Какие навыки из базы релевантны?"
-    hits = retrieve(query, top_k=top_k, score_threshold=0.3)
-    if not hits:
-        return []
+    return f"Навыки пользователя: {skills_text}. Профессия: {role_name}. Какие навыки из базы релевантны?"
+
+
+def _why_role_bullets(hits: List[Dict]) -> List[str]:
     bullets = []
     seen_names = set()
     for h in hits:
@@ -939,6 +1492,32 @@ def get_rag_why_role_bullets(
     return bullets
 
 
+def get_rag_why_role_bullets(
+    user_skills: Dict[str, int],
+    role_display: str,
+    top_k: int = 5,
+    atlas_keys: Optional[AbstractSet[str]] = None,
+) -> List[str]:
+    """Возвращает 3–5 коротких пунктов «почему подходит» для карточки Explore."""
+    if _vector_store_for(Config.RAG_COLLECTION_NAME) is None:
+        return []
+    hits = retrieve(_why_role_query(user_skills, role_display, atlas_keys), top_k=top_k, score_threshold=0.3)
+    return _why_role_bullets(hits) if hits else []
+
+
+def get_rag_why_role_bullets_many(
+    user_skills: Dict[str, int],
+    role_displays: List[str],
+    top_k: int = 5,
+    atlas_keys: Optional[AbstractSet[str]] = None,
+) -> List[List[str]]:
+    """get_rag_why_role_bullets для списка ролей за один batch-запрос к Qdrant."""
+    if not role_displays or _vector_store_for(Config.RAG_COLLECTION_NAME) is None:
+        return [[] for _ in role_displays]
+    queries = [_why_role_query(user_skills, r, atlas_keys) for r in role_displays]
+    return [_why_role_bullets(h) for h in retrieve_many(queries, top_k=top_k, score_threshold=0.3)]
+
+
 def map_to_canonical_skill(user_input: str) -> Optional[str]:
     """
     Маппинг ввода на канонический навык только при высокой семантической близости (синонимы).
@@ -1066,10 +1645,6 @@ def rank_opportunities(
     """
     if not opportunities:
         return []
-    try:
-        embedder = _get_embedder(model_name=Config.EMBED_MODEL_NAME)
-    except Exception:
-        return opportunities
     # Текст профиля пользователя (без параметров атласа — они общие для всех ролей и раздувают текст)
     atlas_keys = getattr(data_loader, "atlas_map", None) or {}
     profile_parts = [
@@ -1079,7 +1654,7 @@ def rank_opportunities(
     ]
     profile_text = " ".join(profile_parts) or "Нет навыков"
     try:
-        profile_vec = embedder.encode([profile_text], normalize_embeddings=True)[0]
+        profile_vec = _encode_texts([profile_text], model_name=Config.EMBED_MODEL_NAME, normalize=True)[0]
     except Exception:
         return opportunities
     # Для каждой возможности: текст требований роли
@@ -1097,7 +1672,7 @@ def rank_opportunities(
     if not role_texts:
         return opportunities
     try:
-        role_vecs = embedder.encode(role_texts, normalize_embeddings=True)
+        role_vecs = _encode_texts(role_texts, model_name=Config.EMBED_MODEL_NAME, normalize=True)
     except Exception:
         return opportunities
     import numpy as np
@@ -1113,33 +1688,39 @@ def get_embedder():
     return _get_embedder(model_name=Config.EMBED_MODEL_NAME)
 
 
+def embedder_backends() -> Dict[str, str]:
+    """Какой бэкенд выбран для каждой загруженной модели (torch / int8 / onnx)."""
+    return dict(_embedder_backends)
+
+
 # --- Semantic skill matching ---
 
-_skill_embeddings_cache: Optional[Dict[str, Any]] = None
+# (catalog_version, {skill_name: vector})
+_skill_embeddings_cache: Optional[Tuple[str, Dict[str, Any]]] = None
 
 
 def _get_skill_embeddings(skill_names: List[str]) -> Dict[str, Any]:
-    """Кеширует эмбеддинги для списка навыков (E5-large для точности)."""
+    """Кеширует эмбеддинги для списка навыков (E5-large для точности) в пределах версии каталога."""
     global _skill_embeddings_cache
-    if _skill_embeddings_cache is not None:
-        return _skill_embeddings_cache
+    version = get_reference_data().version
+    cached = _skill_embeddings_cache
+    if cached is not None and cached[0] == version:
+        return cached[1]
     try:
-        import numpy as np
         names = list(skill_names)
-        texts = [_e5_passage_text(n) for n in names]
-        vecs = _encode_texts(texts, model_name=Config.EMBED_MODEL_NAME_V2, normalize=True)
-        _skill_embeddings_cache = {name: vec for name, vec in zip(names, vecs)}
-        return _skill_embeddings_cache
+        vecs = _encode_texts(
+            names, model_name=Config.EMBED_MODEL_NAME_V2, normalize=True, prefix=_E5_PASSAGE_PREFIX, persist=True
+        )
+        embeddings = {name: vec for name, vec in zip(names, vecs)}
     except Exception:
         try:
-            embedder = _get_embedder(model_name=Config.EMBED_MODEL_NAME)
-            import numpy as np
             names = list(skill_names)
-            vecs = embedder.encode(names, normalize_embeddings=True, show_progress_bar=False)
-            _skill_embeddings_cache = {name: vec for name, vec in zip(names, vecs)}
-            return _skill_embeddings_cache
+            vecs = _encode_texts(names, model_name=Config.EMBED_MODEL_NAME, normalize=True, persist=True)
+            embeddings = {name: vec for name, vec in zip(names, vecs)}
         except Exception:
             return {}
+    _skill_embeddings_cache = (version, embeddings)
+    return embeddings
 
 
 def _encode_for_matching(
@@ -1150,17 +1731,18 @@ def _encode_for_matching(
     """Encode texts for semantic matching using E5-large with fallback to MiniLM.
 
     explore_fast: use MiniLM only (no E5) — для цикла explore_opportunities, иначе сотни тяжёлых батчей.
+    Passage-сторона (навыки каталога) читается из постоянного хранилища эмбеддингов.
     """
+    persist = not is_query
     if explore_fast:
-        return _encode_texts(texts, model_name=Config.EMBED_MODEL_NAME, normalize=True)
+        return _encode_texts(texts, model_name=Config.EMBED_MODEL_NAME, normalize=True, persist=persist)
     try:
-        if is_query:
-            wrapped = [_e5_query_text(t) for t in texts]
-        else:
-            wrapped = [_e5_passage_text(t) for t in texts]
-        return _encode_texts(wrapped, model_name=Config.EMBED_MODEL_NAME_V2, normalize=True)
+        prefix = _E5_QUERY_PREFIX if is_query else _E5_PASSAGE_PREFIX
+        return _encode_texts(
+            texts, model_name=Config.EMBED_MODEL_NAME_V2, normalize=True, prefix=prefix, persist=persist
+        )
     except Exception:
-        return _encode_texts(texts, model_name=Config.EMBED_MODEL_NAME, normalize=True)
+        return _encode_texts(texts, model_name=Config.EMBED_MODEL_NAME, normalize=True, persist=persist)
 
 
 def encode_user_skills_query_vectors(
@@ -1186,13 +1768,14 @@ def semantic_match_skills(
 ) -> Dict[str, str]:
     """Для каждого user-навыка находит ближайший required-навык по embedding similarity.
     Возвращает {user_name: matched_required_name} для пар с score >= threshold.
-    Пары выбираются жадно: один required-навык может быть сопоставлен только одному user-навыку.
+    Пары выбираются жадно (или оптимально при SKILL_MATCH_MODE=optimal): один required-навык
+    может быть сопоставлен только одному user-навыку.
     Uses E5-large (query/passage) for higher accuracy, with MiniLM fallback.
 
     user_vectors: optional precomputed embeddings (same order as user_skill_names) to avoid
     re-encoding the user profile inside tight loops (e.g. explore_opportunities).
-    req_vectors: optional passage-side embeddings (same order as required_skill_names), e.g. from
-    _cached_role_passage_embeddings — avoids encoding role requirements twice per iteration.
+    req_vectors: optional passage-side embeddings (same order as required_skill_names) —
+    avoids encoding role requirements twice per iteration.
     """
     threshold = threshold or Config.SKILL_MATCH_THRESHOLD
     if not user_skill_names or not required_skill_names:
@@ -1223,27 +1806,75 @@ def semantic_match_skills(
                 required_skill_names, is_query=False, explore_fast=explore_fast
             )
         sim_matrix = np.dot(user_vecs, req_vecs.T)
+        return match_from_similarity(sim_matrix, user_skill_names, required_skill_names, threshold)
+    except Exception:
+        return {}
 
-        result = {}
-        used_req = set()
-        pairs = []
-        for i in range(len(user_skill_names)):
-            for j in range(len(required_skill_names)):
-                if sim_matrix[i, j] >= threshold:
-                    pairs.append((sim_matrix[i, j], i, j))
-        pairs.sort(key=lambda x: -x[0])
-
-        for score, i, j in pairs:
-            u_name = user_skill_names[i]
-            r_name = required_skill_names[j]
-            if u_name in result or r_name in used_req:
-                continue
-            result[u_name] = r_name
-            used_req.add(r_name)
 
-        return result
-    except Exception:
+def match_from_similarity(
+    sim_matrix: Any,
+    user_skill_names: List[str],
+    required_skill_names: List[str],
+    threshold: Optional[float] = None,
+    mode: Optional[str] = None,
+) -> Dict[str, str]:
+    """Мэтчинг по готовой матрице сходства (user × required), как в semantic_match_skills.
+
+    mode: greedy | optimal (skill_matching), по умолчанию Config.SKILL_MATCH_MODE.
+    Отдельно от энкодинга, чтобы вызывающий код мог держать матрицу у себя и пересчитывать
+    только изменившиеся строки (what-if сессии)."""
+    from skill_matching import match_pairs
+
+    threshold = threshold or Config.SKILL_MATCH_THRESHOLD
+    if not user_skill_names or not required_skill_names:
         return {}
+    result: Dict[str, str] = {}
+    used_req = set()
+    for i, j in match_pairs(sim_matrix, threshold, mode or Config.SKILL_MATCH_MODE):
+        u_name = user_skill_names[i]
+        r_name = required_skill_names[j]
+        # повторяющиеся имена: как в прежнем мэтчинге, имя участвует в одной паре
+        if u_name in result or r_name in used_req:
+            continue
+        result[u_name] = r_name
+        used_req.add(r_name)
+    return result
+
+
+def greedy_match_from_similarity(
+    sim_matrix: Any,
+    user_skill_names: List[str],
+    required_skill_names: List[str],
+    threshold: Optional[float] = None,
+) -> Dict[str, str]:
+    """Жадный мэтчинг по готовой матрице сходства: пары по убыванию score, без повторов."""
+    return match_from_similarity(sim_matrix, user_skill_names, required_skill_names, threshold, mode="greedy")
+
+
+def match_similarity_blocks(
+    sim_matrix: Any,
+    user_skill_names: List[str],
+    required_blocks: List[List[str]],
+    threshold: Optional[float] = None,
+    mode: Optional[str] = None,
+) -> List[Dict[str, str]]:
+    """Мэтчинг одного профиля с многими наборами требований за один вызов.
+
+    sim_matrix — user × (required_blocks[0] + required_blocks[1] + ...), столбцы блоков подряд.
+    Возвращает {user_name: required_name} на каждый блок."""
+    import numpy as np
+    from skill_matching import match_blocks
+
+    threshold = threshold or Config.SKILL_MATCH_THRESHOLD
+    offsets = np.cumsum([0] + [len(b) for b in required_blocks])
+    if not user_skill_names or not offsets[-1]:
+        return [{} for _ in required_blocks]
+    assignment = match_blocks(sim_matrix, offsets, threshold, mode or Config.SKILL_MATCH_MODE)
+    out = []
+    for names, a in zip(required_blocks, offsets[:-1]):
+        block = assignment[a:a + len(names)]
+        out.append({user_skill_names[i]: names[j] for j, i in enumerate(block) if i >= 0})
+    return out
 
 
 def compute_profile_similarity(
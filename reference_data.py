@@ -0,0 +1,251 @@
+"""Процессный реестр справочных данных: навыки, атлас, канонические имена, синонимы, кластеры.
+
+Один неизменяемый ReferenceData на процесс: строится лениво при первом обращении
+(снапшот или JSON, см. data_loader.load_reference_tables) и дальше отдаётся из памяти —
+ни один путь обработки запроса не читает диск и не парсит JSON повторно.
+
+invalidate_reference_data() — явный хук сброса: следующий get_reference_data() пересоберёт
+реестр, а модули с производными кэшами (лемматизированные синонимы, lexical-кэш RAG)
+сбрасывают их через register_invalidation_hook.
+
+Горячая перезагрузка: reload_reference_data() собирает новую версию каталога рядом с текущей,
+прогревает её производные кэши (register_warmup_hook: синонимы, lexical-строки, эмбеддинги
+ролей) и только потом атомарно подменяет ссылку. Запрос, закрепивший версию через
+pin_reference_data(), до конца работает со своей версией; производные кэши модулей
+ключуются по ReferenceData.version, поэтому версии не смешиваются.
+"""
+
+import contextvars
+import json
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Mapping, Optional, Tuple
+
+from config import Config
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """Неизменяемый срез справочника. Словари — read-only прокси, их не модифицируют."""
+    version: str
+    content_hash: str
+    tables: Mapping[str, Any]
+    data_loader: Any
+    canonical_names: FrozenSet[str]
+    synonyms: Mapping[str, str]
+    skill_clusters: Mapping[str, int]
+    cluster_labels: Mapping[str, str]
+
+    @property
+    def skills(self) -> List[Dict]:
+        return self.tables["skills"]
+
+    @property
+    def atlas_params(self) -> List[Dict]:
+        return self.tables["atlas_params"]
+
+
+_current: Optional[ReferenceData] = None
+_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_invalidation_hooks: List[Callable[[], None]] = []
+_warmup_hooks: List[Callable[[ReferenceData], None]] = []
+_pinned: "contextvars.ContextVar[Optional[ReferenceData]]" = contextvars.ContextVar(
+    "pinned_reference_data", default=None
+)
+
+
+def _resolve(path) -> Path:
+    path = Path(path)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent / path
+    return path
+
+
+def _read_json_file(path: Path, default: Any) -> Any:
+    if not path.is_file():
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return default
+
+
+def _synonyms_path() -> Path:
+    return Config.DATA_DIR / "skill_synonyms.json"
+
+
+def _clusters_path() -> Path:
+    return _resolve(Config.SKILLS_FILE).parent / "skill_clusters.json"
+
+
+def catalog_fingerprint() -> str:
+    """Короткий хэш всех файлов каталога (навыки, атлас, синонимы, кластеры) — версия каталога."""
+    from reference_snapshot import compute_source_hash, source_paths
+
+    return compute_source_hash(source_paths() + [_synonyms_path(), _clusters_path()])[:12]
+
+
+def _load_synonyms() -> Dict[str, str]:
+    raw = _read_json_file(_synonyms_path(), {})
+    return {k: v for k, v in raw.items() if k and v} if isinstance(raw, dict) else {}
+
+
+def _load_clusters() -> Tuple[Dict[str, int], Dict[str, str]]:
+    data = _read_json_file(_clusters_path(), {})
+    if not isinstance(data, dict):
+        return {}, {}
+    skills_map = data.get("skills") or {}
+    labels = {str(k): v for k, v in (data.get("labels") or {}).items()}
+    return skills_map, labels
+
+
+def build_reference_data() -> ReferenceData:
+    """Собирает новый ReferenceData с диска (снапшот или JSON) без публикации в реестр."""
+    from data_loader import DataLoader, load_reference_tables
+
+    tables = load_reference_tables()
+    content_hash = tables.get("content_hash")
+    if not content_hash:
+        try:
+            from reference_snapshot import compute_source_hash
+            content_hash = compute_source_hash()
+        except Exception:
+            content_hash = ""
+    skill_clusters, cluster_labels = _load_clusters()
+    return ReferenceData(
+        version=catalog_fingerprint(),
+        content_hash=content_hash,
+        tables=MappingProxyType(dict(tables)),
+        data_loader=DataLoader(tables),
+        canonical_names=frozenset(tables["canonical_skill_names"]),
+        synonyms=MappingProxyType(_load_synonyms()),
+        skill_clusters=MappingProxyType(dict(skill_clusters)),
+        cluster_labels=MappingProxyType(dict(cluster_labels)),
+    )
+
+
+def get_reference_data() -> ReferenceData:
+    """Закреплённая за запросом версия справочника, иначе текущая (ленивая инициализация)."""
+    ref = _pinned.get() or _current
+    if ref is not None:
+        return ref
+    return _ensure_loaded()
+
+
+@contextmanager
+def pin_reference_data(ref: Optional[ReferenceData] = None) -> Iterator[ReferenceData]:
+    """Закрепляет версию справочника на время блока (запроса): перезагрузка её не подменит."""
+    ref = ref or get_reference_data()
+    token = _pinned.set(ref)
+    try:
+        yield ref
+    finally:
+        _pinned.reset(token)
+
+
+def _ensure_loaded() -> ReferenceData:
+    global _current
+    with _lock:
+        if _current is None:
+            _current = build_reference_data()
+        return _current
+
+
+def get_data_loader():
+    """Общий DataLoader процесса (вместо DataLoader() на каждый вызов)."""
+    return get_reference_data().data_loader
+
+
+class DataLoaderView:
+    """Долгоживущая ссылка на DataLoader текущей (или закреплённой) версии справочника.
+
+    Модульные синглтоны (api.data, ScenarioHandler, OutputFormatter) держат view, а не
+    конкретный DataLoader, поэтому после перезагрузки каталога они видят новую версию."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_reference_data().data_loader, name)
+
+
+def register_warmup_hook(hook: Callable[[ReferenceData], None]) -> None:
+    """Регистрирует прогрев производного кэша модуля для новой версии перед её публикацией."""
+    with _lock:
+        if hook not in _warmup_hooks:
+            _warmup_hooks.append(hook)
+
+
+def register_invalidation_hook(hook: Callable[[], None]) -> None:
+    """Регистрирует сброс производного кэша модуля; вызывается при invalidate_reference_data()."""
+    with _lock:
+        if hook not in _invalidation_hooks:
+            _invalidation_hooks.append(hook)
+
+
+def invalidate_reference_data() -> None:
+    """Сбрасывает реестр и производные кэши; следующий get_reference_data() перечитает данные."""
+    global _current
+    with _lock:
+        _current = None
+        hooks = list(_invalidation_hooks)
+    for hook in hooks:
+        try:
+            hook()
+        except Exception as e:
+            print(f"⚠️ Ошибка сброса кэша справочника: {e}")
+
+
+def reload_reference_data(force: bool = False) -> Tuple[str, bool]:
+    """Собирает и прогревает новую версию каталога, затем атомарно публикует её.
+
+    Возвращает (версия, была ли подмена). Без force ничего не делает, если файлы каталога
+    не менялись. Параллельные вызовы сериализуются; запросы продолжают читать старую версию,
+    пока идёт сборка."""
+    global _current
+    with _reload_lock:
+        current = _current or _ensure_loaded()
+        if not force and catalog_fingerprint() == current.version:
+            return current.version, False
+        new_ref = build_reference_data()
+        with _lock:
+            hooks = list(_warmup_hooks)
+        for hook in hooks:
+            try:
+                hook(new_ref)
+            except Exception as e:
+                print(f"⚠️ Ошибка прогрева кэша справочника {new_ref.version}: {e}")
+        with _lock:
+            _current = new_ref
+        print(f"✅ Каталог навыков обновлён: {current.version} → {new_ref.version}")
+        return new_ref.version, True
+
+
+def reload_reference_data_async(force: bool = False) -> threading.Thread:
+    """Запускает reload_reference_data в фоновом потоке."""
+    thread = threading.Thread(
+        target=reload_reference_data, kwargs={"force": force}, name="catalog-reload", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def start_catalog_watcher(interval_sec: float) -> Optional[threading.Thread]:
+    """Фоновый опрос файлов каталога: при изменении — reload_reference_data()."""
+    if interval_sec <= 0:
+        return None
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.wait(interval_sec):
+            try:
+                reload_reference_data()
+            except Exception as e:
+                print(f"⚠️ Ошибка перезагрузки каталога: {e}")
+
+    thread = threading.Thread(target=_loop, name="catalog-watcher", daemon=True)
+    thread.stop_event = stop  # type: ignore[attr-defined]
+    thread.start()
+    return thread
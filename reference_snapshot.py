@@ -0,0 +1,127 @@
+"""Скомпилированный снапшот справочных данных для быстрого холодного старта.
+
+compile_snapshot() один раз парсит clean_skills.json / atlas_params_clean.json, строит все
+производные таблицы (data_loader.build_reference_tables) и пишет один бинарный файл:
+
+    MAGIC (8 байт) | sha256 исходников (64 hex-символа) | размер и mtime_ns каждого
+    исходника (по два int64) | pickle (protocol 5)
+
+load_snapshot() открывает файл через mmap и сверяет с исходниками размер и mtime из заголовка;
+sha256 исходников считается только при расхождении (файлы скопированы или тронуты). Таблицы
+затем десериализуются pickle.loads целиком — в память процесса, без отображения на месте.
+Если файла нет, он битый или устарел — возвращает None, и вызывающий код падает обратно
+на JSON. Файл — артефакт сборки (см. Dockerfile), загружается только из DATA_DIR,
+поэтому pickle здесь допустим.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+
+# Версия формата в magic: при изменении набора таблиц старые снапшоты не читаются
+SNAPSHOT_MAGIC = b"CCSNAP3\n"
+_HASH_LEN = 64
+
+
+def _resolve(path) -> Path:
+    path = Path(path)
+    if not path.is_absolute():
+        path = Path(__file__).resolve().parent / path
+    return path
+
+
+def snapshot_path() -> Path:
+    return _resolve(Config.REFERENCE_SNAPSHOT_FILE)
+
+
+def source_paths() -> List[Path]:
+    """Исходники, от которых зависят таблицы снапшота (порядок важен для хэша)."""
+    return [_resolve(Config.SKILLS_FILE), _resolve(Config.ATLAS_FILE)]
+
+
+def source_stats(paths: Optional[List[Path]] = None) -> Tuple[int, ...]:
+    """(размер, mtime_ns) каждого исходника подряд; отсутствующий файл — (-1, -1)."""
+    out: List[int] = []
+    for path in paths if paths is not None else source_paths():
+        try:
+            st = path.stat()
+            out += [st.st_size, st.st_mtime_ns]
+        except OSError:
+            out += [-1, -1]
+    return tuple(out)
+
+
+def _stats_format(n_paths: int) -> str:
+    return f"<{2 * n_paths}q"
+
+
+def compute_source_hash(paths: Optional[List[Path]] = None) -> str:
+    """sha256 по именам и содержимому исходных файлов (отсутствующий файл тоже учитывается)."""
+    h = hashlib.sha256()
+    for path in paths if paths is not None else source_paths():
+        h.update(path.name.encode("utf-8") + b"\0")
+        if path.is_file():
+            h.update(path.read_bytes())
+        else:
+            h.update(b"<missing>")
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def compile_snapshot(path: Optional[Path] = None) -> Path:
+    """Строит таблицы из JSON и атомарно записывает снапшот. Возвращает путь к файлу."""
+    from data_loader import build_reference_tables
+
+    # stat до чтения: правка исходника во время сборки даст расхождение и полную сверку хэша
+    stats = source_stats()
+    skills_path, atlas_path = source_paths()
+    with open(skills_path, "r", encoding="utf-8") as f:
+        skills = json.load(f)
+    with open(atlas_path, "r", encoding="utf-8") as f:
+        atlas = json.load(f)
+    tables = build_reference_tables(skills, atlas)
+    tables["content_hash"] = compute_source_hash()
+
+    out = Path(path) if path is not None else snapshot_path()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(tables["content_hash"].encode("ascii"))
+        f.write(struct.pack(_stats_format(len(source_paths())), *stats))
+        pickle.dump(tables, f, protocol=5)
+    os.replace(tmp, out)
+    return out
+
+
+def load_snapshot(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """Таблицы из снапшота или None, если снапшот отсутствует, повреждён или устарел."""
+    path = Path(path) if path is not None else snapshot_path()
+    if not path.is_file():
+        return None
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            hash_end = len(SNAPSHOT_MAGIC) + _HASH_LEN
+            fmt = _stats_format(len(source_paths()))
+            header_len = hash_end + struct.calcsize(fmt)
+            if mm[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                return None
+            stored_hash = mm[len(SNAPSHOT_MAGIC):hash_end].decode("ascii")
+            stored_stats = struct.unpack(fmt, mm[hash_end:header_len])
+            # быстрый путь: те же размеры и mtime — исходники не читаем
+            if stored_stats != source_stats() and stored_hash != compute_source_hash():
+                print(f"⚠️ Снапшот справочника устарел ({path.name}), читаем JSON")
+                return None
+            with memoryview(mm) as view:
+                tables = pickle.loads(view[header_len:])
+        return tables
+    except Exception as e:
+        print(f"⚠️ Не удалось прочитать снапшот справочника: {e}")
+        return None
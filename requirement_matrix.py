@@ -0,0 +1,131 @@
+"""Интернированные id навыков, параметров атласа и ролей + матрица требований роль × грейд × элемент.
+
+Имена (русские строки) переводятся в плотные int-id один раз при сборке справочника:
+элементы 0..n_skills-1 — навыки каталога, дальше — параметры атласа. required[r, g, i] —
+требуемый уровень элемента i для роли r на грейде g (0 — не требуется), uint8.
+
+Подсчёты совпадений и разрывов (explore, смена профессии) идут векторно по всем ролям сразу
+вместо цикла по dict-ам. Матрица входит в таблицы справочника и сериализуется в снапшот.
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+GRADES = ("Junior", "Middle", "Senior", "Lead", "Expert")
+_DEFAULT_GRADE = "Middle"
+
+
+class RequirementMatrix:
+    def __init__(
+        self,
+        item_names: Sequence[str],
+        n_skills: int,
+        role_names: Sequence[str],
+        required: np.ndarray,
+    ):
+        self.item_names = tuple(item_names)
+        self.item_ids: Dict[str, int] = {name: i for i, name in enumerate(self.item_names)}
+        self.n_skills = n_skills
+        self.role_names = tuple(role_names)
+        self.role_ids: Dict[str, int] = {name: i for i, name in enumerate(self.role_names)}
+        self.grade_ids: Dict[str, int] = {g: i for i, g in enumerate(GRADES)}
+        self.required = required
+
+    def role_id(self, role_name: Optional[str]) -> Optional[int]:
+        """Id роли по внутреннему или отображаемому имени (как ключи get_role_requirements)."""
+        if not role_name:
+            return None
+        return self.role_ids.get(role_name)
+
+    def grade_id(self, grade: Optional[str]) -> int:
+        """Неизвестный грейд — как Middle (совпадает с дефолтами get_role_requirements)."""
+        return self.grade_ids.get(grade, self.grade_ids[_DEFAULT_GRADE])
+
+    def role_ids_for(self, role_names: Iterable[Optional[str]]) -> np.ndarray:
+        """Id ролей массивом; неизвестные роли — -1."""
+        ids = [self.role_ids.get(name, -1) if name else -1 for name in role_names]
+        return np.asarray(ids, dtype=np.int32)
+
+    def user_vector(self, levels: Mapping[str, float]) -> np.ndarray:
+        """Уровни пользователя по id элементов (0 — нет навыка). Имена вне каталога игнорируются."""
+        vec = np.zeros(len(self.item_names), dtype=np.float32)
+        for name, level in levels.items():
+            i = self.item_ids.get(name)
+            if i is None:
+                continue
+            try:
+                value = float(level)
+            except (TypeError, ValueError):
+                continue
+            if value > vec[i]:
+                vec[i] = value
+        return vec
+
+    def skill_requirements(self, grade: Optional[str], role_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Срез (роли × навыки) требуемых уровней для грейда; параметры атласа не входят."""
+        g = self.grade_id(grade)
+        if role_ids is None:
+            return self.required[:, g, : self.n_skills]
+        return self.required[role_ids, g, : self.n_skills]
+
+    def met_mask(
+        self, user_vec: np.ndarray, grade: Optional[str], role_ids: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """bool (роли × навыки): навык требуется и уровень пользователя не ниже требуемого."""
+        req = self.skill_requirements(grade, role_ids)
+        return (req > 0) & (user_vec[None, : self.n_skills] >= req)
+
+    def met_counts(
+        self, user_vec: np.ndarray, grade: Optional[str], role_ids: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Число закрытых навыков по каждой роли."""
+        return self.met_mask(user_vec, grade, role_ids).sum(axis=1)
+
+    def required_counts(self, grade: Optional[str], role_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Число требуемых навыков (без параметров атласа) по каждой роли."""
+        return (self.skill_requirements(grade, role_ids) > 0).sum(axis=1)
+
+    def gaps(self, user_vec: np.ndarray, grade: Optional[str], role_ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Разрыв (требуемый − текущий, не меньше 0) по всем элементам, включая параметры атласа."""
+        g = self.grade_id(grade)
+        req = self.required[:, g, :] if role_ids is None else self.required[role_ids, g, :]
+        gap = req.astype(np.float32) - user_vec[None, :]
+        gap[req == 0] = 0.0
+        return np.clip(gap, 0.0, None)
+
+    def names(self, item_ids: Iterable[int]) -> List[str]:
+        return [self.item_names[i] for i in item_ids]
+
+
+def build_requirement_matrix(
+    role_skills: Mapping[str, Sequence[str]],
+    atlas_param_names: Sequence[str],
+    grade_to_skill_level: Mapping[str, int],
+    grade_to_param_ordinal: Mapping[str, int],
+) -> RequirementMatrix:
+    """Собирает матрицу из индекса роль → навыки (data_loader._build_role_index)."""
+    skill_names: List[str] = []
+    seen = set()
+    for names in role_skills.values():
+        for name in names:
+            if name not in seen:
+                seen.add(name)
+                skill_names.append(name)
+    skill_names.sort(key=lambda n: (n is None, str(n)))
+    params = [p for p in atlas_param_names if p not in seen]
+    item_names = skill_names + params
+    item_ids = {name: i for i, name in enumerate(item_names)}
+    role_names = sorted(role_skills)
+
+    required = np.zeros((len(role_names), len(GRADES), len(item_names)), dtype=np.uint8)
+    skill_levels = np.asarray([grade_to_skill_level.get(g, 2) for g in GRADES], dtype=np.uint8)
+    param_levels = np.asarray([grade_to_param_ordinal.get(g, 2) for g in GRADES], dtype=np.uint8)
+    param_cols = [item_ids[p] for p in atlas_param_names]
+    for r, role in enumerate(role_names):
+        cols = [item_ids[name] for name in role_skills[role]]
+        if cols:
+            required[r][:, cols] = skill_levels[:, None]
+    if param_cols:
+        required[:, :, param_cols] = param_levels[None, :, None]
+    return RequirementMatrix(item_names, len(skill_names), role_names, required)
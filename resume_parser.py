@@ -6,7 +6,7 @@ from config import Config
 from pydantic import BaseModel, ValidationError, Field
 from typing import Dict, List, Optional, Any
 
-from rag_service import get_skills_v2_candidates
+from rag_service import get_skills_v2_candidates_batch
 from llm_observability import LLMCallMetrics, log_llm_call
 
 
@@ -565,13 +565,11 @@ class ResumeParser:
         if not raw_skills:
             return {"skills": [], "used_fallback": False}
 
-        skills_with_candidates = []
-        for raw_skill in raw_skills:
-            candidates = get_skills_v2_candidates(raw_skill, top_k=5, retrieval_mode=retrieval_mode)
-            skills_with_candidates.append({
-                "raw_skill": raw_skill,
-                "candidates": candidates,
-            })
+        candidates_batch = get_skills_v2_candidates_batch(raw_skills, top_k=5, retrieval_mode=retrieval_mode)
+        skills_with_candidates = [
+            {"raw_skill": raw_skill, "candidates": candidates}
+            for raw_skill, candidates in zip(raw_skills, candidates_batch)
+        ]
 
         has_candidates = [s for s in skills_with_candidates if s["candidates"]]
         no_candidates = [s for s in skills_with_candidates if not s["candidates"]]
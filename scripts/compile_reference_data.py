@@ -0,0 +1,40 @@
+"""Компиляция справочных данных в бинарный снапшот для быстрого холодного старта.
+
+Запуск:
+    python3 scripts/compile_reference_data.py
+
+Пишет Config.REFERENCE_SNAPSHOT_FILE (по умолчанию data/reference_snapshot.bin):
+все производные таблицы DataLoader + sha256 исходных JSON. При изменении
+clean_skills.json / atlas_params_clean.json снапшот считается устаревшим,
+и процессы читают JSON, пока скрипт не запущен повторно.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+from reference_snapshot import compile_snapshot, load_snapshot  # noqa: E402
+
+
+def main() -> int:
+    started = time.perf_counter()
+    path = compile_snapshot()
+    tables = load_snapshot(path)
+    if tables is None:
+        print(f"❌ Снапшот записан, но не читается: {path}")
+        return 1
+    elapsed_ms = int((time.perf_counter() - started) * 1000)
+    print(
+        f"✅ Снапшот справочника: {path} "
+        f"(навыков: {len(tables['skills'])}, ролей: {len(tables['internal_to_display'])}, "
+        f"hash: {tables['content_hash'][:12]}, {elapsed_ms} мс)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Экспорт моделей эмбеддингов в ONNX (+ динамический int8) для EMBED_BACKEND=onnx.
+
+Запуск:
+    python3 scripts/export_onnx_embedders.py            # EMBED_MODEL_NAME и EMBED_MODEL_NAME_V2
+    python3 scripts/export_onnx_embedders.py --no-int8  # только fp32
+
+Для каждой модели в EMBED_ONNX_DIR/<модель>/ пишутся model.onnx, model.int8.onnx,
+токенизатор, meta.json и parity.npz — эталонные вектора исходной модели на выборке
+навыков каталога, по которым _get_embedder проверяет паритет перед включением ONNX.
+Нужны torch, sentence-transformers, transformers и onnxruntime.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+import numpy as np  # noqa: E402
+
+from config import Config  # noqa: E402
+from embedding_backends import (  # noqa: E402
+    META_FILE,
+    ONNX_FILE,
+    ONNX_INT8_FILE,
+    PARITY_FILE,
+    OnnxSentenceEncoder,
+    onnx_model_dir,
+    parity_min_cosine,
+    parity_texts,
+)
+
+
+def export_model(model_name: str, int8: bool = True) -> float:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out_dir = onnx_model_dir(model_name)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0]
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+    tokenizer.save_pretrained(str(out_dir))
+
+    sample = tokenizer(["пример текста"], return_tensors="pt")
+    input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+    dynamic = {name: {0: "batch", 1: "seq"} for name in input_names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "seq"}
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(input_names, args))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _Wrapper(auto_model),
+            tuple(sample[k] for k in input_names),
+            str(out_dir / ONNX_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=17,
+        )
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(out_dir / ONNX_FILE), str(out_dir / ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+
+    (out_dir / META_FILE).write_text(
+        json.dumps({"model": model_name, "max_seq_length": int(st_model.max_seq_length)}), encoding="utf-8"
+    )
+    texts = parity_texts()
+    reference = np.asarray(st_model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+    np.savez(out_dir / PARITY_FILE, texts=np.asarray(texts), vectors=reference)
+    return parity_min_cosine(OnnxSentenceEncoder(out_dir, quantized=int8), texts, reference)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Экспорт моделей эмбеддингов в ONNX")
+    parser.add_argument("models", nargs="*", help="Имена моделей (по умолчанию обе из конфига)")
+    parser.add_argument("--no-int8", action="store_true", help="Не квантовать в int8")
+    args = parser.parse_args(argv)
+
+    models = args.models or [Config.EMBED_MODEL_NAME, Config.EMBED_MODEL_NAME_V2]
+    failed = False
+    for model_name in models:
+        print(f"Экспорт {model_name}...")
+        try:
+            score = export_model(model_name, int8=not args.no_int8)
+        except Exception as e:
+            print(f"❌ {model_name}: {e}")
+            failed = True
+            continue
+        mark = "✅" if score >= Config.EMBED_PARITY_MIN_COSINE else "⚠️"
+        print(f"{mark} {model_name}: минимальный косинус с эталоном {score:.4f} (порог {Config.EMBED_PARITY_MIN_COSINE})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,21 @@
 """Переиндексация Qdrant коллекций для Career Copilot.
 
 Запуск:
-    python3 scripts/reindex_qdrant.py
+    python3 scripts/reindex_qdrant.py          # инкрементально: только новые/изменённые документы
+    python3 scripts/reindex_qdrant.py --full   # полная сборка в новые коллекции
 
-Скрипт пересоздаёт:
+Скрипт обновляет:
 1) legacy RAG-коллекцию (MiniLM) для fallback;
-2) skills_v2 коллекцию (E5) для нормализации навыков.
+2) skills_v2 коллекцию (E5) для нормализации навыков;
+3) таблицу навыков-помощников по параметрам атласа для плана следующего грейда
+   (PARAM_SKILL_SUPPORT_FILE) — по legacy-коллекции из шага 1.
+
+Без Qdrant (VECTOR_BACKEND=local или auto без QDRANT_URL) коллекции пишутся
+во встроенное хранилище LOCAL_VECTOR_DIR. Поиск идёт по алиасам коллекций: полная
+сборка переключает алиас на готовую коллекцию (vector_sync).
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -15,26 +23,38 @@ PROJECT_DIR = Path(__file__).resolve().parent.parent
 if str(PROJECT_DIR) not in sys.path:
     sys.path.insert(0, str(PROJECT_DIR))
 
+from next_grade_service import build_param_support_table  # noqa: E402
 from rag_service import build_index, build_skills_v2_index  # noqa: E402
+from reference_data import get_reference_data  # noqa: E402
 
 
-def main() -> int:
-    print("Запуск переиндексации Qdrant...")
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Переиндексация векторных коллекций")
+    parser.add_argument("--full", action="store_true", help="пересобрать коллекции целиком, а не по изменениям")
+    args = parser.parse_args(argv)
+    print("Запуск переиндексации Qdrant" + (" (полная)..." if args.full else " (инкрементальная)..."))
 
-    print("1/2 Legacy MiniLM индекс (fallback)...")
-    legacy_count = build_index(force_recreate=True)
+    print("1/3 Legacy MiniLM индекс (fallback)...")
+    legacy_count = build_index(force_recreate=args.full)
     if legacy_count is None:
         print("⚠️ Не удалось обновить legacy индекс.")
     else:
         print(f"✅ Legacy индекс обновлён. Точек: {legacy_count}")
 
-    print("2/2 E5 индекс skills_v2...")
-    skills_v2_count = build_skills_v2_index(force_recreate=True)
+    print("2/3 E5 индекс skills_v2...")
+    skills_v2_count = build_skills_v2_index(force_recreate=args.full)
     if skills_v2_count is None:
         print("❌ Не удалось обновить skills_v2 индекс.")
         return 1
     print(f"✅ skills_v2 индекс обновлён. Точек: {skills_v2_count}")
 
+    print("3/3 Навыки-помощники по параметрам атласа...")
+    support_count = build_param_support_table(get_reference_data().data_loader)
+    if support_count is None:
+        print("⚠️ Не удалось построить таблицу навыков по параметрам.")
+    else:
+        print(f"✅ Таблица навыков по параметрам обновлена. Записей: {support_count}")
+
     print("Готово.")
     return 0
 
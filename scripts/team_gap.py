@@ -0,0 +1,65 @@
+"""Командный gap-анализ из командной строки: профили сотрудников × одна целевая роль.
+
+Запуск:
+    python3 scripts/team_gap.py --role "Аналитик данных" --grade Senior profiles.jsonl > out.ndjson
+
+Вход — JSON-массив или NDJSON (по профилю на строку):
+    {"id": "e-17", "grade": "Middle", "skills": {"Python": 2, "SQL": 3}}
+Выход — NDJSON: строка на профиль + итоговая summary (пропускная способность в stderr).
+LLM-планы генерируются только с флагом --plan.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+from reference_data import get_data_loader  # noqa: E402
+from team_gap_service import score_team  # noqa: E402
+
+
+def _read_profiles(path: str):
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    with stream:
+        text = stream.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return json.loads(stripped)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Командный gap-анализ (NDJSON)")
+    parser.add_argument("profiles", help="JSON/NDJSON с профилями или '-' для stdin")
+    parser.add_argument("--role", required=True, help="Целевая роль (отображаемое или внутреннее имя)")
+    parser.add_argument("--grade", default="Middle", help="Целевой грейд: Junior..Expert")
+    parser.add_argument("--plan", action="store_true", help="Сгенерировать план развития (LLM)")
+    parser.add_argument("--details", action="store_true", help="Полный structured-результат по профилю")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    loader = get_data_loader()
+    if not loader.get_skills_for_role(args.role):
+        print(f"❌ Роль не найдена: {args.role}", file=sys.stderr)
+        return 1
+    profiles = _read_profiles(args.profiles)
+    for row in score_team(
+        profiles, args.role, args.grade, loader,
+        include_plan=args.plan, include_details=args.details, chunk_size=args.chunk_size,
+    ):
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+        if row.get("type") == "summary":
+            print(
+                f"✅ Профилей: {row['profiles']}, ошибок: {row['errors']}, "
+                f"{row['elapsed_sec']} с ({row['profiles_per_sec']} профилей/с)",
+                file=sys.stderr,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Сопоставление навыков пользователя с требуемыми по матрице сходства (NumPy).
+
+Два режима (SKILL_MATCH_MODE):
+    greedy   — пары по убыванию сходства, каждый навык не больше одного раза. Реализован
+               итерациями masked argmax; результат совпадает с сортировкой всех пар
+               (при равных score раньше идёт пара с меньшими (i, j));
+    optimal  — максимум суммарного сходства пар выше порога (венгерский алгоритм,
+               scipy.optimize.linear_sum_assignment; без scipy — greedy).
+
+match_blocks обрабатывает сразу много блоков: столбцы sim разбиты на сегменты offsets
+(роль × грейд в explore), навык пользователя может участвовать в паре в каждом блоке,
+навык-столбец — только в одной паре. Результат — номер строки на столбец (-1 — без пары).
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+GREEDY = "greedy"
+OPTIMAL = "optimal"
+
+
+def _linear_sum_assignment():
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except Exception:
+        return None
+    return linear_sum_assignment
+
+
+def _greedy_blocks(sim: np.ndarray, offsets: np.ndarray, threshold: float) -> np.ndarray:
+    n_users, n_cols = sim.shape
+    n_blocks = len(offsets) - 1
+    sizes = np.diff(offsets)
+    block_of_col = np.repeat(np.arange(n_blocks), sizes)
+    # reduceat ломается на повторных и хвостовых offsets: редукции только по непустым блокам,
+    # пустой блок (роль без навыков-требований) сразу неактивен и пар не получает
+    nonempty = sizes > 0
+    starts = offsets[:-1][nonempty]
+    cols = np.arange(n_cols)
+    assignment = np.full(n_cols, -1, dtype=np.int64)
+    masked = np.where(sim >= threshold, sim, -np.inf)
+    used_rows = np.zeros((n_users, n_blocks), dtype=bool)
+    active = nonempty.copy()
+    block_max = np.full(n_blocks, -np.inf)
+    while True:
+        col_max = masked.max(axis=0)
+        col_arg = masked.argmax(axis=0)
+        block_max[nonempty] = np.maximum.reduceat(col_max, starts)
+        active &= np.isfinite(block_max)
+        if not active.any():
+            break
+        # в каждом блоке — первая пара в порядке (i, j) среди пар с максимальным score
+        is_best = (col_max == block_max[block_of_col]) & active[block_of_col]
+        order_key = np.where(is_best, col_arg * n_cols + cols, np.iinfo(np.int64).max)
+        best = np.minimum.reduceat(order_key, starts)[active[nonempty]]
+        rows, picked = np.divmod(best, n_cols)
+        blocks = block_of_col[picked]
+        assignment[picked] = rows
+        used_rows[rows, blocks] = True
+        masked[:, picked] = -np.inf
+        masked[used_rows[:, block_of_col]] = -np.inf
+    return assignment
+
+
+def _optimal_blocks(sim: np.ndarray, offsets: np.ndarray, threshold: float, solve) -> np.ndarray:
+    assignment = np.full(sim.shape[1], -1, dtype=np.int64)
+    gain = np.where(sim >= threshold, sim, 0.0)
+    for a, b in zip(offsets[:-1], offsets[1:]):
+        block = gain[:, a:b]
+        if not block.any():
+            continue
+        rows, cols = solve(block, maximize=True)
+        keep = block[rows, cols] > 0
+        assignment[a + cols[keep]] = rows[keep]
+    return assignment
+
+
+def match_blocks(
+    sim: np.ndarray,
+    offsets: Sequence[int],
+    threshold: float,
+    mode: Optional[str] = None,
+) -> np.ndarray:
+    """Пары user × required по всем блокам столбцов сразу: массив длины sim.shape[1]
+    с номером строки-пользователя для каждого столбца (-1 — без пары)."""
+    sim = np.asarray(sim, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if sim.ndim != 2 or sim.shape[0] == 0 or sim.shape[1] == 0 or len(offsets) < 2:
+        return np.full(sim.shape[1] if sim.ndim == 2 else 0, -1, dtype=np.int64)
+    if (mode or GREEDY) == OPTIMAL:
+        solve = _linear_sum_assignment()
+        if solve is not None:
+            return _optimal_blocks(sim, offsets, threshold, solve)
+    return _greedy_blocks(sim, offsets, threshold)
+
+
+def match_pairs(sim: np.ndarray, threshold: float, mode: Optional[str] = None) -> List[Tuple[int, int]]:
+    """Пары (user_i, required_j) для одной матрицы сходства, в порядке убывания score."""
+    sim = np.asarray(sim, dtype=np.float64)
+    if sim.ndim != 2 or not sim.size:
+        return []
+    assignment = match_blocks(sim, [0, sim.shape[1]], threshold, mode)
+    cols = np.flatnonzero(assignment >= 0)
+    rows = assignment[cols]
+    order = np.lexsort((cols, rows, -sim[rows, cols]))
+    return [(int(rows[k]), int(cols[k])) for k in order]
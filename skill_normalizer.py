@@ -2,16 +2,26 @@
 """NLP: лемматизация (pymorphy3 для русского, простой стемминг для английского)
 и слой синонимов для маппинга навыков"""
 
-import json
 import re
-from pathlib import Path
-from typing import Optional, Set, Dict
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 from config import Config
+from lru_cache import LRUCache
+from reference_data import get_reference_data, register_invalidation_hook, register_warmup_hook
 
 _morph = None
 _stemmer_en = None
-_synonym_map: Optional[Dict[str, str]] = None
+# версия каталога -> словарь синонимов с индексом лемм; держим текущую и предыдущую (запросы на старой версии)
+_synonym_maps: "OrderedDict[str, _SynonymIndex]" = OrderedDict()
+_synonym_maps_lock = threading.Lock()
+_SYNONYM_MAPS_MAX = 2
+
+
+# Лемматизация — чистая функция текста, от версии каталога не зависит: кэши не сбрасываются при reload
+_word_cache = LRUCache(Config.LEMMA_WORD_CACHE_SIZE)
+_phrase_cache = LRUCache(Config.LEMMA_PHRASE_CACHE_SIZE)
 
 
 def _has_cyrillic(text: str) -> bool:
@@ -53,57 +63,173 @@ def _lemmatize_word(word: str, morph, stemmer_en) -> str:
     return w.lower()
 
 
+_TYPO_MAP = {
+    "питон": "python",
+    "пайтон": "python",
+    "дата саенс": "data science",
+    "машин лернинг": "machine learning",
+}
+
+
+def _prepare_text(text: str) -> str:
+    """lower, trim, схлопывание пробелов и замена опечаток (до лемматизации)."""
+    t = " ".join(text.strip().lower().split())
+    for wrong, right in _TYPO_MAP.items():
+        if wrong in t and right not in t:
+            t = t.replace(wrong, right)
+    return t
+
+
+def _lemmatize_word_cached(word: str, morph, stemmer_en) -> str:
+    lemma = _word_cache.get(word)
+    if lemma is None:
+        lemma = _lemmatize_word(word, morph, stemmer_en)
+        _word_cache.put(word, lemma)
+    return lemma
+
+
+def _lemmatize_phrase(t: str, morph, stemmer_en) -> str:
+    lemma = _phrase_cache.get(t)
+    if lemma is None:
+        lemma = " ".join(_lemmatize_word_cached(w, morph, stemmer_en) for w in t.split())
+        _phrase_cache.put(t, lemma)
+    return lemma
+
+
 def normalize_for_search(text: str) -> str:
     """
     Нормализация текста для поиска: lower, trim, схлопывание пробелов,
     замена опечаток, лемматизация по словам (русский/английский).
+    Результаты кэшируются по фразе и по отдельным словам (LRU).
     """
     if not text or not isinstance(text, str):
         return ""
-    t = text.strip().lower()
-    t = " ".join(t.split())
-    typo_map = {
-        "питон": "python",
-        "пайтон": "python",
-        "дата саенс": "data science",
-        "машин лернинг": "machine learning",
-    }
-    for wrong, right in typo_map.items():
-        if wrong in t and right not in t:
-            t = t.replace(wrong, right)
+    t = _prepare_text(text)
     try:
         morph, stemmer_en = _get_analyzers()
-        words = t.split()
-        lemmatized = [_lemmatize_word(w, morph, stemmer_en) for w in words]
-        return " ".join(lemmatized)
+        return _lemmatize_phrase(t, morph, stemmer_en)
     except Exception:
         return t
 
 
-def _load_synonym_map() -> Dict[str, str]:
-    """Загружает словарь синонимов из data/skill_synonyms.json."""
-    global _synonym_map
-    if _synonym_map is not None:
-        return _synonym_map
-    path = Config.DATA_DIR / "skill_synonyms.json"
-    _synonym_map = {}
-    if path.exists():
+def normalize_many(texts: Iterable[str]) -> List[str]:
+    """Пакетная normalize_for_search: повторы в списке и уже виденные фразы/слова не лемматизируются заново."""
+    items = list(texts)
+    prepared = [_prepare_text(t) if t and isinstance(t, str) else "" for t in items]
+    try:
+        morph, stemmer_en = _get_analyzers()
+    except Exception:
+        return prepared
+    done: Dict[str, str] = {}
+    out: List[str] = []
+    for t in prepared:
+        if t not in done:
+            try:
+                done[t] = _lemmatize_phrase(t, morph, stemmer_en) if t else ""
+            except Exception:
+                done[t] = t
+        out.append(done[t])
+    return out
+
+
+def lemmatization_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Размер и hit/miss кэшей лемматизации (слова и фразы)."""
+    return {"words": _word_cache.stats(), "phrases": _phrase_cache.stats()}
+
+
+def clear_lemmatization_cache() -> None:
+    _word_cache.clear()
+    _phrase_cache.clear()
+
+
+def catalog_vocabulary(ref=None) -> List[str]:
+    """Все фразы каталога, которые проходят через лемматизацию: навыки, синонимы, параметры атласа."""
+    ref = ref or get_reference_data()
+    vocab: List[str] = sorted(ref.canonical_names)
+    vocab.extend(ref.synonyms.keys())
+    vocab.extend(ref.synonyms.values())
+    vocab.extend(ref.tables.get("atlas_param_names") or ())
+    return [v for v in dict.fromkeys(vocab) if v]
+
+
+def warm_lemmatization_cache(ref=None) -> int:
+    """Прогрев кэшей лемматизации словарём каталога. Возвращает число фраз."""
+    vocab = catalog_vocabulary(ref)
+    normalize_many(vocab)
+    return len(vocab)
+
+
+class _SynonymIndex(NamedTuple):
+    synonyms: Dict[str, str]               # ключ (lower и лемма) -> каноническое название
+    by_lemma: Dict[str, Tuple[str, ...]]   # normalize_for_search(ключ) -> канонические в порядке словаря
+
+
+def _build_synonym_map(ref) -> _SynonymIndex:
+    """Словарь синонимов + индекс по лемматизированным ключам (строится один раз на версию каталога)."""
+    synonym_map: Dict[str, str] = {}
+    for k, v in ref.synonyms.items():
+        if k and v:
+            key = k.strip().lower()
+            synonym_map[key] = v.strip()
+            try:
+                norm_key = normalize_for_search(k)
+                if norm_key and norm_key != key:
+                    synonym_map[norm_key] = v.strip()
+            except Exception:
+                pass
+    by_lemma: Dict[str, List[str]] = {}
+    for key, canonical in synonym_map.items():
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                raw = json.load(f)
-            for k, v in raw.items():
-                if k and v:
-                    key = k.strip().lower()
-                    _synonym_map[key] = v.strip()
-                    try:
-                        norm_key = normalize_for_search(k)
-                        if norm_key and norm_key != key:
-                            _synonym_map[norm_key] = v.strip()
-                    except Exception:
-                        pass
+            lemma = normalize_for_search(key)
         except Exception:
-            pass
-    return _synonym_map
+            continue
+        bucket = by_lemma.setdefault(lemma, [])
+        if canonical not in bucket:
+            bucket.append(canonical)
+    return _SynonymIndex(synonym_map, {k: tuple(v) for k, v in by_lemma.items()})
+
+
+def _store_synonym_map(version: str, index: _SynonymIndex) -> None:
+    with _synonym_maps_lock:
+        _synonym_maps[version] = index
+        _synonym_maps.move_to_end(version)
+        while len(_synonym_maps) > _SYNONYM_MAPS_MAX:
+            _synonym_maps.popitem(last=False)
+
+
+def _load_synonym_index() -> _SynonymIndex:
+    try:
+        ref = get_reference_data()
+    except Exception:
+        return _SynonymIndex({}, {})
+    cached = _synonym_maps.get(ref.version)
+    if cached is not None:
+        return cached
+    try:
+        index = _build_synonym_map(ref)
+    except Exception:
+        index = _SynonymIndex({}, {})
+    _store_synonym_map(ref.version, index)
+    return index
+
+
+def _load_synonym_map() -> Dict[str, str]:
+    """Словарь синонимов (data/skill_synonyms.json из реестра) с лемматизированными ключами."""
+    return _load_synonym_index().synonyms
+
+
+def _warm_synonym_map(ref) -> None:
+    """Хук прогрева: лемматизированный словарь новой версии готов до её публикации."""
+    _store_synonym_map(ref.version, _build_synonym_map(ref))
+
+
+def _reset_synonym_map() -> None:
+    with _synonym_maps_lock:
+        _synonym_maps.clear()
+
+
+register_invalidation_hook(_reset_synonym_map)
+register_warmup_hook(_warm_synonym_map)
 
 
 def resolve_to_canonical(user_input: str, canonical_set: Optional[Set[str]] = None) -> Optional[str]:
@@ -117,44 +243,30 @@ def resolve_to_canonical(user_input: str, canonical_set: Optional[Set[str]] = No
         return None
     raw = str(user_input).strip()
     low = raw.lower()
-    syn_map = _load_synonym_map()
+    index = _load_synonym_index()
+    syn_map = index.synonyms
     if low in syn_map:
         cand = syn_map[low]
         if canonical_set is None or cand in canonical_set:
             return cand
     try:
         norm = normalize_for_search(raw)
-        if norm and norm in syn_map:
-            cand = syn_map[norm]
-            if canonical_set is None or cand in canonical_set:
-                return cand
-    except Exception:
-        pass
-    try:
-        norm_input = normalize_for_search(raw)
-        for key, canonical in syn_map.items():
-            if normalize_for_search(key) == norm_input:
-                if canonical_set is None or canonical in canonical_set:
-                    return canonical
     except Exception:
-        pass
+        return None
+    if norm and norm in syn_map:
+        cand = syn_map[norm]
+        if canonical_set is None or cand in canonical_set:
+            return cand
+    # Ключи словаря, чья лемма совпала с леммой ввода (индекс строится при загрузке словаря)
+    for canonical in index.by_lemma.get(norm, ()):
+        if canonical_set is None or canonical in canonical_set:
+            return canonical
     return None
 
 
-def get_canonical_skills_set():
-    """Возвращает множество канонических названий навыков из DataLoader (ленивый импорт)."""
+def get_canonical_skills_set() -> FrozenSet[str]:
+    """Неизменяемое множество канонических названий навыков из реестра справочника."""
     try:
-        from config import Config
-        path = Path(Config.SKILLS_FILE)
-        if not path.is_absolute():
-            path = Path(__file__).resolve().parent / path
-        with open(path, "r", encoding="utf-8") as f:
-            skills = json.load(f)
-        names = set()
-        for s in skills:
-            n = s.get("Навык") or s.get("name")
-            if n:
-                names.add(str(n).strip())
-        return names
+        return get_reference_data().canonical_names
     except Exception:
-        return set()
+        return frozenset()
@@ -32,48 +32,29 @@ class SwitchViewModel:
 
 
 def retrieve_skill_snippets(skill_names: List[str], max_len: int = 120) -> Dict[str, str]:
-    """Краткие описания навыков из RAG (1–2 строки)."""
-    result = {}
+    """Краткие описания навыков (1–2 строки): таблица каталога, для неканонических имён — RAG."""
     try:
-        from rag_service import retrieve
-        for name in skill_names:
-            hits = retrieve(name, top_k=1, score_threshold=0.4)
-            if hits:
-                p = (hits[0].get("payload") or {})
-                text = (p.get("text") or "").strip()
-                if text:
-                    result[name] = (text[:max_len] + "…") if len(text) > max_len else text
+        from rag_service import get_skill_snippets
+        return get_skill_snippets(skill_names, max_len=max_len)
     except Exception:
-        pass
-    return result
+        return {}
 
 
-def _get_gap_explanation(name: str) -> str:
-    """Краткое RAG-объяснение для разрыва по навыку (1–2 предложения)."""
+def _get_gap_explanations(names: List[str]) -> Dict[str, str]:
+    """Краткие RAG-объяснения для разрывов по навыкам (1–2 предложения), одним batch-запросом."""
     try:
-        from rag_service import get_rag_explanation_for_gap
-        return get_rag_explanation_for_gap(name, is_skill=True) or ""
+        from rag_service import get_rag_explanations_for_gaps
+        return get_rag_explanations_for_gaps(names, is_skill=True)
     except Exception:
-        return ""
+        return {}
 
 
 def _load_skill_clusters() -> tuple:
-    """Загружает skill_clusters.json. Возвращает (skill_name -> cluster_id, cluster_id -> label) или ({}, {})."""
+    """Кластеры навыков (skill_clusters.json) из реестра. Возвращает (skill_name -> cluster_id, cluster_id -> label) или ({}, {})."""
     try:
-        from pathlib import Path
-        from config import Config
-        import json
-        path = Path(Config.SKILLS_FILE)
-        if not path.is_absolute():
-            path = Path(__file__).resolve().parent / path
-        path = path.parent / "skill_clusters.json"
-        if not path.exists():
-            return {}, {}
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        skills_map = data.get("skills") or {}
-        labels = {str(k): v for k, v in (data.get("labels") or {}).items()}
-        return skills_map, labels
+        from reference_data import get_reference_data
+        ref = get_reference_data()
+        return ref.skill_clusters, ref.cluster_labels
     except Exception:
         return {}, {}
 
@@ -120,8 +101,15 @@ def build_switch_comparison(
     skill_reqs = {k: v for k, v in reqs.items() if k not in data_loader.atlas_map}
     total = len(skill_reqs) or 1
 
-    # Exact match
-    matched_names = [s for s in skill_reqs if s in norm and norm.get(s, 0) >= skill_reqs[s]]
+    # Exact match: по матрице требований (int-id), если загрузчик её предоставляет
+    matrix = getattr(data_loader, "requirement_matrix", None)
+    role_id = matrix.role_id(target_role) if matrix is not None else None
+    if role_id is not None:
+        met = matrix.met_mask(matrix.user_vector(norm), baseline, [role_id])[0]
+        met_names = set(matrix.names(met.nonzero()[0]))
+        matched_names = [s for s in skill_reqs if s in met_names]
+    else:
+        matched_names = [s for s in skill_reqs if s in norm and norm.get(s, 0) >= skill_reqs[s]]
     matched_set = set(matched_names)
 
     # Semantic match for unmatched skills
@@ -143,12 +131,13 @@ def build_switch_comparison(
     matched_top = matched_names[:8]
     missing_top = missing_names[:12]
     snippets = retrieve_skill_snippets(matched_top + missing_top)
+    explanations = _get_gap_explanations(missing_top[:8])
     matched_skills = [{"name": n, "snippet": snippets.get(n, "")} for n in matched_top]
     missing_skills = []
     for i, n in enumerate(missing_top):
         item = {"name": n, "importance": "must-have" if i < 6 else "nice-to-have"}
         if i < 8:
-            item["explanation"] = _get_gap_explanation(n)
+            item["explanation"] = explanations.get(n, "")
         missing_skills.append(item)
 
     key_skills = list(skill_reqs.keys())[:12]
@@ -0,0 +1,142 @@
+"""
+Командный gap-анализ для HR: много профилей сотрудников × одна целевая роль/грейд.
+
+Профили обрабатываются чанками через GapAnalyzer.analyze_profiles_batch: нормализация имён
+и эмбеддинги навыков общие на чанк, требования роли считаются один раз. Результаты отдаются
+потоком (по строке на сотрудника) и завершаются сводкой с пропускной способностью.
+LLM-план генерируется только по явному запросу (include_plan).
+"""
+
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import Config
+from data_loader import GRADE_TO_PARAM_ORDINAL
+from gap_analyzer import GapAnalyzer
+
+
+def profile_to_user_skills(profile: Dict[str, Any], atlas_param_names: Iterable[str]) -> Dict[str, Any]:
+    """Навыки профиля во внутренних уровнях (навыки 1–3, параметры атласа 1–5).
+
+    skills: {"Python": 2} или [{"name": "Python", "level": 2}]. Параметры атласа, которых нет
+    в профиле, проставляются по текущему грейду сотрудника (как в /api/plan)."""
+    raw = profile.get("skills") or {}
+    if isinstance(raw, dict):
+        items = list(raw.items())
+    else:
+        items = [((s or {}).get("name"), (s or {}).get("level", 1)) for s in raw]
+    user_skills: Dict[str, Any] = {}
+    for name, level in items:
+        name = (name or "").strip()
+        if not name:
+            continue
+        try:
+            level = float(level)
+        except (TypeError, ValueError):
+            continue
+        if level != level or level <= 0:
+            continue
+        user_skills[name] = int(level) if level == int(level) else level
+    param_ordinal = GRADE_TO_PARAM_ORDINAL.get(profile.get("grade") or "Middle", 2)
+    for param_name in atlas_param_names:
+        user_skills.setdefault(param_name, param_ordinal)
+    return user_skills
+
+
+def _summary_row(result: Dict[str, Any], top_gaps: int) -> Dict[str, Any]:
+    gaps = sorted(result["atlas_gaps"] + result["skill_gaps"], key=lambda g: (-g["delta"], g["name"]))
+    return {
+        "match_percent": result["match_percent"],
+        "match_percent_legacy": result["match_percent_legacy"],
+        "strong_count": len(result["strong"]),
+        "missing_count": len(result["missing"]),
+        "gap_count": len(result["atlas_gaps"]) + len(result["skill_gaps"]),
+        "top_gaps": [
+            {"name": g["name"], "current": g["current"], "required": g["required"], "is_atlas": g["is_atlas"]}
+            for g in gaps[:top_gaps]
+        ],
+    }
+
+
+def score_team(
+    profiles: Iterable[Dict[str, Any]],
+    target_role: str,
+    target_grade: str,
+    data_loader,
+    include_plan: bool = False,
+    include_details: bool = False,
+    chunk_size: Optional[int] = None,
+    top_gaps: int = 5,
+) -> Iterator[Dict[str, Any]]:
+    """Поток результатов: {"type": "result", ...} на каждый профиль, в конце {"type": "summary", ...}.
+
+    target_role — отображаемое или внутреннее имя роли. include_details добавляет полный
+    structured-результат, include_plan — markdown-план (OutputFormatter, с LLM при наличии ключа)."""
+    role_internal = data_loader.get_internal_role_name(target_role) or target_role
+    atlas_param_names = list(data_loader.atlas_map.keys())
+    formatter = None
+    if include_plan:
+        from output_formatter import OutputFormatter
+        formatter = OutputFormatter(data_loader)
+
+    chunk_size = max(1, chunk_size or Config.TEAM_GAP_CHUNK_SIZE)
+    name_cache: Dict[str, str] = {}  # резолв имён навыков общий на весь батч, не только на чанк
+    started = time.perf_counter()
+    count = 0
+    errors = 0
+    match_sum = 0
+    chunk: List[Dict[str, Any]] = []
+
+    def _flush(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        user_skills = [profile_to_user_skills(p, atlas_param_names) for p in batch]
+        results = GapAnalyzer.analyze_profiles_batch(
+            user_skills, role_internal, target_grade, data_loader, name_cache=name_cache
+        )
+        rows = []
+        for profile, result in zip(batch, results):
+            row = {"type": "result", "id": profile.get("id"), "role": target_role, "grade": target_grade}
+            row.update(_summary_row(result, top_gaps))
+            if include_details:
+                row["analysis"] = {k: v for k, v in result.items() if k not in ("role", "grade")}
+            if formatter is not None:
+                current = profile.get("grade") or "Middle"
+                row["plan_markdown"] = formatter.format_next_grade(
+                    result, f"{target_role} ({target_grade})", target_role,
+                    current_grade=current, target_grade=target_grade, profession_internal=role_internal,
+                )
+            rows.append(row)
+        return rows
+
+    def _emit(batch: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        nonlocal count, errors, match_sum
+        try:
+            rows = _flush(batch)
+        except Exception as e:
+            errors += len(batch)
+            for profile in batch:
+                yield {"type": "error", "id": profile.get("id"), "error": str(e)}
+            return
+        for row in rows:
+            count += 1
+            match_sum += row["match_percent"]
+            yield row
+
+    for profile in profiles:
+        chunk.append(profile if isinstance(profile, dict) else {"skills": profile})
+        if len(chunk) >= chunk_size:
+            yield from _emit(chunk)
+            chunk = []
+    if chunk:
+        yield from _emit(chunk)
+
+    elapsed = time.perf_counter() - started
+    yield {
+        "type": "summary",
+        "role": target_role,
+        "grade": target_grade,
+        "profiles": count,
+        "errors": errors,
+        "avg_match_percent": round(match_sum / count, 1) if count else 0.0,
+        "elapsed_sec": round(elapsed, 3),
+        "profiles_per_sec": round(count / elapsed, 1) if elapsed > 0 else None,
+    }
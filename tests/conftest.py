@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Общие фикстуры: RAG-индекс во встроенном векторном хранилище на детерминированных эмбеддингах."""
+
+import re
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+def bag_of_words(texts, **kw):
+    """64-мерный bag-of-words по crc32 токенов: близкие по словам тексты близки по вектору."""
+    out = np.zeros((len(texts), 64), dtype=np.float32)
+    for i, t in enumerate(texts):
+        for token in re.findall(r"\w+", t.lower()):
+            out[i, zlib.crc32(token.encode("utf-8")) % 64] += 1.0
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+@pytest.fixture
+def local_rag_index(tmp_path, monkeypatch):
+    """build_index(force_recreate=True) в LocalVectorStore под tmp_path; таблицы, которые пишет
+    переиндексация (сниппеты, навыки-помощники), — тоже в tmp_path, их кэши сброшены."""
+    import next_grade_service
+    import rag_service
+    from config import Config
+
+    monkeypatch.setattr(Config, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(Config, "LOCAL_VECTOR_DIR", tmp_path / "vectors")
+    monkeypatch.setattr(Config, "SKILL_SNIPPETS_FILE", tmp_path / "skill_snippets.json")
+    monkeypatch.setattr(Config, "PARAM_SKILL_SUPPORT_FILE", tmp_path / "param_skill_support.json")
+    monkeypatch.setattr(rag_service, "_encode_texts", bag_of_words)
+    monkeypatch.setattr(rag_service, "_load_or_build_skill_clusters", lambda skills: ({}, {}))
+    monkeypatch.setattr(rag_service, "_snippet_table_cache", None)
+    monkeypatch.setattr(next_grade_service, "_support_table_cache", None)
+    assert rag_service.build_index(force_recreate=True)
+    return tmp_path
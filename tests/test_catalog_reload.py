@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Горячая перезагрузка каталога: атомарная подмена версии, закреплённые запросы, версия в ответе."""
+
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from config import Config
+from reference_data import (
+    DataLoaderView,
+    get_reference_data,
+    invalidate_reference_data,
+    pin_reference_data,
+    reload_reference_data,
+)
+
+
+@pytest.fixture
+def tmp_catalog(monkeypatch, tmp_path):
+    for name in ("clean_skills.json", "atlas_params_clean.json", "skill_synonyms.json"):
+        shutil.copy(Config.DATA_DIR / name, tmp_path / name)
+    monkeypatch.setattr(Config, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(Config, "SKILLS_FILE", tmp_path / "clean_skills.json")
+    monkeypatch.setattr(Config, "ATLAS_FILE", tmp_path / "atlas_params_clean.json")
+    monkeypatch.setattr(Config, "REFERENCE_SNAPSHOT_FILE", tmp_path / "reference_snapshot.bin")
+    invalidate_reference_data()
+    yield tmp_path
+    invalidate_reference_data()
+
+
+def test_reload_is_noop_when_files_unchanged(tmp_catalog):
+    ref = get_reference_data()
+    version, swapped = reload_reference_data()
+    assert (version, swapped) == (ref.version, False)
+    assert get_reference_data() is ref
+
+
+def test_reload_swaps_version_but_pinned_request_keeps_old(tmp_catalog):
+    from skill_normalizer import resolve_to_canonical
+
+    old = get_reference_data()
+    synonyms_path = tmp_catalog / "skill_synonyms.json"
+    synonyms = json.loads(synonyms_path.read_text(encoding="utf-8"))
+    synonyms["питонище"] = "Python"
+    synonyms_path.write_text(json.dumps(synonyms, ensure_ascii=False), encoding="utf-8")
+
+    with pin_reference_data() as pinned:
+        version, swapped = reload_reference_data()
+        assert swapped and version != old.version
+        # запрос, начатый до подмены, видит свою версию целиком
+        assert get_reference_data() is pinned is old
+        assert resolve_to_canonical("питонище") is None
+
+    new = get_reference_data()
+    assert new.version == version
+    assert resolve_to_canonical("питонище") == "Python"
+
+
+def test_data_loader_view_follows_current_version(tmp_catalog):
+    view = DataLoaderView()
+    assert view.atlas_map is get_reference_data().data_loader.atlas_map
+    reload_reference_data(force=True)
+    assert view.atlas_map is get_reference_data().data_loader.atlas_map
+
+
+def test_responses_carry_catalog_version(tmp_catalog):
+    from fastapi.testclient import TestClient
+
+    import api as api_mod
+
+    client = TestClient(api_mod.app)
+    resp = client.get("/health")
+    version = get_reference_data().version
+    assert resp.headers["X-Catalog-Version"] == version
+    assert resp.json()["catalog_version"] == version
+    assert client.post("/api/admin/catalog/reload").status_code == 403
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Тесты индекса роль → навыки в DataLoader (совпадение с полным проходом по каталогу)."""
+
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from data_loader import DataLoader, GRADE_TO_SKILL_LEVEL, _skill_professions
+
+
+def _scan_role_skills(dl, internals):
+    names = []
+    for skill in dl.skills:
+        professions = _skill_professions(skill)
+        name = skill.get("Навык") or skill.get("name")
+        if set(internals) & set(professions) and name not in names:
+            names.append(name)
+    return names
+
+
+def test_role_requirements_match_full_scan():
+    dl = DataLoader()
+    for role in dl.get_all_roles():
+        internals = dl.get_internal_role_names(role)
+        reqs = dl.get_role_requirements(role, "Senior")
+        skill_part = [k for k in reqs if k not in dl.atlas_map]
+        assert skill_part == _scan_role_skills(dl, internals)
+        assert all(reqs[k] == GRADE_TO_SKILL_LEVEL["Senior"] for k in skill_part)
+        assert all(k in reqs for k in dl.atlas_map)
+
+
+def test_skills_for_role_and_grouped_are_consistent():
+    dl = DataLoader()
+    role = dl.get_all_roles()[0]
+    flat = dl.get_skills_for_role(role)
+    grouped = dl.get_skills_for_role_grouped(role)
+    assert flat == sorted(set(_scan_role_skills(dl, dl.get_internal_role_names(role))))
+    assert sorted({s for g in grouped for s in g["skills"]}) == sorted({s.strip() for s in flat})
+    # Результат — копия: правка не портит индекс
+    grouped[0]["skills"].clear()
+    assert dl.get_skills_for_role_grouped(role)[0]["skills"]
+
+
+def test_unknown_role_returns_only_atlas_params():
+    dl = DataLoader()
+    reqs = dl.get_role_requirements("Несуществующая роль", "Middle")
+    assert set(reqs) == set(dl.atlas_map)
+    assert dl.get_skills_for_role("Несуществующая роль") == []
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Ускоренные бэкенды эмбеддингов включаются только после проверки паритета с эталоном."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import embedding_backends
+from config import Config
+
+
+class _Model:
+    def __init__(self, noise=0.0):
+        self.noise = noise
+
+    def encode(self, texts, normalize_embeddings=True, **kw):
+        out = []
+        for t in texts:
+            rng = np.random.default_rng(sum(map(ord, t)))
+            v = rng.normal(size=16)
+            if self.noise:
+                v = v + np.random.default_rng(len(t)).normal(scale=self.noise, size=16)
+            out.append(v / np.linalg.norm(v))
+        return np.asarray(out, dtype=np.float32)
+
+
+def test_int8_gated_by_parity(monkeypatch):
+    monkeypatch.setattr(Config, "EMBED_BACKEND", "int8")
+    reference = _Model()
+
+    monkeypatch.setattr(embedding_backends, "quantize_int8", lambda m: _Model(noise=0.01))
+    embedder, backend = embedding_backends.load_embedder("m", lambda name: reference)
+    assert backend == "int8" and embedder is not reference
+
+    monkeypatch.setattr(embedding_backends, "quantize_int8", lambda m: _Model(noise=2.0))
+    embedder, backend = embedding_backends.load_embedder("m", lambda name: reference)
+    assert backend == "torch" and embedder is reference
+
+
+def test_onnx_without_export_falls_back(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "EMBED_BACKEND", "onnx")
+    monkeypatch.setattr(Config, "EMBED_ONNX_DIR", tmp_path)
+    reference = _Model()
+    embedder, backend = embedding_backends.load_embedder("org/model", lambda name: reference)
+    assert backend == "torch" and embedder is reference
+
+
+def test_mean_pool_ignores_padding():
+    tokens = np.array([[[1.0, 1.0], [3.0, 3.0], [100.0, 100.0]]])
+    mask = np.array([[1, 1, 0]])
+    assert np.allclose(embedding_backends._mean_pool(tokens, mask), [[2.0, 2.0]])
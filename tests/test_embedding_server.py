@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Сервер эмбеддингов: реплика в отдельном процессе отвечает по сокету, API-сторона не грузит модели."""
+
+import multiprocessing as mp
+import socket
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import embedding_server
+import rag_service
+from config import Config
+
+
+class _FakeModel:
+    def encode(self, texts, normalize_embeddings=True, **kw):
+        if "boom" in texts:
+            raise ValueError("bad input")
+        return np.asarray([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    # реплика форкается с уже подменённой моделью
+    monkeypatch.setattr(rag_service, "_get_embedder", lambda model_name=None: _FakeModel())
+    address = f"unix:{tmp_path / 'embed.sock'}"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(tmp_path / "embed.sock"))
+    listener.listen(8)
+    proc = mp.get_context("fork").Process(target=embedding_server._replica_loop, args=(listener, []), daemon=True)
+    proc.start()
+    yield address
+    proc.terminate()
+    proc.join(timeout=5)
+    listener.close()
+
+
+def test_remote_encode_round_trip(replica):
+    vecs = embedding_server.remote_encode(replica, "any-model", ["ab", "abcd"], timeout=10)
+    assert vecs.shape == (2, 3) and vecs[:, 0].tolist() == [2.0, 4.0]
+    with pytest.raises(RuntimeError, match="bad input"):
+        embedding_server.remote_encode(replica, "any-model", ["boom"], timeout=10)
+
+
+def test_encode_texts_uses_server_without_loading_models(replica, monkeypatch):
+    monkeypatch.setattr(Config, "EMBED_SERVER_ADDRESS", replica)
+    monkeypatch.setattr(Config, "EMBEDDING_STORE_ENABLED", False)
+
+    def _no_local_models(model_name=None):
+        raise AssertionError("модель не должна грузиться в процессе API")
+
+    monkeypatch.setattr(rag_service, "_get_embedder", _no_local_models)
+    vecs = rag_service._encode_texts(["abc"], model_name="server-only-model", prefix="q: ")
+    assert vecs[0, 0] == len("q: abc")
+
+
+def test_unreachable_server_raises(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "EMBED_SERVER_ADDRESS", f"unix:{tmp_path / 'missing.sock'}")
+    monkeypatch.setattr(Config, "EMBED_SERVER_FALLBACK_LOCAL", False)
+    monkeypatch.setattr(Config, "EMBEDDING_STORE_ENABLED", False)
+    with pytest.raises(OSError):
+        rag_service._encode_texts(["abc"], model_name="unreachable-model")
+
+
+class _ConcurrencyProbe:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = __import__("threading").Lock()
+
+    def __call__(self, texts):
+        import time
+
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return np.asarray([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+
+def _encode_in_threads(n):
+    import threading
+
+    threads = [
+        threading.Thread(target=rag_service._encode_texts, args=([f"text-{i}"],), kwargs={"model_name": "m"})
+        for i in range(n)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_local_fallback_is_serialized_and_remote_is_not(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "EMBEDDING_STORE_ENABLED", False)
+    monkeypatch.setattr(Config, "QUERY_CACHE_MAX_MB", 0)
+    monkeypatch.setattr(Config, "ENCODER_BATCHING", False)
+
+    # сервер недоступен, fallback на модель в процессе: encode никогда не идёт параллельно
+    local = _ConcurrencyProbe()
+    monkeypatch.setattr(Config, "EMBED_SERVER_ADDRESS", f"unix:{tmp_path / 'missing.sock'}")
+    monkeypatch.setattr(Config, "EMBED_SERVER_FALLBACK_LOCAL", True)
+
+    class _Model:
+        def encode(self, texts, **kw):
+            return local(texts)
+
+    monkeypatch.setattr(rag_service, "_get_embedder", lambda model_name=None: _Model())
+    _encode_in_threads(4)
+    assert local.peak == 1
+
+    # удалённые вызовы под глобальной блокировкой не держатся
+    remote = _ConcurrencyProbe()
+    monkeypatch.setattr(Config, "EMBED_SERVER_ADDRESS", "tcp:127.0.0.1:1")
+    monkeypatch.setattr(embedding_server, "remote_encode", lambda address, model, texts, normalize: remote(texts))
+    _encode_in_threads(4)
+    assert remote.peak > 1
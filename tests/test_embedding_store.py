@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Постоянное хранилище эмбеддингов: повторный запуск не вызывает энкодер для текстов каталога."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import embedding_store
+import query_cache
+import rag_service
+from config import Config
+from embedding_store import EmbeddingStore
+
+
+class _FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=True, show_progress_bar=False):
+        self.calls.append(list(texts))
+        out = [np.random.default_rng(sum(map(ord, t))).normal(size=8) for t in texts]
+        return np.asarray(out, dtype=np.float32)
+
+
+@pytest.fixture
+def fake_model(tmp_path, monkeypatch):
+    embedder = _FakeEmbedder()
+    monkeypatch.setattr(Config, "EMBEDDING_STORE_DIR", tmp_path)
+    monkeypatch.setattr(Config, "EMBEDDING_STORE_ENABLED", True)
+    monkeypatch.setattr(embedding_store, "_store", None)
+    monkeypatch.setattr(query_cache, "_cache", None)
+    monkeypatch.setattr(rag_service, "_get_embedder", lambda model_name=None: embedder)
+    return embedder
+
+
+def test_passages_are_encoded_once_across_restarts(fake_model):
+    names = ["Python", "SQL", "Python"]
+    first = rag_service._encode_for_matching(names, is_query=False)
+    assert fake_model.calls == [["passage: Python", "passage: SQL"]]
+    assert np.allclose(first[0], first[2])
+
+    # «новый воркер»: пустой процессный кэш, то же хранилище на диске
+    embedding_store._store = None
+    fake_model.calls.clear()
+    second = rag_service._encode_for_matching(names, is_query=False)
+    assert fake_model.calls == []
+    assert np.allclose(first, second)
+
+    # запросы пользователя не пишутся в хранилище (повтор отдаёт LRU-кэш запросов); другой префикс — другой ключ
+    rag_service._encode_for_matching(["Python"], is_query=True)
+    rag_service._encode_for_matching(["Python"], is_query=True)
+    assert len(fake_model.calls) == 1 and fake_model.calls[0][0].endswith("Query: Python")
+    store = embedding_store.get_embedding_store()
+    assert store.get_many(Config.EMBED_MODEL_NAME_V2, rag_service._E5_QUERY_PREFIX, ["Python"]) == [None]
+
+
+def test_writes_from_another_process_become_visible(tmp_path):
+    writer = EmbeddingStore(tmp_path)
+    reader = EmbeddingStore(tmp_path)
+    assert reader.get_many("m", "p: ", ["a"]) == [None]
+    writer.put_many("m", "p: ", ["a", "b"], np.eye(2, dtype=np.float32))
+    got = reader.get_many("m", "p: ", ["b", "a", "c"])
+    assert np.allclose(got[0], [0, 1]) and np.allclose(got[1], [1, 0]) and got[2] is None
+    assert writer.put_many("m", "p: ", ["a"], np.ones((1, 2))) == 0
+    assert reader.get_many("m", "other: ", ["a"]) == [None]
+    assert reader.stats()["hits"] == 2
+
+
+def test_backends_do_not_share_stored_vectors(fake_model, monkeypatch):
+    model = Config.EMBED_MODEL_NAME_V2
+    monkeypatch.setattr(rag_service, "_embedder_backends", {})
+    rag_service._encode_for_matching(["Python"], is_query=False)
+
+    # int8 не отдаёт вектора torch и пишет в своё пространство
+    monkeypatch.setattr(Config, "EMBED_BACKEND", "int8")
+    fake_model.calls.clear()
+    rag_service._encode_for_matching(["Python"], is_query=False)
+    assert fake_model.calls == [["passage: Python"]]
+    store = embedding_store.get_embedding_store()
+    assert store.get_many(f"{model}@int8", rag_service._E5_PASSAGE_PREFIX, ["Python"])[0] is not None
+
+    # откат int8 на torch по паритету: промах пишется под torch, а не под int8
+    monkeypatch.setattr(rag_service, "_embedder_backends", {model: "torch"})
+    fake_model.calls.clear()
+    rag_service._encode_for_matching(["SQL"], is_query=False)
+    assert fake_model.calls == [["passage: SQL"]]
+    assert store.get_many(model, rag_service._E5_PASSAGE_PREFIX, ["SQL"])[0] is not None
+    assert store.get_many(f"{model}@int8", rag_service._E5_PASSAGE_PREFIX, ["SQL"]) == [None]
+
+    # кэш запросов тоже разделён по бэкенду
+    monkeypatch.setattr(rag_service, "_embedder_backends", {})
+    rag_service._encode_for_matching(["Go"], is_query=True)
+    monkeypatch.setattr(Config, "EMBED_BACKEND", "torch")
+    fake_model.calls.clear()
+    rag_service._encode_for_matching(["Go"], is_query=True)
+    assert len(fake_model.calls) == 1
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Micro-batching энкодера: параллельные одиночные запросы склеиваются в общий encode."""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from encoder_service import BatchingEncoder
+
+
+def _slow_encode(calls):
+    def _encode(texts):
+        calls.append(list(texts))
+        time.sleep(0.02)
+        return np.asarray([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+    return _encode
+
+
+def test_concurrent_callers_share_batches():
+    calls = []
+    encoder = BatchingEncoder(max_batch=64, max_wait_ms=20)
+    encode = _slow_encode(calls)
+    results = {}
+    barrier = threading.Barrier(16)
+
+    def _worker(i):
+        text = "x" * (i + 1)
+        barrier.wait()
+        results[i] = encoder.encode("m", [text], encode)
+
+    threads = [threading.Thread(target=_worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) < 16
+    assert sum(len(c) for c in calls) == 16
+    for i, vec in results.items():
+        assert vec.shape == (1, 2) and vec[0, 0] == i + 1
+    stats = encoder.stats()["models"]["m"]
+    assert stats["texts"] == 16 and stats["queue_texts"] == 0 and stats["largest_batch"] > 1
+
+
+def test_batch_size_limit_and_errors():
+    calls = []
+    encoder = BatchingEncoder(max_batch=3, max_wait_ms=1)
+    out = encoder.encode("m", ["a", "bb", "ccc", "dddd", "e"], _slow_encode(calls))
+    # запрос больше лимита уходит одним батчем целиком
+    assert out[:, 0].tolist() == [1, 2, 3, 4, 1] and len(calls) == 1
+
+    def _broken(texts):
+        raise RuntimeError("нет модели")
+
+    with pytest.raises(RuntimeError):
+        encoder.encode("broken", ["a"], _broken)
+    # очередь продолжает работать после ошибки
+    with pytest.raises(RuntimeError):
+        encoder.encode("broken", ["b"], _broken)
+    assert encoder.encode("m", [], _broken).shape[0] == 0
+
+
+def test_progress_bar_is_per_call_not_per_queue(monkeypatch):
+    import encoder_service
+    import query_cache
+    import rag_service
+    from config import Config
+
+    seen = []
+
+    class _Embedder:
+        def encode(self, texts, normalize_embeddings=True, show_progress_bar=False):
+            seen.append(show_progress_bar)
+            return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(Config, "ENCODER_BATCHING", True)
+    monkeypatch.setattr(Config, "EMBED_SERVER_ADDRESS", "")
+    monkeypatch.setattr(encoder_service, "_encoder", BatchingEncoder(max_batch=8, max_wait_ms=1))
+    monkeypatch.setattr(rag_service, "_get_embedder", lambda model_name=None: _Embedder())
+    monkeypatch.setattr(query_cache, "get_query_cache", lambda: None)
+
+    # первый вызов с прогресс-баром идёт в обход очереди и не закрепляет опцию за ней
+    rag_service._encode_texts(["a"], model_name="m", show_progress_bar=True)
+    rag_service._encode_texts(["b"], model_name="m")
+    rag_service._encode_texts(["c"], model_name="m", show_progress_bar=True)
+    assert seen == [True, False, True]
+    assert encoder_service.get_batching_encoder().stats()["models"]["('m', True)"]["texts"] == 1
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Индекс explore: векторный скоринг всех ролей × грейдов совпадает с циклом по ролям."""
+
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import rag_service
+from config import Config
+from explore_index import EXPLORE_GRADES, build_explore_index
+from reference_data import get_data_loader
+from scenario_handler import ScenarioHandler
+
+_DIM = 16
+
+
+def _vec(name):
+    rng = np.random.default_rng(zlib.crc32(name.lower().encode("utf-8")))
+    v = rng.normal(size=_DIM)
+    return v / np.linalg.norm(v)
+
+
+def _encode(names):
+    return np.asarray([_vec(n) for n in names], dtype=np.float32)
+
+
+def _loop_explore(loader, norm, user_names, user_vecs):
+    """Прежний алгоритм: цикл роль × грейд с мэтчингом и усреднением на каждую пару."""
+    out = []
+    for role_display in loader.get_all_roles():
+        internal = loader.get_internal_role_name(role_display)
+        for grade in EXPLORE_GRADES:
+            reqs = {k: v for k, v in loader.get_role_requirements(internal, grade).items() if k not in loader.atlas_map}
+            if not reqs:
+                continue
+            names = list(reqs)
+            exact = sum(1 for s, req in reqs.items() if s in norm and norm[s] >= req)
+            req_vecs = _encode(names)
+            sem = 0
+            sim = np.dot(user_vecs, req_vecs.T)
+            pairs = [(sim[i, j], i, j) for i in range(len(user_names)) for j in range(len(names))
+                     if sim[i, j] >= Config.SKILL_MATCH_THRESHOLD]
+            used_u, used_r = set(), set()
+            for _, i, j in sorted(pairs, key=lambda x: -x[0]):
+                if i in used_u or j in used_r:
+                    continue
+                used_u.add(i)
+                used_r.add(j)
+                u, r = user_names[i], names[j]
+                if r not in norm and norm.get(u, 0) >= reqs.get(r, 1):
+                    sem += 1
+            profile = rag_service.compute_profile_similarity(
+                user_names, names, precomputed_user_vecs=user_vecs, precomputed_role_vecs=req_vecs
+            )
+            out.append({
+                "role": f"{role_display} ({grade})",
+                "match": int((min(exact + sem, len(reqs)) / len(reqs)) * 100),
+                "semantic_score": round(profile, 3),
+                "internal_role": internal,
+            })
+    return sorted(out, key=lambda x: (-x["semantic_score"], -x["match"], x["role"]))[:30]
+
+
+def _user(loader):
+    role = loader.get_internal_role_name(loader.get_all_roles()[0])
+    skills = [k for k in loader.get_role_requirements(role, "Middle") if k not in loader.atlas_map]
+    norm = {skills[0]: 3, skills[1]: 1}
+    # «перефразированные» навыки: вектор совпадает с навыком каталога, имя — нет
+    norm[skills[2].upper()] = 3
+    if len(skills) > 3:
+        norm[skills[3].upper()] = 1
+    return norm
+
+
+def test_index_scoring_matches_role_loop():
+    loader = get_data_loader()
+    norm = _user(loader)
+    user_names = list(norm)
+    user_vecs = _encode(user_names)
+    index = build_explore_index(loader, _encode)
+    assert index.offsets[-1] == len(index.cols) and len(index.vocab) == len(set(index.vocab))
+
+    scores = index.score(norm, user_names, user_vecs, Config.SKILL_MATCH_THRESHOLD, "greedy")
+    assert scores["semantic"].sum() > 0
+    got = [
+        {
+            "role": index.labels[s],
+            "match": int(scores["match"][s]),
+            "semantic_score": round(float(scores["semantic_score"][s]), 3),
+            "internal_role": index.segments[s][1],
+        }
+        for s in index.top(scores, 30)
+    ]
+    assert got == _loop_explore(loader, norm, user_names, user_vecs)
+
+
+def test_explore_opportunities_uses_index(monkeypatch):
+    loader = get_data_loader()
+    norm = _user(loader)
+    index = build_explore_index(loader, _encode)
+    monkeypatch.setattr(rag_service, "get_explore_index", lambda explore_fast=False, ref=None: index)
+    monkeypatch.setattr(
+        rag_service, "encode_user_skills_query_vectors", lambda names, explore_fast=False: _encode(names)
+    )
+    opps = ScenarioHandler(loader).explore_opportunities(norm)
+    assert len(opps) == min(30, len(index))
+    keys = [(-o["semantic_score"], -o["match"], o["role"]) for o in opps]
+    assert keys == sorted(keys)
+
+
+def test_index_without_embeddings_counts_exact_matches():
+    loader = get_data_loader()
+    norm = _user(loader)
+    index = build_explore_index(loader)
+    scores = index.score(norm, list(norm), None, Config.SKILL_MATCH_THRESHOLD)
+    assert index.vectors is None and not scores["semantic_score"].any()
+    for s, (_, internal, grade) in enumerate(index.segments):
+        reqs = {k: v for k, v in loader.get_role_requirements(internal, grade).items() if k not in loader.atlas_map}
+        assert scores["exact"][s] == sum(1 for k, v in reqs.items() if norm.get(k, 0) >= v)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""analyze_structured_batch: один проход по N целям совпадает с N вызовами analyze_structured."""
+
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import gap_analyzer
+from gap_analyzer import GapAnalyzer
+from reference_data import get_data_loader
+
+
+def _targets(loader, n=6):
+    roles = loader.requirement_matrix.role_names[:n]
+    grades = ["Junior", "Middle", "Senior", "Lead", "Expert", "Middle"]
+    return [(role, grades[i % len(grades)]) for i, role in enumerate(roles)] + [("Нет такой роли", "Middle")]
+
+
+def _user_profile(loader):
+    role = loader.requirement_matrix.role_names[0]
+    names = [k for k in loader.get_role_requirements(role, "Middle") if k not in loader.atlas_map]
+    profile = {names[0]: 3, names[1]: 1, "Навык вне каталога": 2}
+    for i, param in enumerate(loader.atlas_map):
+        profile[param] = 1 + i % 5
+    return profile
+
+
+def _assert_batch_matches_single(loader, user, targets):
+    atlas_names = list(loader.atlas_map.keys())
+    batch = GapAnalyzer.analyze_structured_batch(user, targets, loader)
+    assert len(batch) == len(targets)
+    for (role, grade), result in zip(targets, batch):
+        single = GapAnalyzer.analyze_structured(
+            user, loader.get_role_requirements(role, grade), atlas_names, loader.atlas_map
+        )
+        assert (result.pop("role"), result.pop("grade")) == (role, grade)
+        assert result == single
+
+
+def test_batch_matches_single_without_semantics(monkeypatch):
+    monkeypatch.setattr(gap_analyzer, "_build_semantic_map", lambda u, r: {})
+    monkeypatch.setattr(gap_analyzer, "_build_semantic_maps", lambda pairs: [{} for _ in pairs])
+    loader = get_data_loader()
+    _assert_batch_matches_single(loader, _user_profile(loader), _targets(loader))
+
+
+def test_batch_applies_semantic_matches_per_target(monkeypatch):
+    loader = get_data_loader()
+    user = _user_profile(loader)
+    role = loader.requirement_matrix.role_names[1]
+    required = [k for k in loader.get_role_requirements(role, "Middle") if k not in loader.atlas_map]
+    target = next(n for n in required if n not in user)
+
+    def fake_single(user_names, required_names):
+        return {"Навык вне каталога": target} if target in required_names else {}
+
+    monkeypatch.setattr(gap_analyzer, "_build_semantic_map", fake_single)
+    monkeypatch.setattr(
+        gap_analyzer, "_build_semantic_maps", lambda pairs: [fake_single(u, names) for u, names in pairs]
+    )
+    targets = [(role, "Middle"), (role, "Senior")] + _targets(loader, 3)
+    _assert_batch_matches_single(loader, user, targets)
+
+    first = GapAnalyzer.analyze_structured_batch(user, targets[:1], loader)[0]
+    assert (target, 2) in first["strong"]
+
+
+def test_empty_targets():
+    assert GapAnalyzer.analyze_structured_batch({"Python": 2}, []) == []
+
+
+def test_profiles_batch_matches_single(monkeypatch):
+    monkeypatch.setattr(gap_analyzer, "_build_semantic_map", lambda u, r: {})
+    monkeypatch.setattr(gap_analyzer, "_build_semantic_maps", lambda pairs: [{} for _ in pairs])
+    loader = get_data_loader()
+    role = loader.requirement_matrix.role_names[2]
+    base = _user_profile(loader)
+    profiles = [base, {}, {k: v for k, v in base.items() if k in loader.atlas_map}, {"питон": 2}]
+    results = GapAnalyzer.analyze_profiles_batch(profiles, role, "Senior", loader)
+    atlas_names = list(loader.atlas_map.keys())
+    reqs = loader.get_role_requirements(role, "Senior")
+    for profile, result in zip(profiles, results):
+        result.pop("role"), result.pop("grade")
+        assert result == GapAnalyzer.analyze_structured(profile, reqs, atlas_names, loader.atlas_map)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Lexical-индекс навыков: fuzzy-скоринг совпадает с прежним проходом по каталогу, BM25 ранжирует по токенам."""
+
+import sys
+from pathlib import Path
+
+from rapidfuzz import fuzz
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from lexical_index import LexicalIndex
+from rag_service import _tokenize_for_lexical, normalize_user_input
+from reference_data import get_reference_data
+
+
+def _scan(rows, user_input, top_k, min_score=0.05):
+    """Прежний алгоритм: нормализация и токенизация каждой пары запрос × навык."""
+    query = normalize_user_input(user_input)
+    scored = []
+    for row in rows:
+        nq, nc = normalize_user_input(query), normalize_user_input(row["name"])
+        if not nq or not nc:
+            continue
+        q_tok, c_tok = set(_tokenize_for_lexical(query)), set(_tokenize_for_lexical(row["name"]))
+        jaccard = len(q_tok & c_tok) / len(q_tok | c_tok) if q_tok and c_tok else 0.0
+        score = 0.6 * (fuzz.token_sort_ratio(nq, nc) / 100.0) + 0.4 * jaccard
+        if score >= min_score:
+            scored.append((score, row["name"]))
+    scored.sort(key=lambda x: -x[0])
+    return scored[:top_k]
+
+
+def test_fuzzy_index_matches_catalog_scan():
+    rows = get_reference_data().tables["skill_rows"]
+    index = LexicalIndex(rows, normalize_user_input, _tokenize_for_lexical)
+    queries = ["питон", "SQL запросы", "управление командой", "docker", "x"]
+    for query, hits in zip(queries, index.search_many(queries, top_k=15)):
+        expected = _scan(rows, query, 15)
+        assert [h["payload"]["name"] for h in hits] == [name for _, name in expected]
+        assert [h["score"] for h in hits] == [score for score, _ in expected]
+
+
+def test_bm25_prefers_rare_shared_tokens():
+    rows = [
+        {"name": "Python", "profession": "Dev"},
+        {"name": "Анализ данных", "profession": "Data"},
+        {"name": "Анализ требований", "profession": "BA"},
+        {"name": "Визуализация данных", "profession": "Data"},
+    ]
+    index = LexicalIndex(rows, normalize_user_input, _tokenize_for_lexical)
+    hits = index.search("анализ данных", top_k=4, min_score=0.01, scorer="bm25")
+    assert hits[0]["payload"]["name"] == "Анализ данных"
+    assert 0.0 < hits[-1]["score"] < hits[0]["score"] <= 1.0
+    assert {h["payload"]["name"] for h in hits} == {"Анализ данных", "Анализ требований", "Визуализация данных"}
+    assert index.search("", top_k=3) == []
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Встроенное векторное хранилище: поиск, фильтры, IVF и сборка индекса тем же build_*."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import rag_service
+from config import Config
+from local_vector_store import LocalVectorStore
+
+
+def _points(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.normal(size=(n, dim)).astype(np.float32)
+    return [
+        {"id": i, "vector": vecs[i].tolist(), "payload": {"name": f"p{i}", "type": "skill" if i % 2 else "atlas"}}
+        for i in range(n)
+    ]
+
+
+def test_search_threshold_filter_and_upsert(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    assert store.get_collections() == []
+    store.create_collection("c", 8)
+    points = _points(20)
+    assert store.upsert("c", points)
+    assert store.get_collections() == ["c"]
+
+    query = points[3]["vector"]
+    hits = store.search("c", query, limit=5, score_threshold=-1.0)
+    assert hits[0]["payload"]["name"] == "p3" and abs(hits[0]["score"] - 1.0) < 1e-5
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+    assert all(h["score"] >= 0.5 for h in store.search("c", query, limit=20, score_threshold=0.5))
+
+    only_atlas = {"must": [{"key": "type", "match": {"value": "atlas"}}]}
+    hits = store.search("c", query, limit=20, score_threshold=-1.0, query_filter=only_atlas)
+    assert len(hits) == 10 and all(h["payload"]["type"] == "atlas" for h in hits)
+
+    # замена точки по id, без дублей
+    store.upsert("c", [{"id": 3, "vector": points[4]["vector"], "payload": {"name": "moved"}}])
+    batch = store.search_batch("c", [points[4]["vector"], query], limit=2, score_threshold=-1.0)
+    assert {h["payload"]["name"] for h in batch[0]} == {"p4", "moved"}
+    assert len(store._load("c").ids) == 20
+
+    store.delete_collection("c")
+    assert store.search("c", query, limit=3, score_threshold=0.0) == []
+
+
+def test_ivf_with_all_lists_matches_exact(tmp_path):
+    exact = LocalVectorStore(tmp_path)
+    exact.create_collection("c", 8)
+    exact.upsert("c", _points(300, seed=1))
+    ivf = LocalVectorStore(tmp_path / "ivf", nprobe=3, ivf_min_points=100)
+    ivf.create_collection("c", 8)
+    ivf.upsert("c", _points(300, seed=1))
+    assert (ivf._load("c").path / "ivf.npz").is_file()
+
+    query = _points(1, seed=7)[0]["vector"]
+    approx = ivf.search("c", query, limit=5, score_threshold=-1.0)
+    assert len(approx) == 5
+    ivf.nprobe = 1000
+    assert ivf.search("c", query, limit=5, score_threshold=-1.0) == exact.search("c", query, limit=5, score_threshold=-1.0)
+
+
+def test_build_and_search_skills_v2_locally(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(Config, "LOCAL_VECTOR_DIR", tmp_path)
+
+    def _fake_encode(texts, **kw):
+        out = []
+        for t in texts:
+            name = t.rsplit(": ", 1)[-1].lower()
+            seed = sum(ord(ch) for ch in name)
+            out.append(np.random.default_rng(seed).normal(size=16))
+        return np.asarray(out, dtype=np.float32)
+
+    monkeypatch.setattr(rag_service, "_encode_texts", _fake_encode)
+    assert rag_service.search_skills_v2("python") == []
+    count = rag_service.build_skills_v2_index(force_recreate=True)
+    assert count and count > 0
+
+    name = rag_service._load_skills_and_atlas()[0][0]["Навык"]
+    hits = rag_service.search_skills_v2(name, top_k=1, score_threshold=0.99)
+    assert hits and hits[0]["payload"]["name"] == name
+    many = rag_service.search_skills_v2_many([name, ""], top_k=1, score_threshold=0.99)
+    assert many[0] == hits and many[1] == []
+
+    # повторная переиндексация без изменений каталога не кодирует ничего заново
+    encoded = []
+    monkeypatch.setattr(rag_service, "_encode_texts", lambda texts, **kw: encoded.append(texts) or _fake_encode(texts))
+    assert rag_service.build_skills_v2_index() == count
+    assert encoded == []
+    assert rag_service.search_skills_v2(name, top_k=1, score_threshold=0.99) == hits
+
+
+def test_reader_sees_whole_generations_across_processes(tmp_path):
+    writer = LocalVectorStore(tmp_path)
+    reader = LocalVectorStore(tmp_path)  # «другой процесс»: свой кэш, тот же каталог
+    writer.create_collection("c", 8)
+    writer.upsert("c", _points(10))
+    old = reader._load("c")
+    assert len(old.ids) == len(old.payloads) == len(old.vectors) == 10
+
+    # недописанное поколение без переключения CURRENT читателю не видно
+    (tmp_path / "c" / "gen-unfinished").mkdir()
+    (tmp_path / "c" / "gen-unfinished" / "meta.json").write_text("{", encoding="utf-8")
+    assert reader._load("c") is old
+
+    writer.upsert("c", _points(15, seed=2)[10:])
+    new = reader._load("c")
+    assert new is not old and len(new.ids) == len(new.payloads) == len(new.vectors) == 15
+    # предыдущее поколение ещё на диске — его можно дочитать; более старые удалены
+    assert old.path.is_dir()
+    assert not (tmp_path / "c" / "gen-unfinished").exists()
+
+
+def test_flat_layout_is_read_and_migrated_on_write(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.create_collection("c", 8)
+    store.upsert("c", _points(4))
+    gen = store._load("c").path
+    for name in ("meta.json", "vectors.npy", "payloads.json"):
+        (gen / name).replace(tmp_path / "c" / name)
+    (tmp_path / "c" / "CURRENT").unlink()
+    gen.rmdir()
+
+    legacy = LocalVectorStore(tmp_path)
+    assert legacy.get_collections() == ["c"] and sorted(legacy.point_payloads("c")) == [0, 1, 2, 3]
+    legacy.upsert("c", [{"id": 9, "vector": np.ones(8).tolist(), "payload": {"name": "new"}}])
+    assert (tmp_path / "c" / "CURRENT").is_file() and len(legacy.point_payloads("c")) == 5
+
+
+def test_full_sync_writes_once_and_trains_ivf_once(tmp_path, monkeypatch):
+    import local_vector_store
+    from vector_sync import sync_collection
+
+    trainings, writes = [], []
+    kmeans = local_vector_store._kmeans
+    monkeypatch.setattr(local_vector_store, "_kmeans", lambda v, k: trainings.append(len(v)) or kmeans(v, k))
+    upsert = LocalVectorStore._upsert
+    monkeypatch.setattr(LocalVectorStore, "_upsert", lambda self, c, pts: writes.append(len(pts)) or upsert(self, c, pts))
+
+    store = LocalVectorStore(tmp_path, nprobe=2, ivf_min_points=100)
+    points = _points(300, seed=3)
+    docs = [(f"k{p['id']}", p["payload"]["name"], p["payload"]) for p in points]
+    encode = lambda texts: np.asarray([points[int(t[1:])]["vector"] for t in texts], dtype=np.float32)
+    assert sync_collection(store, "c", docs, encode, "m", chunk_size=16).points == 300
+    assert writes == [300] and trainings == [300]
+
+    # небольшая дозапись раскладывается по прежним центроидам, без переобучения
+    docs.append(("k-extra", "p0", {"name": "extra"}))
+    sync_collection(store, "c", docs, encode, "m")
+    assert trainings == [300]
+    assert sum(len(rows) for rows in store._load("c").lists) == 301
@@ -4,13 +4,22 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 PROJECT_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_DIR))
 
+import next_grade_service
+import rag_service
+from config import Config
 from next_grade_service import (
     retrieve_param_expectations,
     build_next_grade_narrative,
+    build_next_grade_rag_context,
+    build_param_support_table,
+    build_skill_support,
 )
+from reference_data import get_reference_data
 
 
 def test_param_expectations_from_atlas():
@@ -45,6 +54,107 @@ def test_narrative_uses_only_rag_fragments():
     assert pe["current_text"] == "Текст младший."
 
 
+def _online_support(params, role_name, grade, data_loader, top_per_param):
+    """Прежний build_skill_support: RAG-поиск по каждому параметру на запросе."""
+    role_skills = list(next_grade_service.retrieve_role_skills(data_loader, role_name, grade).keys())
+    result = {p: [] for p in params}
+    queries = [f"Параметр {p} навыки развитие компетенции" for p in params]
+    for param, hits in zip(params, rag_service.retrieve_many(queries, top_k=8, score_threshold=0.25)):
+        for h in hits:
+            name = ((h.get("payload") or {}).get("name") or "").strip()
+            if (h.get("payload") or {}).get("type") == "skill" and name in role_skills and name not in result[param]:
+                result[param].append(name)
+                if len(result[param]) >= top_per_param:
+                    break
+    for param in params:
+        for s in role_skills:
+            if s not in result[param] and len(result[param]) < top_per_param:
+                result[param].append(s)
+    return result
+
+
+@pytest.fixture
+def rag_index(local_rag_index):
+    return get_reference_data().data_loader
+
+
+def test_skill_support_from_offline_table_matches_online_search(rag_index, monkeypatch):
+    data_loader = rag_index
+    params = list(data_loader.atlas_map)
+    assert build_param_support_table(data_loader)
+    roles = []
+    for display in data_loader.get_all_roles()[:4]:
+        roles += [display, data_loader.get_internal_role_name(display)]
+    expected = {
+        (role, grade, top): _online_support(params, role, grade, data_loader, top)
+        for role in roles for grade in ("Junior", "Senior") for top in (3, 5)
+    }
+    # RAG-выдача действительно меняет порядок относительно навыков роли
+    assert any(
+        skills != list(next_grade_service.retrieve_role_skills(data_loader, role, grade))[:top]
+        for (role, grade, top), support in expected.items() for skills in support.values()
+    )
+
+    def no_vector_io(*args, **kwargs):
+        raise AssertionError("vector search at request time")
+
+    monkeypatch.setattr(rag_service, "retrieve_many", no_vector_io)
+    monkeypatch.setattr(rag_service, "retrieve", no_vector_io)
+    for (role, grade, top), support in expected.items():
+        assert build_skill_support(params, role, grade, data_loader, top_per_param=top) == support
+    gaps = [{"name": p} for p in params]
+    context = build_next_grade_rag_context(gaps, [], "Senior", data_loader.atlas_map, data_loader, roles[1])
+    assert "[Навыки для параметра" in context
+
+
+def test_skill_support_without_table_uses_role_order(rag_index, monkeypatch):
+    data_loader = rag_index
+    role = data_loader.get_internal_role_name(data_loader.get_all_roles()[0])
+    role_skills = list(next_grade_service.retrieve_role_skills(data_loader, role, "Middle"))
+    monkeypatch.setattr(rag_service, "retrieve_many", lambda *a, **kw: pytest.fail("vector search"))
+    support = build_skill_support(["Параметр A"], role, "Middle", data_loader, top_per_param=4)
+    assert support == {"Параметр A": role_skills[:4]}
+
+
+
+def test_skill_support_picks_up_table_built_after_worker_start(rag_index, monkeypatch):
+    data_loader = rag_index
+    params = list(data_loader.atlas_map)
+    role = data_loader.get_internal_role_name(data_loader.get_all_roles()[1])
+    role_order = build_skill_support(params, role, "Senior", data_loader)  # таблицы ещё нет: кэшируется None
+    expected = _online_support(params, role, "Senior", data_loader, 5)
+    assert role_order != expected
+
+    # таблицу пишет reindex-скрипт в другом процессе: кэш воркера не сбрасывается напрямую
+    cache = next_grade_service._support_table_cache
+    assert build_param_support_table(data_loader)
+    monkeypatch.setattr(next_grade_service, "_support_table_cache", cache)
+    assert build_skill_support(params, role, "Senior", data_loader) == expected
+
+
+def test_missing_table_is_reported_and_rebuilt_by_catalog_warmup(rag_index, monkeypatch, capsys):
+    data_loader = rag_index
+    params = list(data_loader.atlas_map)
+    role = data_loader.get_internal_role_name(data_loader.get_all_roles()[1])
+    before = next_grade_service.param_support_stats()
+    assert before["state"] == "missing"
+    assert "param_skill_support.json" in capsys.readouterr().out
+    build_skill_support(params, role, "Senior", data_loader)
+    assert next_grade_service.param_support_stats()["fallbacks"] == before["fallbacks"] + 1
+
+    # прогрев без загруженной RAG-модели модель не тянет и таблицу не строит
+    ref = get_reference_data()
+    monkeypatch.setattr(rag_service, "_sentence_transformers", {})
+    next_grade_service._warm_param_support_table(ref)
+    assert not Config.PARAM_SKILL_SUPPORT_FILE.exists()
+
+    monkeypatch.setattr(rag_service, "_sentence_transformers", {Config.EMBED_MODEL_NAME: object()})
+    next_grade_service._warm_param_support_table(ref)
+    assert next_grade_service.param_support_stats()["state"] == "ok"
+    expected = _online_support(params, role, "Senior", data_loader, 5)
+    assert build_skill_support(params, role, "Senior", data_loader) == expected
+
+
 if __name__ == "__main__":
     test_param_expectations_from_atlas()
     test_narrative_uses_only_rag_fragments()
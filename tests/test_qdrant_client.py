@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Qdrant REST: пул keep-alive соединений, deadline на запрос, batch-поиск."""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import rag_service
+from config import Config
+
+
+class _FakeQdrant(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+    peers = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append((self.path, body))
+        type(self).peers.add(self.client_address)
+        if self.path.endswith("/slow"):
+            time.sleep(0.5)
+        if self.path.endswith("/points/search/batch"):
+            result = [
+                [{"score": 0.9, "payload": {"name": f"hit-{i}", "text": f"текст {i}"}}]
+                for i, _ in enumerate(body["searches"])
+            ]
+        else:
+            result = [{"score": 0.8, "payload": {"name": "single"}}]
+        raw = json.dumps({"result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # клиент с истёкшим deadline закрывает сокет раньше ответа
+
+
+@pytest.fixture
+def qdrant(monkeypatch):
+    _FakeQdrant.requests = []
+    _FakeQdrant.peers = set()
+    server = _QuietServer(("127.0.0.1", 0), _FakeQdrant)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setattr(Config, "QDRANT_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(Config, "QDRANT_API_KEY", "test-key")
+    monkeypatch.setattr(
+        rag_service, "_encode_texts", lambda texts, **kw: np.ones((len(texts), 4), dtype=np.float32)
+    )
+    yield _FakeQdrant
+    server.shutdown()
+    server.server_close()
+    if rag_service._qdrant_pool is not None:
+        rag_service._qdrant_pool.close()
+
+
+def test_requests_reuse_pooled_connection(qdrant):
+    for _ in range(5):
+        hits = rag_service._qdrant_rest_search("c", [0.1, 0.2], limit=1, score_threshold=0.0)
+        assert hits == [{"score": 0.8, "payload": {"name": "single"}}]
+    assert len(qdrant.requests) == 5
+    assert len(qdrant.peers) == 1
+
+
+def test_retrieve_many_is_one_batch_round_trip(qdrant):
+    results = rag_service.retrieve_many(["Python", "SQL", "Excel"], top_k=2, score_threshold=0.3)
+    assert [r[0]["payload"]["name"] for r in results] == ["hit-0", "hit-1", "hit-2"]
+    assert len(qdrant.requests) == 1
+    path, body = qdrant.requests[0]
+    assert path == f"/collections/{Config.RAG_COLLECTION_NAME}/points/search/batch"
+    assert [s["limit"] for s in body["searches"]] == [2, 2, 2]
+
+    qdrant.requests.clear()
+    many = rag_service.search_skills_v2_many(["python", "", "sql"])
+    assert many[1] == [] and many[0] and many[2]
+    assert len(qdrant.requests) == 1 and len(qdrant.requests[0][1]["searches"]) == 2
+
+
+def test_gap_explanations_batched(qdrant):
+    out = rag_service.get_rag_explanations_for_gaps(["Python", "SQL"])
+    assert set(out) == {"Python", "SQL"}
+    assert len(qdrant.requests) == 1 and len(qdrant.requests[0][1]["searches"]) == 4
+
+
+def test_per_call_deadline(qdrant):
+    started = time.monotonic()
+    assert rag_service._qdrant_rest_req("POST", "/slow", {"x": 1}, timeout=0.1) is None
+    assert time.monotonic() - started < 0.45
+
+
+def test_without_qdrant_config_returns_empty(monkeypatch):
+    monkeypatch.setattr(Config, "QDRANT_URL", None)
+    monkeypatch.setattr(Config, "VECTOR_BACKEND", "qdrant")
+    assert rag_service.retrieve_many(["a", "b"]) == [[], []]
+    assert rag_service.get_rag_why_role_bullets_many({}, ["r"]) == [[]]
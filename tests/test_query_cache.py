@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""LRU-кэш эмбеддингов запросов: повтор не идёт в энкодер, память на модель ограничена, кэш переживает рестарт."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import query_cache
+import rag_service
+from config import Config
+from query_cache import QueryEmbeddingCache
+
+
+def _encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.asarray([[len(t), 1.0, 0.0, 0.0] for t in texts], dtype=np.float32)
+    return encode
+
+
+def test_repeated_queries_hit_cache_per_model_and_flag():
+    calls = []
+    cache = QueryEmbeddingCache(1 << 20)
+    first = cache.encode(["python", "sql", "python"], "m", _encoder(calls))
+    again = cache.encode(["sql", "python"], "m", _encoder(calls))
+    cache.encode(["sql"], "m", _encoder(calls), normalize=False)
+    cache.encode(["sql"], "other", _encoder(calls))
+    assert calls == [["python", "sql"], ["sql"], ["sql"]]
+    assert np.allclose(again, first[[1, 0]])
+    stats = cache.stats()["models"]["m"]
+    assert stats["hits"] == 2 and stats["misses"] == 3 and stats["size"] == 2
+    assert set(cache.stats()["models"]) == {"m", "m--raw", "other"}
+
+
+def test_memory_cap_evicts_least_recently_used():
+    calls = []
+    row = 4 * 4 + 1  # float32 × 4 + однобайтовый текст
+    cache = QueryEmbeddingCache(3 * row)
+    cache.encode(["a", "b", "c"], "m", _encoder(calls))
+    cache.encode(["a"], "m", _encoder(calls))
+    cache.encode(["d"], "m", _encoder(calls))
+    calls.clear()
+    cache.encode(["a", "c", "d", "b"], "m", _encoder(calls))
+    assert calls == [["b"]]
+    stats = cache.stats()["models"]["m"]
+    assert stats["bytes"] <= stats["max_bytes"] and stats["evictions"] == 2
+
+
+def test_cache_persists_across_restarts(tmp_path):
+    calls = []
+    cache = QueryEmbeddingCache(1 << 20, tmp_path)
+    cache.encode(["python", "sql"], "intfloat/e5", _encoder(calls))
+    assert cache.save() == 2
+    restored = QueryEmbeddingCache(1 << 20, tmp_path)
+    vecs = restored.encode(["sql", "python"], "intfloat/e5", _encoder(calls))
+    assert len(calls) == 1 and vecs[:, 0].tolist() == [3.0, 6.0]
+
+
+def test_encode_texts_uses_query_cache(monkeypatch):
+    calls = []
+
+    class _Model:
+        def encode(self, texts, normalize_embeddings=True, show_progress_bar=False):
+            return _encoder(calls)(texts)
+
+    monkeypatch.setattr(query_cache, "_cache", None)
+    monkeypatch.setattr(Config, "QUERY_CACHE_MAX_MB", 1)
+    monkeypatch.setattr(rag_service, "_get_embedder", lambda model_name=None: _Model())
+    for _ in range(3):
+        rag_service._encode_texts(["Параметр X навыки развитие компетенции"], model_name="query-cache-model")
+    assert len(calls) == 1
+    monkeypatch.setattr(query_cache, "_cache", None)
+    monkeypatch.setattr(Config, "QUERY_CACHE_MAX_MB", 0)
+    rag_service._encode_texts(["Параметр X навыки развитие компетенции"], model_name="query-cache-model")
+    assert len(calls) == 2
+
+
+def test_pair_score_cache_is_bounded_lru():
+    from query_cache import PairScoreCache
+
+    calls = []
+
+    def predict(pairs):
+        calls.append(list(pairs))
+        return [float(len(c)) for _, c in pairs]
+
+    cache = PairScoreCache(max_pairs=2)
+    assert cache.score([("q", "ab"), ("q", "abc"), ("q", "ab")], "m", predict) == [2.0, 3.0, 2.0]
+    assert calls == [[("q", "ab"), ("q", "abc")]]
+    assert cache.score([("q", "ab")], "m", predict) == [2.0] and len(calls) == 1
+    cache.score([("q", "abcd")], "m", predict)  # вытесняет ("q", "abc")
+    assert cache.score([("q", "abc")], "m", predict) == [3.0]
+    assert calls[-1] == [("q", "abc")]
+    assert cache.score([("q", "ab")], "other", predict) == [2.0] and calls[-1] == [("q", "ab")]
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 3
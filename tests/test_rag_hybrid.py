@@ -61,3 +61,85 @@ def test_get_skills_v2_candidates_lexical_only_mode(monkeypatch):
     assert len(out) == 1
     assert out[0]["name"] == "SQL, YQL"
     assert out[0]["retrieval_mode"] == "lexical_only"
+
+
+def test_lexical_batch_matches_single_queries():
+    from rag_service import _lexical_skill_candidates, _lexical_skill_candidates_many
+
+    queries = ["питон", "sql", "управление проектами", "", "docker kubernetes"]
+    batch = _lexical_skill_candidates_many(queries, top_k=10)
+    for q, got in zip(queries, batch):
+        expected = _lexical_skill_candidates(q, top_k=10)
+        assert [h["payload"]["name"] for h in got] == [h["payload"]["name"] for h in expected]
+        assert [round(h["score"], 9) for h in got] == [round(h["score"], 9) for h in expected]
+
+
+def test_get_skills_v2_candidates_batch_one_dense_call(monkeypatch):
+    from rag_service import get_skills_v2_candidates_batch
+
+    dense = {
+        "питон": [{"score": 0.91, "payload": {"name": "Python"}}],
+        "sql": [{"score": 0.89, "payload": {"name": "SQL, YQL"}}],
+    }
+    calls = []
+
+    def fake_many(inputs, top_k, score_threshold=None):
+        calls.append(list(inputs))
+        return [dense.get(i, []) for i in inputs]
+
+    monkeypatch.setattr("rag_service._dense_skill_candidates_many", fake_many)
+    monkeypatch.setattr(
+        "rag_service._dense_skill_candidates", lambda q, top_k, score_threshold=None: dense.get(q, [])
+    )
+    raws = ["питон", "sql", "питон"]
+    batch = get_skills_v2_candidates_batch(raws, top_k=3)
+    assert calls == [["питон", "sql"]]
+    assert batch == [get_skills_v2_candidates(r, top_k=3) for r in raws]
+
+
+class _FakeCrossEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(list(pairs))
+        return [len(set(q.lower()) & set(name.lower())) / 10.0 for q, name in pairs]
+
+
+def test_cross_encoder_rerank_batches_pairs_and_caches_scores(monkeypatch):
+    import query_cache
+    import rag_service
+    from config import Config
+    from rag_service import get_skills_v2_candidates_batch
+
+    dense = {
+        "питон": [{"score": 0.91, "payload": {"name": "Python"}}, {"score": 0.7, "payload": {"name": "Pandas"}}],
+        "sql": [{"score": 0.89, "payload": {"name": "SQL, YQL"}}, {"score": 0.6, "payload": {"name": "PostgreSQL"}}],
+    }
+    monkeypatch.setattr(
+        "rag_service._dense_skill_candidates_many",
+        lambda inputs, top_k, score_threshold=None: [dense.get(i, []) for i in inputs],
+    )
+    monkeypatch.setattr(
+        "rag_service._dense_skill_candidates", lambda q, top_k, score_threshold=None: dense.get(q, [])
+    )
+    encoder = _FakeCrossEncoder()
+    monkeypatch.setattr(rag_service, "_cross_encoder", encoder)
+    monkeypatch.setattr(Config, "SKILLS_CROSS_ENCODER_MODEL", "fake-ce")
+    monkeypatch.setattr(Config, "CROSS_ENCODER_CACHE_SIZE", 0)
+    raws = ["питон", "sql", "питон"]
+    expected = [get_skills_v2_candidates(r, top_k=3) for r in raws]
+    assert expected[0][0]["retrieval_mode"] == "hybrid_cross_encoder"
+
+    monkeypatch.setattr(Config, "CROSS_ENCODER_CACHE_SIZE", 1000)
+    monkeypatch.setattr(query_cache, "_pair_cache", None)
+    encoder.calls.clear()
+    assert get_skills_v2_candidates_batch(raws, top_k=3) == expected
+    assert len(encoder.calls) == 1
+    assert {q for q, _ in encoder.calls[0]} == {"питон", "sql"}
+    assert len(encoder.calls[0]) == len(set(encoder.calls[0]))
+
+    encoder.calls.clear()
+    assert get_skills_v2_candidates_batch(raws, top_k=3) == expected
+    assert encoder.calls == []
+    assert query_cache.get_pair_score_cache().stats()["hits"] > 0
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Тесты процессного реестра справочника: общий экземпляр, неизменяемость, хук сброса."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import reference_data
+from reference_data import (
+    get_data_loader,
+    get_reference_data,
+    invalidate_reference_data,
+    register_invalidation_hook,
+)
+
+
+def test_registry_is_shared_and_read_only():
+    ref = get_reference_data()
+    assert get_reference_data() is ref
+    assert get_data_loader() is ref.data_loader
+    assert isinstance(ref.canonical_names, frozenset)
+    assert "Python" in ref.canonical_names
+    with pytest.raises(TypeError):
+        ref.synonyms["новый"] = "Python"  # type: ignore[index]
+
+
+def test_invalidation_rebuilds_and_calls_hooks():
+    calls = []
+    hook = lambda: calls.append(1)  # noqa: E731
+    register_invalidation_hook(hook)
+    try:
+        before = get_reference_data()
+        invalidate_reference_data()
+        assert calls == [1]
+        after = get_reference_data()
+        assert after is not before
+        assert after.content_hash == before.content_hash
+    finally:
+        reference_data._invalidation_hooks.remove(hook)
+
+
+def test_request_paths_do_not_construct_data_loader(monkeypatch):
+    from gap_analyzer import GapAnalyzer
+    from skill_normalizer import get_canonical_skills_set
+
+    get_reference_data()
+
+    def _forbidden(*_args, **_kwargs):
+        raise AssertionError("DataLoader() в пути запроса")
+
+    monkeypatch.setattr("data_loader.DataLoader", _forbidden)
+    monkeypatch.setattr("data_loader.load_reference_tables", _forbidden)
+    assert get_canonical_skills_set() is get_reference_data().canonical_names
+    result = GapAnalyzer.analyze_structured({"Python": 2}, {"Python": 2}, [], {})
+    assert result["match_percent"] == 100
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Тесты скомпилированного снапшота справочника: round-trip и fallback при устаревании."""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from config import Config
+from data_loader import DataLoader, build_reference_tables, _load_json
+from reference_snapshot import compile_snapshot, load_snapshot
+
+
+def _use_tmp_sources(monkeypatch, tmp_path):
+    skills = tmp_path / "clean_skills.json"
+    atlas = tmp_path / "atlas_params_clean.json"
+    shutil.copy(Config.SKILLS_FILE, skills)
+    shutil.copy(Config.ATLAS_FILE, atlas)
+    monkeypatch.setattr(Config, "SKILLS_FILE", skills)
+    monkeypatch.setattr(Config, "ATLAS_FILE", atlas)
+    monkeypatch.setattr(Config, "REFERENCE_SNAPSHOT_FILE", tmp_path / "reference_snapshot.bin")
+    return skills
+
+
+def test_snapshot_round_trip_matches_json_tables(monkeypatch, tmp_path):
+    _use_tmp_sources(monkeypatch, tmp_path)
+    path = compile_snapshot()
+    tables = load_snapshot(path)
+    assert tables is not None
+    assert len(tables["content_hash"]) == 64
+
+    from_snapshot = DataLoader(tables)
+    from_json = DataLoader(build_reference_tables(_load_json(Config.SKILLS_FILE), _load_json(Config.ATLAS_FILE)))
+    role = from_json.get_all_roles()[0]
+    assert from_snapshot.get_all_roles() == from_json.get_all_roles()
+    assert from_snapshot.get_role_requirements(role, "Middle") == from_json.get_role_requirements(role, "Middle")
+
+
+def test_stale_snapshot_is_ignored(monkeypatch, tmp_path):
+    skills = _use_tmp_sources(monkeypatch, tmp_path)
+    compile_snapshot()
+    skills.write_text("[]", encoding="utf-8")
+    assert load_snapshot() is None
+    # DataLoader падает обратно на JSON-исходники
+    assert DataLoader().skills == []
+
+
+def test_unchanged_sources_are_not_rehashed(monkeypatch, tmp_path):
+    import reference_snapshot
+
+    skills = _use_tmp_sources(monkeypatch, tmp_path)
+    compile_snapshot()
+    hashed = []
+    real_hash = reference_snapshot.compute_source_hash
+    monkeypatch.setattr(reference_snapshot, "compute_source_hash", lambda *a: hashed.append(1) or real_hash(*a))
+    assert load_snapshot() is not None and hashed == []
+
+    # тот же контент с новым mtime (копия, touch): полная сверка хэша, снапшот годен
+    stat = skills.stat()
+    os.utime(skills, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_snapshot() is not None and hashed == [1]
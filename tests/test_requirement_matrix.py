@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Матрица требований роль × грейд × навык совпадает с get_role_requirements и dict-подсчётами."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from reference_data import get_data_loader
+from requirement_matrix import GRADES
+
+
+def test_matrix_rows_match_role_requirements():
+    loader = get_data_loader()
+    matrix = loader.requirement_matrix
+    assert matrix.required.dtype == np.uint8
+    for role in matrix.role_names:
+        for grade in GRADES + ("Unknown",):
+            row = matrix.required[matrix.role_id(role), matrix.grade_id(grade)]
+            as_dict = {matrix.item_names[i]: int(v) for i, v in enumerate(row) if v}
+            assert as_dict == loader.get_role_requirements(role, grade)
+
+
+def test_vectorized_overlap_matches_dict_loop():
+    loader = get_data_loader()
+    matrix = loader.requirement_matrix
+    role = matrix.role_names[0]
+    reqs = loader.get_role_requirements(role, "Senior")
+    skill_names = [k for k in reqs if k not in loader.atlas_map]
+    user = {skill_names[0]: 3, skill_names[1]: 1, "Несуществующий навык": 3}
+    if len(skill_names) > 2:
+        user[skill_names[2]] = 2
+
+    user_vec = matrix.user_vector(user)
+    counts = matrix.met_counts(user_vec, "Senior")
+    for r, name in enumerate(matrix.role_names):
+        expected = sum(
+            1
+            for s, lvl in loader.get_role_requirements(name, "Senior").items()
+            if s not in loader.atlas_map and user.get(s, 0) >= lvl
+        )
+        assert counts[r] == expected
+    assert matrix.required_counts("Senior")[matrix.role_id(role)] == len(skill_names)
+
+    gaps = matrix.gaps(user_vec, "Senior", [matrix.role_id(role)])[0]
+    assert gaps[matrix.item_ids[skill_names[0]]] == 0
+    assert gaps[matrix.item_ids[skill_names[1]]] == reqs[skill_names[1]] - 1
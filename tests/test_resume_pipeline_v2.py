@@ -38,8 +38,8 @@ def test_parse_skills_v2_flow_with_stubbed_llm_calls(monkeypatch):
     parser._batch_assess_levels = fake_batch_levels  # type: ignore[attr-defined]
 
     monkeypatch.setattr(
-        "resume_parser.get_skills_v2_candidates",
-        lambda _raw, top_k=5, retrieval_mode=None: [{"name": "Python", "score": 0.93}] if top_k else [],
+        "resume_parser.get_skills_v2_candidates_batch",
+        lambda raws, top_k=5, retrieval_mode=None: [[{"name": "Python", "score": 0.93}] for _ in raws],
     )
 
     allowed = [
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""NumPy-мэтчинг навыков: greedy совпадает с сортировкой пар, optimal — с перебором, блоки — с поблочным вызовом."""
+
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import rag_service
+from skill_matching import match_blocks, match_pairs
+
+
+def _sorted_pairs_greedy(sim, threshold):
+    """Прежний алгоритм: все пары выше порога, сортировка, жадный проход."""
+    pairs = [(sim[i, j], i, j) for i in range(sim.shape[0]) for j in range(sim.shape[1]) if sim[i, j] >= threshold]
+    pairs.sort(key=lambda x: -x[0])
+    used_i, used_j, out = set(), set(), []
+    for _, i, j in pairs:
+        if i in used_i or j in used_j:
+            continue
+        used_i.add(i)
+        used_j.add(j)
+        out.append((i, j))
+    return out
+
+
+def test_greedy_matches_sorted_pairs_with_ties():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        u, r = rng.integers(1, 8, size=2)
+        # округление даёт много равных score — проверяем порядок разрешения ничьих
+        sim = np.round(rng.uniform(0.5, 1.0, size=(u, r)), 1)
+        assert match_pairs(sim, 0.7) == _sorted_pairs_greedy(sim, 0.7)
+
+
+def test_optimal_maximizes_total_similarity():
+    sim = np.array([[0.95, 0.90], [0.90, 0.10]])
+    assert sorted(match_pairs(sim, 0.72)) == [(0, 0)]
+    assert sorted(match_pairs(sim, 0.72, mode="optimal")) == [(0, 1), (1, 0)]
+
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        sim = rng.uniform(0.5, 1.0, size=(4, 4))
+        gain = np.where(sim >= 0.7, sim, 0.0)
+        best = max(sum(gain[i, p[i]] for i in range(4)) for p in itertools.permutations(range(4)))
+        got = sum(sim[i, j] for i, j in match_pairs(sim, 0.7, mode="optimal"))
+        assert abs(got - best) < 1e-9
+
+
+def test_blocks_match_per_block_calls():
+    rng = np.random.default_rng(11)
+    sizes = [3, 1, 5, 2, 4]
+    offsets = np.cumsum([0] + sizes)
+    sim = np.round(rng.uniform(0.4, 1.0, size=(6, offsets[-1])), 2)
+    for mode in ("greedy", "optimal"):
+        assignment = match_blocks(sim, offsets, 0.72, mode)
+        for a, b in zip(offsets[:-1], offsets[1:]):
+            expected = np.full(b - a, -1)
+            for i, j in match_pairs(sim[:, a:b], 0.72, mode):
+                expected[j] = i
+            assert assignment[a:b].tolist() == expected.tolist()
+
+
+def test_empty_blocks_in_the_middle_and_at_the_end():
+    sim = np.array([[0.9, 0.1, 0.8], [0.2, 0.95, 0.3]])
+    for mode in ("greedy", "optimal"):
+        # блок 1 пустой (роль без навыков-требований)
+        assert match_blocks(sim, [0, 1, 1, 3], 0.5, mode).tolist() == [0, 1, 0]
+        # хвостовой пустой блок
+        assert match_blocks(sim, [0, 2, 3, 3], 0.5, mode).tolist() == [0, 1, 0]
+        assert match_blocks(sim, [0, 0, 3, 3], 0.5, mode).tolist() == match_blocks(sim, [0, 3], 0.5, mode).tolist()
+    blocks = [["Python"], [], ["SQL", "Go"], []]
+    maps = rag_service.match_similarity_blocks(sim, ["python", "sql"], blocks, threshold=0.5)
+    assert maps == [{"python": "Python"}, {}, {"sql": "SQL", "python": "Go"}, {}]
+
+
+def test_rag_service_block_and_name_api():
+    users = ["python", "sql"]
+    blocks = [["Python", "Go"], ["SQL"], ["Docker"]]
+    sim = np.array([[0.9, 0.1, 0.8, 0.2], [0.2, 0.3, 0.95, 0.1]])
+    maps = rag_service.match_similarity_blocks(sim, users, blocks, threshold=0.72)
+    assert maps == [{"python": "Python"}, {"sql": "SQL"}, {}]
+    assert rag_service.greedy_match_from_similarity(sim[:, :2], users, blocks[0], 0.72) == {"python": "Python"}
@@ -38,3 +38,50 @@ def test_map_to_canonical_skill_uses_skills_v2_first():
     with patch("rag_service.search_skills_v2", return_value=[{"payload": {"name": "SQL"}, "score": 0.91}]), \
          patch("rag_service.retrieve", return_value=[{"payload": {"type": "skill", "name": "Excel"}, "score": 0.95}]):
         assert map_to_canonical_skill("sql") == "SQL"
+
+
+def test_lemma_fallback_uses_prebuilt_index(monkeypatch):
+    """Фолбэк по леммам ключей — поиск в индексе, без лемматизации всего словаря на каждый вызов."""
+    import skill_normalizer
+    from skill_normalizer import _load_synonym_index, resolve_to_canonical
+
+    index = _load_synonym_index()
+    lemma, canonicals = next(iter(index.by_lemma.items()))
+    calls = []
+    monkeypatch.setattr(skill_normalizer, "normalize_for_search", lambda t: calls.append(t) or lemma)
+    # ввод, которого нет среди ключей словаря, но чья лемма совпадает с леммой ключа
+    assert resolve_to_canonical("Ввод вне словаря", set(canonicals)) == canonicals[0]
+    assert resolve_to_canonical("Ввод вне словаря", set()) is None
+    assert calls == ["Ввод вне словаря", "Ввод вне словаря"]
+
+
+def test_lemmatization_cache_and_bulk_api():
+    """normalize_many совпадает с поштучной нормализацией; повторы берутся из LRU-кэша."""
+    import skill_normalizer as sn
+    phrases = ["Управление  проектами", "Python", "управление проектами", "", "Анализ данных"]
+    expected = [sn.normalize_for_search(p) for p in phrases]
+    sn.clear_lemmatization_cache()
+    assert sn.normalize_many(phrases) == expected
+    stats = sn.lemmatization_cache_stats()
+    # «управление проектами» в двух написаниях — одна фраза, лемматизирована один раз
+    assert stats["phrases"]["misses"] == 3 and stats["phrases"]["size"] == 3
+    assert sn.normalize_for_search("Python") == expected[1]
+    assert sn.lemmatization_cache_stats()["phrases"]["hits"] >= 1
+
+    from lru_cache import LRUCache
+
+    small = LRUCache(2)
+    for key in ("a", "b", "c"):
+        small.put(key, key)
+    assert small.get("a") is None and small.get("c") == "c"
+    assert small.stats()["size"] == 2 and small.stats()["evictions"] == 1
+
+
+def test_warm_lemmatization_cache_covers_catalog():
+    import skill_normalizer as sn
+    sn.clear_lemmatization_cache()
+    count = sn.warm_lemmatization_cache()
+    assert count > 0
+    assert sn.lemmatization_cache_stats()["phrases"]["size"] > 0
+    sn.normalize_for_search(next(iter(sn.get_canonical_skills_set())))
+    assert sn.lemmatization_cache_stats()["phrases"]["hits"] >= 1
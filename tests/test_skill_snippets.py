@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Таблица сниппетов и объяснений, построенная build_index, отдаёт то же, что векторный поиск, без поиска."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import rag_service
+from config import Config
+from switch_profession_service import retrieve_skill_snippets
+
+
+@pytest.fixture
+def built_index(local_rag_index):
+    assert Config.SKILL_SNIPPETS_FILE.is_file()
+    skills, atlas = rag_service._load_skills_and_atlas()
+    return [s["Навык"] for s in skills[:12]], [a["Параметр"] for a in atlas[:3]]
+
+
+def _vector_only(monkeypatch, fn, *args, **kwargs):
+    with monkeypatch.context() as m:
+        m.setattr(rag_service, "_skill_snippet_table", lambda: None)
+        return fn(*args, **kwargs)
+
+
+def test_canonical_names_served_from_table(built_index, monkeypatch):
+    skill_names, param_names = built_index
+    expected_snippets = _vector_only(monkeypatch, retrieve_skill_snippets, skill_names, max_len=150)
+    expected_skill_gaps = _vector_only(monkeypatch, rag_service.get_rag_explanations_for_gaps, skill_names)
+    expected_param_gaps = _vector_only(
+        monkeypatch, rag_service.get_rag_explanations_for_gaps, param_names, is_skill=False
+    )
+    assert expected_snippets and any(expected_skill_gaps.values())
+
+    calls = []
+    real_retrieve_many = rag_service.retrieve_many
+    monkeypatch.setattr(rag_service, "retrieve_many", lambda q, **kw: calls.append(q) or real_retrieve_many(q, **kw))
+    assert retrieve_skill_snippets(skill_names, max_len=150) == expected_snippets
+    assert rag_service.get_rag_explanations_for_gaps(skill_names) == expected_skill_gaps
+    assert rag_service.get_rag_explanations_for_gaps(param_names, is_skill=False) == expected_param_gaps
+    assert calls == []
+
+    retrieve_skill_snippets([skill_names[0], "Совсем новый навык"])
+    assert calls == [["Совсем новый навык"]]
+
+
+def test_table_from_other_catalog_version_is_ignored(built_index, monkeypatch):
+    skill_names, _ = built_index
+    text = Config.SKILL_SNIPPETS_FILE.read_text(encoding="utf-8")
+    version = rag_service.get_reference_data().version
+    Config.SKILL_SNIPPETS_FILE.write_text(text.replace(version, "stale-version", 1), encoding="utf-8")
+    monkeypatch.setattr(rag_service, "_snippet_table_cache", None)
+    assert rag_service._skill_snippet_table() is None
+    assert retrieve_skill_snippets(skill_names) == _vector_only(monkeypatch, retrieve_skill_snippets, skill_names)
+
+
+def test_table_written_by_another_process_is_picked_up(built_index, monkeypatch):
+    skill_names, _ = built_index
+    path = Config.SKILL_SNIPPETS_FILE
+    text = path.read_bytes()
+    path.unlink()
+    monkeypatch.setattr(rag_service, "_snippet_table_cache", None)
+    assert rag_service._skill_snippet_table() is None  # воркер стартовал до reindex
+    path.write_bytes(text)  # reindex-скрипт дописал таблицу
+    assert rag_service._skill_snippet_table() is not None
+
+    calls = []
+    real_retrieve_many = rag_service.retrieve_many
+    monkeypatch.setattr(rag_service, "retrieve_many", lambda q, **kw: calls.append(q) or real_retrieve_many(q, **kw))
+    retrieve_skill_snippets(skill_names)
+    assert calls == []
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Командный gap-анализ: поток результатов, общая нормализация, summary, NDJSON-эндпоинт."""
+
+import json
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import gap_analyzer
+from reference_data import get_data_loader
+from team_gap_service import profile_to_user_skills, score_team
+
+
+def _profiles(loader, role):
+    names = loader.get_skills_for_role(role)
+    return [
+        {"id": "a", "grade": "Senior", "skills": {names[0]: 3, names[1]: 2}},
+        {"id": "b", "skills": [{"name": names[0], "level": 1}]},
+        {"id": "c", "skills": {}},
+    ]
+
+
+def test_score_team_streams_results_and_summary(monkeypatch):
+    monkeypatch.setattr(gap_analyzer, "_build_semantic_maps", lambda pairs: [{} for _ in pairs])
+    loader = get_data_loader()
+    role = loader.get_all_roles()[0]
+    rows = list(score_team(_profiles(loader, role), role, "Middle", loader, chunk_size=2))
+
+    results = [r for r in rows if r["type"] == "result"]
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    assert "plan_markdown" not in results[0]
+    assert results[0]["match_percent"] >= results[2]["match_percent"]
+    summary = rows[-1]
+    assert summary["type"] == "summary"
+    assert summary["profiles"] == 3 and summary["errors"] == 0
+    assert summary["elapsed_sec"] >= 0
+
+
+def test_profile_levels_and_atlas_defaults():
+    loader = get_data_loader()
+    params = list(loader.atlas_map)
+    skills = profile_to_user_skills({"grade": "Lead", "skills": {"Python": "2", "Пусто": 0}}, params)
+    assert skills["Python"] == 2 and "Пусто" not in skills
+    assert all(skills[p] == 4 for p in params)
+
+
+def test_team_gap_endpoint_returns_ndjson(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import api as api_mod
+
+    monkeypatch.setattr(gap_analyzer, "_build_semantic_maps", lambda pairs: [{} for _ in pairs])
+    loader = get_data_loader()
+    role = loader.get_all_roles()[0]
+    client = TestClient(api_mod.app)
+    anonymous = client.post(
+        "/api/hr/team-gap", json={"target_profession": role, "profiles": _profiles(loader, role)}
+    )
+    assert anonymous.status_code == 401
+
+    api_mod.app.dependency_overrides[api_mod._get_current_user] = lambda: {"id": "hr-1"}
+    try:
+        _check_team_gap_endpoint(client, api_mod, loader, role, monkeypatch)
+    finally:
+        api_mod.app.dependency_overrides.pop(api_mod._get_current_user, None)
+
+
+def _check_team_gap_endpoint(client, api_mod, loader, role, monkeypatch):
+    resp = client.post(
+        "/api/hr/team-gap",
+        json={"target_profession": role, "target_grade": "Senior", "profiles": _profiles(loader, role)},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["type"] for line in lines] == ["result", "result", "result", "summary"]
+
+    bad = client.post("/api/hr/team-gap", json={"target_profession": "Нет такой", "profiles": [{}]})
+    assert bad.status_code == 404
+
+    monkeypatch.setattr(api_mod.Config, "TEAM_GAP_MAX_PLAN_PROFILES", 2)
+    too_many_plans = client.post(
+        "/api/hr/team-gap",
+        json={"target_profession": role, "profiles": _profiles(loader, role), "include_plan": True},
+    )
+    assert too_many_plans.status_code == 400
+
+    monkeypatch.setattr(api_mod.Config, "TEAM_GAP_RATE_LIMIT", 0)
+    limited = client.post("/api/hr/team-gap", json={"target_profession": role, "profiles": [{}]})
+    assert limited.status_code == 429
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Инкрементальная переиндексация: diff по content_hash, чанки с повтором, алиасы коллекций."""
+
+import sys
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import rag_service
+import vector_sync
+from local_vector_store import LocalVectorStore
+from vector_sync import FULL, INCREMENTAL, sync_collection
+
+ALIAS = "skills"
+
+
+class _Encoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        out = np.zeros((len(texts), 16), dtype=np.float32)
+        for i, t in enumerate(texts):
+            out[i] = np.random.default_rng(zlib.crc32(t.encode("utf-8"))).normal(size=16)
+        return out
+
+
+def _docs(names):
+    return [(f"skill:{n}", f"Навык: {n}", {"type": "skill", "name": n}) for n in names]
+
+
+def _names_in(store):
+    return sorted(p["name"] for p in store.point_payloads(ALIAS).values())
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_sync, "_RETRY_BACKOFF_SEC", 0.0)
+    return LocalVectorStore(tmp_path)
+
+
+def test_full_build_then_incremental_diff(store):
+    encode = _Encoder()
+    result = sync_collection(store, ALIAS, _docs(["a", "b", "c"]), encode, "m")
+    assert result.mode == FULL and result.points == 3
+    assert store.get_aliases() == {ALIAS: result.collection}
+    assert store.get_collections() == [result.collection]
+    hit = store.search(ALIAS, encode(["Навык: b"])[0].tolist(), limit=1, score_threshold=0.0)
+    assert hit[0]["payload"]["name"] == "b"
+
+    encode.calls.clear()
+    docs = _docs(["a", "c", "d"])
+    docs[1] = ("skill:c", "Навык: c (обновлено)", {"type": "skill", "name": "c"})
+    again = sync_collection(store, ALIAS, docs, encode, "m")
+    assert (again.mode, again.collection, again.upserted, again.deleted) == (INCREMENTAL, result.collection, 2, 1)
+    assert encode.calls == [["Навык: c (обновлено)", "Навык: d"]]
+    assert _names_in(store) == ["a", "c", "d"]
+    hit = store.search(ALIAS, encode(["Навык: c (обновлено)"])[0].tolist(), limit=1, score_threshold=0.0)
+    assert hit[0]["payload"]["name"] == "c"
+
+    encode.calls.clear()
+    unchanged = sync_collection(store, ALIAS, docs, encode, "m")
+    assert (unchanged.upserted, unchanged.deleted) == (0, 0) and encode.calls == []
+
+    # смена модели меняет все content_hash -> новая коллекция и переключение алиаса
+    rebuilt = sync_collection(store, ALIAS, docs, encode, "m2")
+    assert rebuilt.mode == FULL and rebuilt.collection != result.collection
+    assert store.get_collections() == [rebuilt.collection]
+    assert _names_in(store) == ["a", "c", "d"]
+
+
+def test_legacy_collection_replaced_by_alias(store):
+    store.create_collection(ALIAS, 16)
+    store.upsert(ALIAS, [{"id": 0, "vector": np.ones(16).tolist(), "payload": {"name": "old"}}])
+    result = sync_collection(store, ALIAS, _docs(["a", "b"]), _Encoder(), "m")
+    assert result.mode == FULL
+    assert store.get_collections() == [result.collection]
+    assert _names_in(store) == ["a", "b"]
+
+
+class _FlakyStore:
+    """Обёртка: первый upsert каждого чанка с чётным первым id падает."""
+
+    bulk_upsert = False  # ведёт себя как сетевое хранилище: точки приходят чанками
+
+    def __init__(self, inner, fail_always=False):
+        self.inner = inner
+        self.fail_always = fail_always
+        self.failed = set()
+        self.chunk_sizes = []
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def upsert(self, collection, points):
+        self.chunk_sizes.append(len(points))
+        key = points[0]["id"]
+        if self.fail_always or (key % 2 == 0 and key not in self.failed):
+            self.failed.add(key)
+            if self.fail_always:
+                return False
+            raise ConnectionError("503")
+        return self.inner.upsert(collection, points)
+
+
+def test_chunked_parallel_upsert_retries_failed_chunks(store):
+    flaky = _FlakyStore(store)
+    names = [f"n{i}" for i in range(11)]
+    result = sync_collection(flaky, ALIAS, _docs(names), _Encoder(), "m", chunk_size=3, workers=3, retries=2)
+    assert result is not None and result.points == 11
+    assert max(flaky.chunk_sizes) == 3 and flaky.failed
+    assert _names_in(store) == sorted(names)
+
+
+def test_failed_rebuild_keeps_live_alias(store):
+    live = sync_collection(store, ALIAS, _docs(["a"]), _Encoder(), "m")
+    broken = _FlakyStore(store, fail_always=True)
+    assert sync_collection(broken, ALIAS, _docs(["a"]), _Encoder(), "m", force_recreate=True, retries=1) is None
+    assert store.get_aliases() == {ALIAS: live.collection}
+    assert store.get_collections() == [live.collection]
+    assert _names_in(store) == ["a"]
+
+
+def test_failed_incremental_run_is_repaired_by_next_run(store):
+    sync_collection(store, ALIAS, _docs(["a", "b"]), _Encoder(), "m")
+    docs = _docs(["a", "b", "c", "d", "e"])
+    poison = vector_sync.point_id("skill:d")
+
+    class _FailsOnD(_FlakyStore):
+        def upsert(self, collection, points):
+            if any(p["id"] == poison for p in points):
+                return False
+            return self.inner.upsert(collection, points)
+
+    partial = _FailsOnD(store)
+    assert sync_collection(partial, ALIAS, docs, _Encoder(), "m", chunk_size=1, workers=3, retries=0) is None
+    # не атомарно: успевшие чанки уже в живой коллекции
+    assert "c" in _names_in(store) and "d" not in _names_in(store)
+
+    encode = _Encoder()
+    repaired = sync_collection(store, ALIAS, docs, encode, "m")
+    assert repaired.mode == INCREMENTAL and _names_in(store) == ["a", "b", "c", "d", "e"]
+    assert "Навык: d" in encode.calls[0] and "Навык: c" not in encode.calls[0]
+
+
+def test_qdrant_scroll_and_alias_swap(monkeypatch):
+    calls = []
+    pages = {None: {"points": [{"id": 1, "payload": {"content_hash": "x"}}], "next_page_offset": 2},
+             2: {"points": [{"id": 2, "payload": {"content_hash": "y"}}], "next_page_offset": None}}
+
+    def fake_req(method, path, body=None, timeout=None):
+        calls.append((method, path, body))
+        if path.endswith("/points/scroll"):
+            return {"result": pages[body.get("offset")]}
+        if path == "/aliases":
+            return {"result": {"aliases": [{"alias_name": ALIAS, "collection_name": "skills__1"}]}}
+        return {"result": True}
+
+    monkeypatch.setattr(rag_service, "_qdrant_rest_req", fake_req)
+    qdrant = rag_service._QdrantRestStore()
+    assert qdrant.point_payloads(ALIAS) == {1: {"content_hash": "x"}, 2: {"content_hash": "y"}}
+    assert calls[0][2]["with_payload"] == ["content_hash"] and calls[0][2]["with_vector"] is False
+
+    assert qdrant.update_alias(ALIAS, "skills__2")
+    method, path, body = calls[-1]
+    assert (method, path) == ("POST", "/collections/aliases")
+    assert body["actions"] == [
+        {"delete_alias": {"alias_name": ALIAS}},
+        {"create_alias": {"collection_name": "skills__2", "alias_name": ALIAS}},
+    ]
+
+    assert qdrant.upsert("skills__2", [{"id": 5, "vector": np.ones(2, dtype=np.float32), "payload": {}}])
+    assert calls[-1][2]["points"][0]["vector"] == [1.0, 1.0]
@@ -15,7 +15,7 @@ def test_weighted_match_uses_skill_weights(monkeypatch):
         def get_skill_weight(self, skill_name):
             return {"Python": 1, "SQL, YQL": 3}.get(skill_name, 1)
 
-    monkeypatch.setattr("data_loader.DataLoader", lambda: FakeLoader())
+    monkeypatch.setattr("reference_data.get_data_loader", lambda: FakeLoader())
 
     user_skills = {
         "Python": 2,
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""What-if сессии: дельта по одному навыку даёт тот же результат, что полный пересчёт."""
+
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+import rag_service
+from gap_analyzer import GapAnalyzer
+from reference_data import get_data_loader
+from whatif_session import WhatIfSession
+
+
+@pytest.fixture
+def fake_encoder(monkeypatch):
+    """Детерминированные эмбеддинги: alias-навыки совпадают по вектору со своей целью."""
+    aliases = {}
+    calls = []
+
+    def _vec(text):
+        seed = int(hashlib.md5(aliases.get(text, text).encode("utf-8")).hexdigest()[:8], 16)
+        v = np.random.default_rng(seed).normal(size=32)
+        return v / np.linalg.norm(v)
+
+    def _encode(texts, is_query=False, explore_fast=False):
+        calls.append(list(texts))
+        return np.vstack([_vec(t) for t in texts])
+
+    monkeypatch.setattr(rag_service, "_encode_for_matching", _encode)
+    return aliases, calls
+
+
+def _setup():
+    loader = get_data_loader()
+    role = loader.requirement_matrix.role_names[0]
+    names = [k for k in loader.get_role_requirements(role, "Senior") if k not in loader.atlas_map]
+    profile = {names[0]: 3, names[1]: 1, "Свой навык": 2}
+    for param in loader.atlas_map:
+        profile[param] = 2
+    return loader, role, names, profile
+
+
+def _full(loader, role, profile):
+    result = GapAnalyzer.analyze_structured(
+        profile, loader.get_role_requirements(role, "Senior"), list(loader.atlas_map), loader.atlas_map
+    )
+    return result
+
+
+def test_delta_matches_full_recompute(fake_encoder):
+    aliases, calls = fake_encoder
+    loader, role, names, profile = _setup()
+    aliases["Свой навык"] = names[3]
+    session = WhatIfSession(dict(profile), role, "Senior", loader)
+    assert session.analysis() == _full(loader, role, profile)
+
+    calls.clear()
+    session.set_skill(names[1], 3)
+    profile[names[1]] = 3
+    # уровень существующего навыка: без новых эмбеддингов
+    assert calls == []
+    assert session.analysis() == _full(loader, role, profile)
+
+    calls.clear()
+    session.set_skill(names[2], 2)
+    profile[names[2]] = 2
+    # один новый навык: строка сходства с целью и строка для explore
+    assert calls == [[names[2]], [names[2]]]
+    assert session.analysis() == _full(loader, role, profile)
+
+    session.set_skill(names[0], None)
+    del profile[names[0]]
+    assert session.analysis() == _full(loader, role, profile)
+
+    fresh = WhatIfSession(dict(profile), role, "Senior", loader)
+    assert session.explore_ranking(50) == fresh.explore_ranking(50)
+
+
+def _explore_from_scratch(norm, loader):
+    from config import Config
+
+    index = rag_service.get_explore_index(explore_fast=Config.EXPLORE_FAST_EMBEDDINGS)
+    names = [n for n in norm if n not in loader.atlas_map]
+    vecs = rag_service.encode_user_skills_query_vectors(names, explore_fast=Config.EXPLORE_FAST_EMBEDDINGS)
+    scores = index.score(norm, names, vecs, Config.SKILL_MATCH_THRESHOLD, Config.SKILL_MATCH_MODE)
+    return [
+        {
+            "role": index.labels[s],
+            "match": int(scores["match"][s]),
+            "semantic_score": round(float(scores["semantic_score"][s]), 3),
+            "internal_role": index.segments[s][1],
+        }
+        for s in index.top(scores, 50)
+    ]
+
+
+def test_explore_matches_explore_index_after_changes(fake_encoder):
+    aliases, calls = fake_encoder
+    loader, role, names, profile = _setup()
+    aliases["Свой навык"] = names[3]
+    session = WhatIfSession(dict(profile), role, "Senior", loader)
+    assert session.explore_ranking(50) == _explore_from_scratch(session.norm, loader)
+
+    session.set_skill(names[2], 3)
+    session.set_skill("Свой навык", 4)
+    session.set_skill(names[0], None)
+    ranking = session.explore_ranking(50)
+    assert ranking == _explore_from_scratch(session.norm, loader)
+    assert all("semantic_score" in row for row in ranking)
+
+    # повторный explore без изменений не кодирует ничего заново
+    calls.clear()
+    session.explore_ranking(50)
+    assert calls == []
+
+
+def test_whatif_api_flow(fake_encoder):
+    from fastapi.testclient import TestClient
+
+    import api as api_mod
+
+    loader, role, names, _ = _setup()
+    client = TestClient(api_mod.app)
+    start = client.post("/api/whatif/sessions", json={
+        "profession": role,
+        "grade": "Специалист (Middle)",
+        "skills": [{"name": names[0], "level": 2}],
+    })
+    assert start.status_code == 200
+    body = start.json()
+    assert body["grade"] == "Senior" and body["explore"]
+    before = body["analysis"]["match_percent"]
+
+    changed = client.patch(f"/api/whatif/sessions/{body['session_id']}", json={"skill": names[1], "level": 2})
+    assert changed.status_code == 200
+    assert changed.json()["change"]["level"] == 3
+    assert changed.json()["analysis"]["match_percent"] >= before
+
+    assert client.delete(f"/api/whatif/sessions/{body['session_id']}").status_code == 200
+    assert client.get(f"/api/whatif/sessions/{body['session_id']}").status_code == 404
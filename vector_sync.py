@@ -0,0 +1,185 @@
+"""Инкрементальная переиндексация коллекций векторного хранилища (Qdrant или local_vector_store).
+
+Имя, по которому ищет rag_service (RAG_COLLECTION_NAME, SKILLS_V2_COLLECTION_NAME), —
+алиас на физическую коллекцию <алиас>__<метка времени>. Документ — (key, text, payload):
+
+    key           устойчивая идентичность документа (тип, имя, профессия) -> id точки
+    content_hash  хэш модели, текста и payload; хранится в payload точки
+
+sync_collection:
+    incremental — читает content_hash точек живой коллекции, кодирует только новые и
+                  изменённые документы, upsert-ит их и удаляет точки исчезнувших документов.
+                  Точка заменяется целиком: поиск видит старую или новую версию документа,
+                  но прогон в целом не атомарен — при сбое части чанков остальные уже в
+                  живой коллекции; следующий прогон дописывает недостающее по content_hash;
+    full        — force_recreate, живой коллекции нет или изменилось всё (сменилась модель):
+                  новая коллекция наполняется рядом со старой, алиас переключается одним
+                  действием, старая удаляется. Поиск не видит недостроенный индекс.
+
+Upsert — чанками по chunk_size в workers потоков; чанк повторяется до retries раз
+с экспоненциальной паузой. Хранилище с bulk_upsert (local_vector_store переписывает коллекцию
+на каждый upsert) получает все точки одним вызовом: чанки нужны только сетевому Qdrant.
+"""
+
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FULL = "full"
+INCREMENTAL = "incremental"
+_RETRY_BACKOFF_SEC = 0.5
+
+
+@dataclass
+class SyncResult:
+    mode: str
+    collection: str
+    points: int
+    upserted: int
+    deleted: int
+
+
+def point_id(key: str) -> int:
+    """Стабильный id точки по ключу документа (63 бита — влезает в uint64 Qdrant и int64)."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big") >> 1
+
+
+def content_hash(text: str, payload: Dict[str, Any], model: str) -> str:
+    raw = json.dumps([model, text, payload], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _unique_keys(keys: Sequence[str]) -> List[str]:
+    """Повторы ключа (один навык дважды в каталоге) различаются номером вхождения."""
+    seen: Dict[str, int] = {}
+    out = []
+    for key in keys:
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        out.append(key if n == 0 else f"{key}#{n}")
+    return out
+
+
+def upsert_chunks(
+    store: Any,
+    collection: str,
+    ids: Sequence[Any],
+    vectors: np.ndarray,
+    payloads: Sequence[Dict[str, Any]],
+    chunk_size: int = 256,
+    workers: int = 4,
+    retries: int = 3,
+) -> bool:
+    """Upsert точек чанками; True — все чанки записаны."""
+    if getattr(store, "bulk_upsert", False):
+        chunk_size = len(ids)
+    chunk_size = max(1, chunk_size)
+    chunks = [range(a, min(a + chunk_size, len(ids))) for a in range(0, len(ids), chunk_size)]
+
+    def send(rows: range) -> bool:
+        points = [{"id": ids[i], "vector": vectors[i], "payload": payloads[i]} for i in rows]
+        for attempt in range(retries + 1):
+            try:
+                if store.upsert(collection, points):
+                    return True
+            except Exception as e:
+                print(f"⚠️ Ошибка upsert в {collection}: {e}")
+            if attempt < retries:
+                time.sleep(_RETRY_BACKOFF_SEC * 2 ** attempt)
+        return False
+
+    if workers <= 1 or len(chunks) <= 1:
+        return all(send(rows) for rows in chunks)
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        return all(list(pool.map(send, chunks)))
+
+
+def _delete_chunks(store: Any, collection: str, ids: Sequence[Any], chunk_size: int) -> bool:
+    chunk_size = max(1, chunk_size)
+    return all(store.delete_points(collection, list(ids[a: a + chunk_size])) for a in range(0, len(ids), chunk_size))
+
+
+def _live_collection(store: Any, alias: str) -> Optional[str]:
+    """Коллекция, на которую сейчас смотрит поиск: цель алиаса или коллекция с тем же именем (старая схема)."""
+    target = store.get_aliases().get(alias)
+    if target:
+        return target
+    return alias if alias in store.get_collections() else None
+
+
+def _rebuild(
+    store: Any,
+    alias: str,
+    ids: List[int],
+    texts: List[str],
+    payloads: List[Dict[str, Any]],
+    encode: Callable[[List[str]], Any],
+    options: Dict[str, int],
+) -> Optional[SyncResult]:
+    if not texts:
+        return None
+    vectors = np.asarray(encode(texts), dtype=np.float32)
+    name = f"{alias}__{time.strftime('%Y%m%d%H%M%S')}{time.time_ns() // 1_000_000 % 1000:03d}"
+    if not store.create_collection(name, int(vectors.shape[1])):
+        return None
+    if not upsert_chunks(store, name, ids, vectors, payloads, **options):
+        store.delete_collection(name)
+        return None
+    if alias in store.get_collections():
+        # старая схема: коллекция с именем алиаса; Qdrant не даёт алиасу совпасть с коллекцией
+        store.delete_collection(alias)
+    if not store.update_alias(alias, name):
+        store.delete_collection(name)
+        return None
+    for old in store.get_collections():
+        if old != name and old.startswith(f"{alias}__"):
+            store.delete_collection(old)
+    return SyncResult(FULL, name, len(ids), len(ids), 0)
+
+
+def sync_collection(
+    store: Any,
+    alias: str,
+    docs: Sequence[Tuple[str, str, Dict[str, Any]]],
+    encode: Callable[[List[str]], Any],
+    model: str,
+    force_recreate: bool = False,
+    chunk_size: int = 256,
+    workers: int = 4,
+    retries: int = 3,
+) -> Optional[SyncResult]:
+    """Приводит коллекцию за алиасом к docs [(key, text, payload)]; encode(texts) -> (n × d).
+    None — запись не удалась. В режиме full живая коллекция и алиас при этом не тронуты;
+    в incremental успевшие чанки уже записаны в живую коллекцию (поиск видит частично
+    обновлённый индекс), недописанные точки сохраняют старый content_hash и будут
+    перезаписаны следующим прогоном."""
+    options = {"chunk_size": chunk_size, "workers": workers, "retries": retries}
+    ids = [point_id(k) for k in _unique_keys([k for k, _, _ in docs])]
+    texts = [t for _, t, _ in docs]
+    payloads = [{**p, "content_hash": content_hash(t, p, model)} for _, t, p in docs]
+    live = _live_collection(store, alias)
+    stored = store.point_payloads(live) if live is not None and not force_recreate else None
+    if stored is not None:
+        changed = [
+            i for i, pid in enumerate(ids)
+            if (stored.get(pid) or {}).get("content_hash") != payloads[i]["content_hash"]
+        ]
+        if len(changed) < len(ids) or not ids:
+            keep = set(ids)
+            removed = [pid for pid in stored if pid not in keep]
+            if changed:
+                vectors = np.asarray(encode([texts[i] for i in changed]), dtype=np.float32)
+                ok = upsert_chunks(
+                    store, live, [ids[i] for i in changed], vectors, [payloads[i] for i in changed], **options
+                )
+                if not ok:
+                    return None
+            if removed and not _delete_chunks(store, live, removed, chunk_size):
+                return None
+            return SyncResult(INCREMENTAL, live, len(ids), len(changed), len(removed))
+    return _rebuild(store, alias, ids, texts, payloads, encode, options)
@@ -0,0 +1,255 @@
+"""
+What-if сессии: «что будет, если поднять навык X до уровня L» без полного пересчёта /api/plan.
+
+Сессия один раз нормализует профиль, кодирует навыки пользователя и требования целевой роли
+и держит у себя матрицу сходства (строка на user-навык) с требованиями цели и со словарём
+требований индекса explore. Изменение одного навыка пересчитывает только его: резолв имени
+и его строки сходства (эмбеддинг одного навыка). Gap-анализ по цели собирается из кэша тем же
+ядром, что и batch-анализ (gap_analyzer._analyze_rows), explore — тем же ExploreIndex.score/top,
+что и ScenarioHandler.explore_opportunities (точные и семантические пары, semantic_score).
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from gap_analyzer import _analyze_rows
+
+
+class WhatIfSession:
+    def __init__(self, user_skills: Dict[str, Any], role: str, grade: str, data_loader):
+        self.id = uuid.uuid4().hex
+        self.role = role
+        self.grade = grade
+        self.data_loader = data_loader
+        self.lock = threading.Lock()
+        self.touched = time.monotonic()
+
+        self._atlas = data_loader.atlas_map
+        self._reqs = data_loader.get_role_requirements(role, grade)
+        self._req_names = [k for k in self._reqs if k not in self._atlas]
+        self._raw: Dict[str, Any] = {}        # имя как ввёл пользователь -> уровень
+        self._canonical: Dict[str, str] = {}  # имя как ввёл пользователь -> каноническое
+        self.norm: Dict[str, Any] = {}
+        self._req_vecs = None
+        self._sim_rows: Dict[str, Any] = {}   # канонический user-навык -> сходство с требованиями
+        self._explore_fast = bool(getattr(Config, "EXPLORE_FAST_EMBEDDINGS", True))
+        self._explore = self._load_explore_index()
+        self._explore_user: Dict[str, Any] = {}  # user-навык -> (query-вектор explore, сходство со словарём индекса)
+
+        for name, level in user_skills.items():
+            self._set_raw(name, level)
+        self._rebuild_norm()
+        self._init_similarity()
+        self._add_explore_rows(self._user_skill_names())
+
+    # --- нормализация ---
+
+    def _resolve(self, name: str) -> str:
+        if name not in self._canonical:
+            try:
+                from skill_normalizer import resolve_to_canonical, get_canonical_skills_set
+                self._canonical[name] = resolve_to_canonical(name, get_canonical_skills_set()) or name
+            except Exception:
+                self._canonical[name] = name
+        return self._canonical[name]
+
+    def _set_raw(self, name: str, level) -> None:
+        if level is None or level <= 0:
+            self._raw.pop(name, None)
+        else:
+            self._raw[name] = level
+        self._resolve(name)
+
+    def _level_for(self, key: str):
+        levels = [lvl for raw, lvl in self._raw.items() if self._canonical[raw] == key]
+        return max(levels) if levels else None
+
+    def _rebuild_norm(self) -> None:
+        norm: Dict[str, Any] = {}
+        for name, level in self._raw.items():
+            key = self._canonical[name]
+            if key not in norm or level > norm[key]:
+                norm[key] = level
+        self.norm = norm
+
+    # --- семантика ---
+
+    def _user_skill_names(self) -> List[str]:
+        return [n for n in self.norm if n not in self._atlas]
+
+    def _init_similarity(self) -> None:
+        names = self._user_skill_names()
+        if not self._req_names:
+            return
+        try:
+            from rag_service import _encode_for_matching
+            self._req_vecs = np.asarray(_encode_for_matching(self._req_names, is_query=False))
+        except Exception:
+            self._req_vecs = None
+            return
+        self._add_similarity_rows(names)
+
+    def _add_similarity_rows(self, names: List[str]) -> None:
+        names = [n for n in names if n not in self._sim_rows]
+        if self._req_vecs is None or not names:
+            return
+        try:
+            from rag_service import encode_user_skills_query_vectors
+            vecs = encode_user_skills_query_vectors(names)
+        except Exception:
+            vecs = None
+        if vecs is None:
+            return
+        sims = np.asarray(vecs) @ self._req_vecs.T
+        for name, row in zip(names, sims):
+            self._sim_rows[name] = row
+
+    def _semantic_map(self) -> Dict[str, str]:
+        names = [n for n in self._user_skill_names() if n in self._sim_rows]
+        if not names or not self._req_names:
+            return {}
+        from rag_service import match_from_similarity
+        sim = np.vstack([self._sim_rows[n] for n in names])
+        return match_from_similarity(sim, names, self._req_names)
+
+    # --- explore ---
+
+    def _load_explore_index(self):
+        try:
+            from rag_service import get_explore_index
+            return get_explore_index(explore_fast=self._explore_fast)
+        except Exception:
+            from explore_index import build_explore_index
+            return build_explore_index(self.data_loader)
+
+    def _add_explore_rows(self, names: List[str]) -> None:
+        names = [n for n in names if n not in self._explore_user]
+        if self._explore.vectors is None or not names:
+            return
+        try:
+            from rag_service import encode_user_skills_query_vectors
+            vecs = encode_user_skills_query_vectors(names, explore_fast=self._explore_fast)
+        except Exception:
+            vecs = None
+        if vecs is None:
+            return
+        vecs = np.asarray(vecs, dtype=np.float32)
+        sims = vecs @ self._explore.vectors.T
+        for name, vec, row in zip(names, vecs, sims):
+            self._explore_user[name] = (vec, row)
+
+    def explore_ranking(self, top_n: int = 10) -> List[Dict[str, Any]]:
+        """Тот же результат, что explore_opportunities по текущему профилю: строки сходства
+        берутся из кэша сессии, сопоставление и ранжирование — ExploreIndex.score/top."""
+        index = self._explore
+        names = self._user_skill_names()
+        vecs = sims = None
+        if names and all(n in self._explore_user for n in names):
+            vecs = np.vstack([self._explore_user[n][0] for n in names])
+            sims = np.vstack([self._explore_user[n][1] for n in names])
+        scores = index.score(
+            self.norm, names, vecs, Config.SKILL_MATCH_THRESHOLD, Config.SKILL_MATCH_MODE, user_sims=sims
+        )
+        return [
+            {
+                "role": index.labels[s],
+                "match": int(scores["match"][s]),
+                "semantic_score": round(float(scores["semantic_score"][s]), 3),
+                "internal_role": index.segments[s][1],
+            }
+            for s in index.top(scores, top_n)
+        ]
+
+    # --- API ---
+
+    def analysis(self) -> Dict[str, Any]:
+        result = _analyze_rows([(self.norm, self.role, self.grade)], self.data_loader, sem_maps=[self._semantic_map()])[0]
+        result.pop("role", None)
+        result.pop("grade", None)
+        return result
+
+    def snapshot(self, explore_top_n: int = 10) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "role": self.role,
+            "grade": self.grade,
+            "analysis": self.analysis(),
+            "explore": self.explore_ranking(explore_top_n),
+        }
+
+    def set_skill(self, name: str, level) -> Dict[str, Any]:
+        """Меняет уровень одного навыка (None/0 — убрать) и пересчитывает только затронутое."""
+        name = (name or "").strip()
+        if not name:
+            raise ValueError("Укажите навык")
+        key = self._resolve(name)
+        old_level = self.norm.get(key)
+        self._set_raw(name, level)
+        new_level = self._level_for(key)
+        if new_level is None:
+            self.norm.pop(key, None)
+            self._sim_rows.pop(key, None)
+            self._explore_user.pop(key, None)
+        else:
+            self.norm[key] = new_level
+            if key not in self._atlas:
+                self._add_similarity_rows([key])
+                self._add_explore_rows([key])
+        self.touched = time.monotonic()
+        return {"skill": key, "previous_level": old_level, "level": new_level}
+
+
+class WhatIfSessionStore:
+    """In-memory хранилище сессий с TTL и ограничением размера (вытесняется самая старая)."""
+
+    def __init__(self, ttl_sec: float, max_sessions: int):
+        self.ttl_sec = ttl_sec
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, WhatIfSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        while self._sessions:
+            sid, session = next(iter(self._sessions.items()))
+            if now - session.touched <= self.ttl_sec:
+                break
+            self._sessions.pop(sid)
+
+    def put(self, session: WhatIfSession) -> None:
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[WhatIfSession]:
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.touched = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+_store: Optional[WhatIfSessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> WhatIfSessionStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WhatIfSessionStore(Config.WHATIF_SESSION_TTL_SEC, Config.WHATIF_MAX_SESSIONS)
+        return _store